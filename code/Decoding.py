@@ -0,0 +1,374 @@
+import json
+import mmap
+import wave
+import struct
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import vosk
+from PreProcess.AudioIngest import TARGET_RATE, is_target_pcm, iter_pcm16_blocks, load_audio, float_to_pcm16
+
+BLOCK_SECONDS = 0.5  # Audio passed to the recognizer per AcceptWaveform call
+MAX_SEGMENT_SECONDS = 30  # Upper bound on the length of a segment in long-file mode
+SEGMENT_WORKERS = 4  # Segments of a recording decoded at the same time in long-file mode
+SILENCE_TOP_DB = 30  # Threshold (in decibels below the peak) under which audio counts as silence
+
+
+# cffi only accepts bytes for the recognizer's char* argument; from_buffer wraps other buffers without a copy
+_ffi = getattr(vosk, '_ffi', None)
+
+
+class PcmFile:
+    """
+    Memory-mapped view of the PCM data of a wav file, for feeding the recognizer without copying.
+
+    Attributes:
+        sample_rate (int): Sample rate of the audio.
+        channels (int): Number of channels.
+        sample_width (int): Bytes per sample.
+        data (memoryview): PCM data chunk of the mapped file.
+    """
+
+    def __init__(self, audio_file):
+        """
+        Maps a wav file and locates its format and data chunks.
+
+        Args:
+        - audio_file (str): Path to the wav file.
+        """
+        self.audio_file = audio_file
+        self._file = open(audio_file, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            self._file.close()
+            raise wave.Error(f"{audio_file} is empty")
+        try:
+            self._parse_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse_header(self):
+        buffer = self._mmap
+        if buffer[:4] != b'RIFF' or buffer[8:12] != b'WAVE':
+            raise wave.Error(f"{self.audio_file} is not a RIFF/WAVE file")
+
+        offset = 12
+        fmt = None
+        while offset + 8 <= len(buffer):
+            chunk_id = buffer[offset:offset + 4]
+            chunk_size = struct.unpack_from('<I', buffer, offset + 4)[0]
+            body = offset + 8
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack_from('<HHIIHH', buffer, body)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise wave.Error(f"{self.audio_file} has no fmt chunk before its data")
+                audio_format, self.channels, self.sample_rate, _, _, bits = fmt
+                if audio_format not in (1, 0xFFFE):  # PCM or WAVE_FORMAT_EXTENSIBLE
+                    raise wave.Error(f"{self.audio_file} is not PCM encoded")
+                self.sample_width = bits // 8
+                end = min(body + chunk_size, len(buffer))  # Tolerate truncated files
+                self.data = memoryview(buffer)[body:end]
+                return
+            offset = body + chunk_size + (chunk_size & 1)  # Chunks are padded to an even size
+        raise wave.Error(f"{self.audio_file} has no data chunk")
+
+    @property
+    def frame_size(self):
+        return self.channels * self.sample_width
+
+    def close(self):
+        if getattr(self, 'data', None) is not None:
+            self.data.release()
+            self.data = None
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def feed_recognizer(rec, data, block_bytes, should_stop=None):
+    """
+    Passes PCM data to a recognizer in blocks of memoryview slices and collects the raw JSON results.
+
+    Args:
+    - rec (vosk.KaldiRecognizer): Recognizer to feed.
+    - data (memoryview): 16-bit mono PCM data.
+    - block_bytes (int): Bytes per AcceptWaveform call.
+    - should_stop (callable or None): Checked before every block; decoding stops when it returns True.
+
+    Returns:
+    - list: Raw JSON strings of the finished utterances, including the final result.
+    """
+    return feed_blocks(rec, (data[offset:offset + block_bytes] for offset in range(0, len(data), block_bytes)),
+                       should_stop)
+
+
+def feed_blocks(rec, blocks, should_stop=None):
+    """
+    Passes blocks of PCM data to a recognizer and collects the raw JSON results.
+
+    Args:
+    - rec (vosk.KaldiRecognizer): Recognizer to feed.
+    - blocks (iterable): 16-bit mono PCM blocks (memoryviews, bytes or int16 arrays).
+    - should_stop (callable or None): Checked before every block; decoding stops when it returns True.
+
+    Returns:
+    - list: Raw JSON strings of the finished utterances, including the final result.
+    """
+    raw_results = []
+    for block in blocks:
+        if should_stop is not None and should_stop():
+            break
+        if rec.AcceptWaveform(_ffi.from_buffer(block) if _ffi is not None else bytes(block)):
+            raw_results.append(rec.Result())
+    raw_results.append(rec.FinalResult())
+    return raw_results
+
+
+def join_results(raw_results):
+    """
+    Joins the texts of raw recognizer results, parsing all of them with a single json.loads call.
+
+    Args:
+    - raw_results (list): Raw JSON strings returned by the recognizer.
+
+    Returns:
+    - str: Transcribed text.
+    """
+    results = json.loads('[' + ','.join(raw_results) + ']')
+    return ' '.join(res['text'] for res in results if res.get('text'))
+
+
+def parse_utterances(raw_results, offset=0.0):
+    """
+    Parses the raw results of a recognizer with word output (SetWords(True)) into utterances with word timings.
+
+    Args:
+    - raw_results (list): Raw JSON strings returned by the recognizer.
+    - offset (float): Seconds added to every time, e.g. the start of a segment within the recording.
+
+    Returns:
+    - list: Utterance dicts with 'text', 'start', 'end', 'confidence' (mean word confidence) and 'words', a list
+      of dicts with 'word', 'start', 'end' and 'conf'; utterances without text are left out.
+    """
+    utterances = []
+    for res in json.loads('[' + ','.join(raw_results) + ']'):
+        words = res.get('result')
+        if not res.get('text') or not words:
+            continue
+        words = [{'word': word['word'], 'start': word['start'] + offset, 'end': word['end'] + offset,
+                  'conf': word['conf']} for word in words]
+        utterances.append({'text': res['text'], 'start': words[0]['start'], 'end': words[-1]['end'],
+                           'confidence': sum(word['conf'] for word in words) / len(words), 'words': words})
+    return utterances
+
+
+def _new_recognizer(vosk_model, sample_rate, words):
+    rec = vosk.KaldiRecognizer(vosk_model, sample_rate)
+    if words:
+        rec.SetWords(True)  # Adds start, end and confidence of every word to the results
+    return rec
+
+
+def decode_wav(audio_file, vosk_model, block_seconds=BLOCK_SECONDS, should_stop=None):
+    """
+    Transcribes a 16-bit mono wav file with Vosk. The PCM data is memory-mapped and passed to the recognizer
+    in memoryview slices, so no audio is copied per block.
+
+    Args:
+    - audio_file (str): Path to the wav file.
+    - vosk_model: Vosk model for speech recognition.
+    - block_seconds (float): Audio passed to the recognizer per call.
+    - should_stop (callable or None): Checked before every block; decoding stops when it returns True.
+
+    Returns:
+    - str: Transcribed text.
+    """
+    return join_results(_recognize_wav(audio_file, vosk_model, block_seconds, should_stop))
+
+
+def _recognize_wav(audio_file, vosk_model, block_seconds, should_stop, words=False):
+    with PcmFile(audio_file) as pcm:
+        if pcm.sample_width != 2 or pcm.channels != 1:
+            raise ValueError(f"{audio_file} is not 16-bit mono PCM")
+        rec = _new_recognizer(vosk_model, pcm.sample_rate, words)
+        block_bytes = max(1, int(pcm.sample_rate * block_seconds)) * pcm.frame_size
+        return feed_recognizer(rec, pcm.data, block_bytes, should_stop)
+
+
+def decode_audio(audio_file, vosk_model, block_seconds=BLOCK_SECONDS, should_stop=None):
+    """
+    Transcribes a WAV, FLAC or MP3 file with Vosk. 16 kHz 16-bit mono wav files take the zero-copy decode_wav
+    path; anything else is decoded, downmixed and resampled to 16 kHz block by block (see PreProcess.AudioIngest),
+    so the recognizer always gets the rate of the model and no file is converted upfront.
+
+    Args:
+    - audio_file (str): Path to the audio file.
+    - vosk_model: Vosk model for speech recognition.
+    - block_seconds (float): Audio passed to the recognizer per call.
+    - should_stop (callable or None): Checked before every block; decoding stops when it returns True.
+
+    Returns:
+    - str: Transcribed text.
+    """
+    return join_results(_recognize_audio(audio_file, vosk_model, block_seconds, should_stop))
+
+
+def decode_audio_words(audio_file, vosk_model, block_seconds=BLOCK_SECONDS, should_stop=None):
+    """
+    Like decode_audio, but keeps the start, end and confidence of every recognized word.
+
+    Args:
+    - audio_file (str): Path to the audio file.
+    - vosk_model: Vosk model for speech recognition.
+    - block_seconds (float): Audio passed to the recognizer per call.
+    - should_stop (callable or None): Checked before every block; decoding stops when it returns True.
+
+    Returns:
+    - list: Utterances with word timings, see parse_utterances.
+    """
+    return parse_utterances(_recognize_audio(audio_file, vosk_model, block_seconds, should_stop, words=True))
+
+
+def _recognize_audio(audio_file, vosk_model, block_seconds, should_stop, words=False):
+    if is_target_pcm(audio_file):
+        return _recognize_wav(audio_file, vosk_model, block_seconds, should_stop, words)
+
+    rec = _new_recognizer(vosk_model, TARGET_RATE, words)
+    blocks = iter_pcm16_blocks(audio_file, TARGET_RATE, block_seconds)
+    try:
+        return feed_blocks(rec, blocks, should_stop)
+    finally:
+        blocks.close()  # Closes the source file when decoding stopped early
+
+
+def read_pcm(audio_file):
+    """
+    Reads an audio file as 16-bit mono PCM samples. Files other than 16 kHz 16-bit mono wav are converted to that
+    format with PreProcess.AudioIngest.
+
+    Args:
+    - audio_file (str): Path to the audio file.
+
+    Returns:
+    - tuple: (int16 samples as np.ndarray, sample rate).
+    """
+    if not is_target_pcm(audio_file):
+        audio, sample_rate = load_audio(audio_file, TARGET_RATE)
+        return float_to_pcm16(audio), sample_rate
+
+    with PcmFile(audio_file) as pcm:
+        if pcm.sample_width != 2 or pcm.channels != 1:
+            raise ValueError(f"{audio_file} is not 16-bit mono PCM")
+        usable = len(pcm.data) - len(pcm.data) % 2
+        return np.frombuffer(pcm.data[:usable], dtype=np.int16).copy(), pcm.sample_rate
+
+
+def find_segments(samples, sample_rate, max_segment_seconds=MAX_SEGMENT_SECONDS, top_db=SILENCE_TOP_DB):
+    """
+    Splits audio into consecutive segments of at most max_segment_seconds, cutting in the middle of silences.
+
+    Args:
+    - samples (np.ndarray): Audio samples.
+    - sample_rate (int): Sample rate of the audio.
+    - max_segment_seconds (float): Maximum segment length.
+    - top_db (float): Silence threshold passed to librosa.effects.split.
+
+    Returns:
+    - list: (start, end) sample indices of the segments, covering the whole audio in order.
+    """
+    import librosa  # Only needed in long-file mode
+
+    max_length = int(max_segment_seconds * sample_rate)
+    if len(samples) <= max_length:
+        return [(0, len(samples))]
+
+    intervals = librosa.effects.split(samples.astype(np.float32) / 32768.0, top_db=top_db)
+    # Candidate cut points: the middle of each silence between two non-silent intervals
+    cuts = [(previous_end + start) // 2 for (_, previous_end), (start, _) in zip(intervals[:-1], intervals[1:])]
+
+    segments = []
+    start = 0
+    last_cut = None
+    for cut in cuts + [len(samples)]:
+        if cut - start > max_length:
+            if last_cut is not None:
+                segments.append((start, last_cut))
+                start = last_cut
+            # Speech without a long enough pause is cut hard at the maximum length
+            while cut - start > max_length:
+                segments.append((start, start + max_length))
+                start += max_length
+        last_cut = cut
+    segments.append((start, len(samples)))
+    return [(segment_start, segment_end) for segment_start, segment_end in segments if segment_end > segment_start]
+
+
+def decode_pcm(pcm, sample_rate, vosk_model, block_seconds=BLOCK_SECONDS, should_stop=None):
+    """
+    Decodes 16-bit PCM audio with a new KaldiRecognizer.
+
+    Args:
+    - pcm (bytes or np.ndarray): 16-bit mono PCM audio.
+    - sample_rate (int): Sample rate of the audio.
+    - vosk_model: Vosk model for speech recognition.
+    - block_seconds (float): Audio passed to the recognizer per call.
+    - should_stop (callable or None): Checked before every block; decoding stops when it returns True.
+
+    Returns:
+    - str: Transcribed text.
+    """
+    return join_results(_recognize_pcm(pcm, sample_rate, vosk_model, block_seconds, should_stop=should_stop))
+
+
+def _recognize_pcm(pcm, sample_rate, vosk_model, block_seconds=BLOCK_SECONDS, words=False, should_stop=None):
+    data = memoryview(np.ascontiguousarray(pcm)).cast('B') if isinstance(pcm, np.ndarray) else memoryview(pcm)
+    rec = _new_recognizer(vosk_model, sample_rate, words)
+    return feed_recognizer(rec, data, max(1, int(sample_rate * block_seconds)) * 2, should_stop)
+
+
+def transcribe_long_file(audio_file, vosk_model, max_segment_seconds=MAX_SEGMENT_SECONDS,
+                         num_workers=SEGMENT_WORKERS, words=False, should_stop=None):
+    """
+    Long-file mode: cuts a recording at silences into bounded segments, decodes the segments concurrently
+    (each with its own recognizer on the shared model; Vosk releases the GIL while decoding) and merges the
+    texts back in order.
+
+    Args:
+    - audio_file (str): Path to the audio file (see read_pcm).
+    - vosk_model: Vosk model for speech recognition.
+    - max_segment_seconds (float): Maximum segment length.
+    - num_workers (int): Number of segments decoded at the same time.
+    - words (bool): Also return the utterances of every segment with word timings relative to the recording.
+    - should_stop (callable or None): Checked before every segment and every block; segments not started when it
+      returns True are skipped and running ones stop at their next block, so the result is then incomplete.
+
+    Returns:
+    - tuple: (merged transcription, list of segment dicts with 'start' and 'end' offsets in seconds and 'text',
+      plus 'utterances' (see parse_utterances) if words is True).
+    """
+    samples, sample_rate = read_pcm(audio_file)
+    segments = find_segments(samples, sample_rate, max_segment_seconds)
+
+    def recognize_segment(segment):
+        if should_stop is not None and should_stop():
+            return []
+        return _recognize_pcm(samples[segment[0]:segment[1]], sample_rate, vosk_model, words=words,
+                              should_stop=should_stop)
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        raw_results = list(executor.map(recognize_segment, segments))
+
+    texts = [join_results(raw) for raw in raw_results]
+    segment_results = [{'start': start / sample_rate, 'end': end / sample_rate, 'text': text}
+                       for (start, end), text in zip(segments, texts)]
+    if words:
+        for segment, raw in zip(segment_results, raw_results):
+            segment['utterances'] = parse_utterances(raw, offset=segment['start'])
+    return ' '.join(text for text in texts if text), segment_results
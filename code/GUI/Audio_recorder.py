@@ -11,6 +11,9 @@ class AudioRecorder(QWidget):
         self.init_ui()
         self.recording = False
         self.audio_file = 'temp_audio.wav'
+        self.sample_rate = 16000
+        self.stream = None
+        self.frames = []
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_waveform)
 
@@ -27,25 +30,31 @@ class AudioRecorder(QWidget):
         self.stop_button.clicked.connect(self.stop_recording)
 
     def start_recording(self):
+        # Capture audio with a callback-driven input stream until stop_recording (no blocking sd.wait)
         self.recording = True
         self.timer.start(50)  # Update waveform every 50ms
         self.recording_label.setText('Recording audio...')
 
-        duration = 10  # Record for 10 seconds (example)
-        fs = 16000  # Sample rate
-        self.recording = sd.rec(int(duration * fs), samplerate=fs, channels=1, dtype='int16')
-        sd.wait()
-
-        with wave.open(self.audio_file, 'wb') as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(fs)
-            wf.writeframes(self.recording.tobytes())
-
-        self.recording_label.setText('Audio recorded.')
+        self.frames = []
+        self.stream = sd.RawInputStream(samplerate=self.sample_rate, channels=1, dtype='int16',
+                                        callback=lambda indata, frames, time_info, status:
+                                        self.frames.append(bytes(indata)))
+        self.stream.start()
 
     def stop_recording(self):
         self.timer.stop()
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+            with wave.open(self.audio_file, 'wb') as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(self.sample_rate)
+                wf.writeframes(b''.join(self.frames))
+
+        self.recording = False
         self.recording_label.setText('Audio recording stopped.')
 
     def update_waveform(self):
@@ -0,0 +1,39 @@
+import queue
+from PyQt5.QtCore import QThread, pyqtSignal
+from Instrumentation import get_metrics
+
+
+class EntityTagger(QThread):
+    # (transcription run, [(file number, file name, transcription, entity spans)]) for every submitted batch
+    batch_tagged = pyqtSignal(int, list)
+
+    def __init__(self, entity_highlighter):
+        super().__init__()
+        self.entity_highlighter = entity_highlighter
+        self._batches = queue.Queue()  # (run, [(file number, file name, transcription)]) or None to stop
+
+    def submit(self, run, results):
+        # Called from the UI thread; batches are tagged one after another in the order they were submitted
+        self._batches.put((run, results))
+
+    def stop(self):
+        # The batches submitted before are still tagged, then the thread ends
+        self._batches.put(None)
+
+    def run(self):
+        # spaCy runs here, so a batch of long letters does not block the event loop of the UI thread
+        while True:
+            batch = self._batches.get()
+            if batch is None:
+                return
+            run, results = batch
+            texts = [transcription for _, _, transcription in results]
+            try:
+                with get_metrics().span('ner', texts=len(texts)):
+                    all_spans = self.entity_highlighter.entity_spans(texts)
+            except Exception as e:
+                # The transcriptions are still shown, without entity markup
+                print(f"Error in named entity recognition: {e}")
+                all_spans = [[] for _ in texts]
+            self.batch_tagged.emit(run, [(index, filename, transcription, spans) for
+                                         (index, filename, transcription), spans in zip(results, all_spans)])
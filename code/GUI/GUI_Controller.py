@@ -1,30 +1,65 @@
 import os
-import vosk
-import spacy
+import time
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QTextEdit,
-                             QVBoxLayout, QHBoxLayout, QWidget, QListWidget, QListWidgetItem,
-                             QAction, QFileDialog, QLineEdit)
-from PyQt5.QtCore import Qt, QUrl, pyqtSignal, QObject
-from PyQt5.QtGui import QFont, QTextCharFormat, QTextCursor, QColor, QIcon, QPixmap
+                             QVBoxLayout, QHBoxLayout, QWidget, QAction, QFileDialog)
+from PyQt5.QtCore import Qt, QUrl, pyqtSignal, QObject, QTimer
+from PyQt5.QtGui import QTextCharFormat, QTextCursor, QColor, QIcon, QPixmap
 from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
 # ----------------------------------------------------------------------------------------------------------------------
 from GUI.GUI_Transcriber import TranscriptionWorker
-from GUI.Audio_recorder import AudioRecorder
 from GUI.Recording_Popup import RecordingPopup
+from GUI.Live_transcriber import LiveTranscriber, MicrophoneSource
+from GUI.Model_loader import ModelLoader
+from GUI.Entity_tagger import EntityTagger
+from GUI.Transcript_list import TranscriptListModel
+from PostProcess.EntityHighlighting import EntityHighlighter
+from TranscriptionCache import TranscriptionCache
+from Instrumentation import get_metrics
+from config import load_config
+
+TRANSCRIPTION_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))  # Files decoded at the same time
+NER_BATCH_SIZE = 16  # Finished files sent through spaCy together
+NER_FLUSH_MS = 200  # Longest time a finished file waits for others before its batch is sent to NER
 
 
 class GUI_Controller(QObject):
     transcriptionUpdated = pyqtSignal(str)
+    modelsReady = pyqtSignal()  # Emitted once the Vosk and spaCy models are loaded
+
+    REQUIRED_MODELS = ('vosk', 'spacy')  # Models gating the transcription buttons
 
     def __init__(self, main_window):
         super().__init__()
+        self.created_at = time.perf_counter()
         self.main_window = main_window
-        self.audio_recorder = AudioRecorder()
+        self.config = load_config()
+        self.vosk_model = None
+        self.nlp = None
+        self.entity_highlighter = None
+        self.entity_tagger = None  # Runs the batched NER in a background thread, see flush_transcription_results
+        self.pending_results = []  # Finished file transcriptions waiting for batched NER
+        self.transcription_run = 0  # Counts file transcriptions, so tagged batches of an earlier run are dropped
+        self.ner_flush_timer = QTimer(self)
+        self.ner_flush_timer.setSingleShot(True)
+        self.ner_flush_timer.setInterval(NER_FLUSH_MS)
+        self.ner_flush_timer.timeout.connect(self.flush_transcription_results)
+        self.loaded_models = {}  # Model name -> seconds spent loading it
+        self.ready_time = None  # Seconds from controller creation until the required models were loaded
         self.recording_popup = RecordingPopup(self)
         self.recording = False
         self.selected_files = []
         self.editing_mode = False
+        self.transcription_worker = None
+        self.transcription_cache = None  # Opened on the first file transcription, see get_transcription_cache
+        self.live_transcriber = None
+        self.live_audio_source_factory = MicrophoneSource  # Replaceable, e.g. by a WavFileSource in tests
+        self.metrics_server = self.start_metrics_server()
+
+        # File transcriptions are kept in a compact store behind a list model; the view renders visible rows only
+        self.transcript_model = TranscriptListModel(self)
+        self.main_window.transcription_list.setModel(self.transcript_model)
+        self.main_window.transcription_list.itemDelegate().closeEditor.connect(self.finish_editing)
 
         # Connect signal to slot
         self.transcriptionUpdated.connect(self.update_live_transcription)
@@ -36,19 +71,81 @@ class GUI_Controller(QObject):
         # Disable buttons initially
         self.disable_buttons()
 
-        # Preload transcription model
+        # Load the Vosk, spaCy and Silero models in the background
         self.load_transcription_model()
 
-        # Load spaCy model for named entity recognition (NER)
-        self.nlp = spacy.load("de_core_news_sm")  # Adjust to the appropriate language model
+    def start_metrics_server(self):
+        # Serve Prometheus metrics if a port is configured
+        port = int(self.config.get('metrics_port') or 0)
+        if not port:
+            return None
+        try:
+            return get_metrics().serve_prometheus(port)
+        except OSError as e:
+            print(f"Metrics endpoint disabled: {e}")
+            return None
+
+    def is_remote(self):
+        # True if files are transcribed by a TranscriptionServer instead of a local Vosk model
+        return bool(self.config.get('transcription_server'))
+
+    def is_ready(self):
+        return all(name in self.loaded_models for name in self.REQUIRED_MODELS)
 
     def load_transcription_model(self):
-        try:
-            # model_path = r'path/to/the/model'
-            model_path = r'C:\Users\ermix\OneDrive\Desktop\RWTH\I_SEM\ML-PRO\speech-to-text\Model\vosk-model-de-0.21'
-            self.vosk_model = vosk.Model(model_path)
-        except Exception as e:
-            self.main_window.error_label.setText(f'Error initializing Vosk model: {e}')
+        # Transcription buttons stay disabled until the models are loaded
+        self.main_window.open_file_button.setEnabled(False)
+        self.main_window.record_audio_button.setEnabled(False)
+        self.main_window.error_label.setText('Loading models...')
+
+        self.model_loader = ModelLoader(self.config)
+        self.model_loader.model_loaded.connect(self.handle_model_loaded)
+        self.model_loader.model_failed.connect(self.handle_model_failed)
+        self.model_loader.start()
+
+    def handle_model_loaded(self, name, model, seconds):
+        # Called in the UI thread for each model loaded by the ModelLoader
+        if name == 'vosk':
+            self.vosk_model = model
+        elif name == 'spacy':
+            self.nlp = model
+            self.entity_highlighter = EntityHighlighter(model)
+            self.start_entity_tagger()
+        self.loaded_models[name] = seconds
+        get_metrics().observe('model_load_seconds', seconds, model=name)
+
+        if self.is_ready() and self.ready_time is None:
+            self.ready_time = time.perf_counter() - self.created_at
+            self.main_window.open_file_button.setEnabled(True)
+            # Live transcription streams into a local recognizer, so it needs the local model
+            self.main_window.record_audio_button.setEnabled(not self.is_remote())
+            if self.is_remote():
+                self.main_window.error_label.setText(
+                    f"Using transcription server {self.config['transcription_server']}")
+            else:
+                self.main_window.error_label.clear()
+            self.modelsReady.emit()
+
+    def start_entity_tagger(self):
+        # Tagged batches come back to the UI thread through the batch_tagged signal
+        self.entity_tagger = EntityTagger(self.entity_highlighter)
+        self.entity_tagger.batch_tagged.connect(self.append_tagged_results)
+        QApplication.instance().aboutToQuit.connect(self.stop_entity_tagger)
+        self.entity_tagger.start()
+
+    def stop_entity_tagger(self):
+        if self.entity_tagger is not None:
+            self.entity_tagger.stop()
+            self.entity_tagger.wait()
+
+    def handle_model_failed(self, name, error):
+        if name == 'vosk' and self.is_remote():
+            self.main_window.error_label.setText(
+                f"Transcription server {self.config['transcription_server']} not reachable: {error}")
+        elif name == 'vosk':
+            self.main_window.error_label.setText(f'Error initializing Vosk model: {error}')
+        else:
+            self.main_window.error_label.setText(f'Error loading {name} model: {error}')
 
     def disable_buttons(self):
         # Disable all relevant buttons
@@ -61,15 +158,15 @@ class GUI_Controller(QObject):
         # Enable buttons based on current state
         self.main_window.save_live_transcription_button.setEnabled(bool(self.main_window.live_transcription_edit.toPlainText()))
         self.main_window.play_files_button.setEnabled(bool(self.selected_files))
-        self.main_window.save_file_transcription_button.setEnabled(bool(self.main_window.transcription_list.count() > 0))
-        self.main_window.edit_transcription_button.setEnabled(bool(self.main_window.transcription_list.count() > 0
-                                                                   and not self.editing_mode))
+        self.main_window.save_file_transcription_button.setEnabled(self.transcript_model.rowCount() > 0)
+        self.main_window.edit_transcription_button.setEnabled(self.transcript_model.rowCount() > 0
+                                                              and not self.editing_mode)
 
     def open_file(self):
         # Open file dialog to select audio files
         try:
             file_paths, _ = QFileDialog.getOpenFileNames(self.main_window, 'Select Files', '',
-                                                         'Audio Files (*.wav *.mp3)')
+                                                         'Audio Files (*.wav *.mp3 *.flac)')
             if file_paths:
                 self.selected_files = file_paths
                 self.transcribe_audio_files(file_paths)
@@ -82,47 +179,97 @@ class GUI_Controller(QObject):
             self.main_window.error_label.setText(f"Error selecting files: {e}")
 
     def transcribe_audio_files(self, audio_files):
-        # Transcribe selected audio files
+        # Transcribe selected audio files in the background; results are added as each file finishes
         try:
-            self.main_window.transcription_list.clear()
+            self.transcript_model.clear()
+            self.pending_results = []
+            self.transcription_run += 1
             self.main_window.error_label.setText(f'Transcribing {len(audio_files)} files...')
             self.main_window.error_label.setStyleSheet("color: white;")
-            self.main_window.repaint()
-
-            transcription_worker = TranscriptionWorker(audio_files, self.vosk_model)
-            transcription_worker.run()
-
-            results = transcription_worker.get_results()
-            self.handle_file_transcription_result(results)
+            self.main_window.transcription_progress.setRange(0, len(audio_files))
+            self.main_window.transcription_progress.setValue(0)
+            self.main_window.transcription_progress.setVisible(True)
+            self.main_window.cancel_transcription_button.setEnabled(True)
+
+            # Long-file mode when max_segment_seconds is set: segments of a file are decoded concurrently
+            max_segment_seconds = float(self.config.get('max_segment_seconds') or 0) or None
+            self.transcription_worker = TranscriptionWorker(audio_files, self.vosk_model,
+                                                            max_workers=TRANSCRIPTION_WORKERS,
+                                                            max_segment_seconds=max_segment_seconds,
+                                                            segment_workers=int(self.config['segment_workers']),
+                                                            transcription_cache=self.get_transcription_cache(),
+                                                            model_path=None if self.is_remote()
+                                                            else self.config['vosk_model_path'])
+            self.transcription_worker.file_result_ready.connect(self.handle_file_transcription_result)
+            self.transcription_worker.progress.connect(self.update_transcription_progress)
+            self.transcription_worker.finished.connect(self.finish_file_transcription)
+            self.transcription_worker.start()
         except Exception as e:
             self.main_window.error_label.setText(f"Error transcribing audio files: {e}")
 
-    def handle_file_transcription_result(self, results):
-        # Handle transcription results and update UI
-        self.main_window.transcription_list.clear()
-        for index, (filename, transcription) in enumerate(results, start=1):
-            doc = self.nlp(transcription)
-            highlighted_transcription = self.highlight_entities(doc)
-
-            # Create QListWidgetItem with formatted text
-            item_text = f"File {index}: {filename}\n{highlighted_transcription}"
-            item = QListWidgetItem(item_text)
-            item.setFont(QFont("Arial", 10))
-            self.main_window.transcription_list.addItem(item)
-
+    def get_transcription_cache(self):
+        # Files transcribed before with the same model are read from the persistent cache
+        cache_dir = self.config.get('transcription_cache_dir')
+        if self.transcription_cache is None and cache_dir:
+            try:
+                self.transcription_cache = TranscriptionCache(cache_dir)
+            except Exception as e:
+                print(f"Transcription cache disabled: {e}")
+        return self.transcription_cache
+
+    def cancel_transcription(self):
+        # Cancel the running file transcription; finished files stay in the list
+        if self.transcription_worker is not None and self.transcription_worker.isRunning():
+            self.transcription_worker.cancel()
+            self.main_window.cancel_transcription_button.setEnabled(False)
+            self.main_window.error_label.setText('Cancelling transcription...')
+
+    def update_transcription_progress(self, finished, total):
+        # Update progress bar and status text
+        self.main_window.transcription_progress.setValue(finished)
+        self.main_window.error_label.setText(f'Transcribed {finished} of {total} files...')
+
+    def handle_file_transcription_result(self, index, filename, transcription):
+        # Queue the result of one file; queued results go through NER together (see flush_transcription_results)
+        self.pending_results.append((index, filename, transcription))
+        if len(self.pending_results) >= NER_BATCH_SIZE:
+            self.flush_transcription_results()
+        elif not self.ner_flush_timer.isActive():
+            self.ner_flush_timer.start()
+
+    def flush_transcription_results(self):
+        # Send all queued results as one batch to the NER thread; they are shown by append_tagged_results
+        self.ner_flush_timer.stop()
+        if not self.pending_results:
+            return
+        pending, self.pending_results = self.pending_results, []
+        self.entity_tagger.submit(self.transcription_run, pending)
+
+    def append_tagged_results(self, run, results):
+        # Called in the UI thread for each batch tagged by the EntityTagger; appended to the list in one insertion
+        if run != self.transcription_run:
+            return  # The list was cleared for a newer transcription in the meantime
+
+        # The entity markup is applied by the model when a row is displayed or saved
+        self.transcript_model.append_results(results)
         self.main_window.transcription_list.scrollToBottom()
-        self.main_window.error_label.setText('File transcription complete.')
         self.enable_buttons()
 
-    def highlight_entities(self, doc):
-        # Highlight entities in the transcribed text
-        formatted_text = ""
-        for token in doc:
-            if token.ent_type_:  # Check if the token has an entity type
-                formatted_text += f"[!|{token.text}|!]{token.whitespace_}"
-            else:
-                formatted_text += f"{token.text}{token.whitespace_}"
-        return formatted_text.strip()
+    def finish_file_transcription(self):
+        # Called in the UI thread once the worker thread has finished
+        self.flush_transcription_results()
+        cancelled = self.transcription_worker.is_cancelled()
+        self.main_window.transcription_progress.setVisible(False)
+        self.main_window.cancel_transcription_button.setEnabled(False)
+        self.main_window.error_label.setText('File transcription cancelled.' if cancelled
+                                             else 'File transcription complete.')
+        self.transcription_worker = None
+        self.enable_buttons()
+        if self.config.get('trace_file'):
+            try:
+                get_metrics().export_trace(self.config['trace_file'])
+            except OSError as e:
+                print(f"Error writing trace file: {e}")
 
     def play_selected_files(self):
         # Play selected audio files
@@ -145,17 +292,58 @@ class GUI_Controller(QObject):
             self.recording_popup.stop_recording()
 
     def start_recording(self):
-        # Start recording audio
+        # Start streaming audio into the live transcriber; results arrive through transcriptionUpdated
+        if self.live_transcriber is not None:
+            return  # The previous recording is still being transcribed, see finish_live_transcription
         self.recording = True
         self.main_window.record_audio_button.setEnabled(False)
         self.main_window.error_label.setText('Recording audio...')
         self.main_window.error_label.setStyleSheet("color: black; font-weight: normal;")
+        try:
+            self.live_transcriber = LiveTranscriber(self.vosk_model, self.live_audio_source_factory())
+            self.live_transcriber.text_updated.connect(self.transcriptionUpdated.emit)
+            self.live_transcriber.finished.connect(self.finish_live_transcription)
+            self.live_transcriber.start()
+        except Exception as e:
+            self.live_transcriber = None
+            self.main_window.error_label.setText(f"Error starting live transcription: {e}")
         self.enable_buttons()
 
     def stop_recording(self):
-        # Stop recording audio
+        # Stop recording audio; the buffered audio is still transcribed, so a new recording can only be started
+        # once the live transcriber has finished
         self.recording = False
-        self.main_window.record_audio_button.setEnabled(True)
+        if self.live_transcriber is not None:
+            self.live_transcriber.stop()
+            self.main_window.error_label.setText('Transcribing the rest of the recording...')
+        else:
+            self.enable_record_buttons()
+
+    def enable_record_buttons(self):
+        # Live transcription streams into a local recognizer, so it needs the local model
+        self.main_window.record_audio_button.setEnabled(not self.is_remote())
+        self.recording_popup.start_recording_button.setEnabled(True)
+
+    def save_and_close_recording(self):
+        # Called by the recording popup when it is closed
+        self.stop_recording()
+
+    def finish_live_transcription(self):
+        # Show the measured latencies once the live transcriber that emitted finished has decoded its last audio
+        live_transcriber = self.sender()
+        metrics = live_transcriber.metrics()
+        if metrics['time_to_first_partial'] is not None:
+            self.main_window.error_label.setText(
+                f"Live transcription: first partial after {metrics['time_to_first_partial']:.2f} s, "
+                f"final results {metrics['mean_final_latency'] or 0:.2f} s after end of speech")
+        else:
+            self.main_window.error_label.clear()
+        if live_transcriber is self.live_transcriber:
+            self.live_transcriber = None
+        live_transcriber.deleteLater()
+        if not self.recording:
+            self.enable_record_buttons()
+        self.enable_buttons()
 
     def save_live_transcription(self):
         # Save live transcription to a file
@@ -166,57 +354,20 @@ class GUI_Controller(QObject):
 
             self.main_window.live_transcription_edit.clear()
             self.main_window.save_live_transcription_button.setEnabled(False)
-            self.main_window.record_audio_button.setEnabled(True)
+            self.main_window.record_audio_button.setEnabled(not self.is_remote() and self.live_transcriber is None)
             self.main_window.play_files_button.setEnabled(False)
             self.main_window.error_label.setText('Live transcription saved.')
 
     def save_file_transcription(self):
-        # Save file transcriptions to individual files
-        items = self.main_window.transcription_list.count()
-        if items > 0:
-            processed_dir = 'PROCESSED_TRANSCRIPTION'
-            if not os.path.exists(processed_dir):
-                os.makedirs(processed_dir)
-
-            for i in range(items):
-                item = self.main_window.transcription_list.item(i)
-                text = item.text()
-
-                colon_split = text.split(':')
-                if len(colon_split) < 2:
-                    continue
-
-                transcription_part = colon_split[-1].strip()
-
-                parts = transcription_part.split('.mp3')
-                if len(parts) < 2:
-                    parts = transcription_part.split('.wav')
-                if len(parts) < 2:
-                    continue
-
-                file_name_part = parts[0]
-                base_name_parts = file_name_part.split('_')
-
-                base_name = None
-                for part in base_name_parts:
-                    if any(char.isdigit() for char in part):
-                        break
-                    if base_name is None:
-                        base_name = part
-                    else:
-                        base_name += '_' + part
-
-                if base_name is None:
-                    with open('no_root_name.txt', mode='a', encoding='utf-8') as no_root_file:
-                        no_root_file.write(file_name_part + '\n')
-                    continue
-
-                file_path = os.path.join(processed_dir, f"{base_name}.txt")
-
-                with open(file_path, mode='a', encoding='utf-8') as file:
-                    file.write(f"{transcription_part}\n")
-
-            self.main_window.transcription_list.clear()
+        # Append the file transcriptions to PROCESSED_TRANSCRIPTION/<base name>.txt, straight from the result store
+        if self.transcript_model.rowCount() > 0:
+            try:
+                self.transcript_model.store.save('PROCESSED_TRANSCRIPTION')
+            except OSError as e:
+                self.main_window.error_label.setText(f"Error saving file transcriptions: {e}")
+                return
+
+            self.transcript_model.clear()
             self.main_window.save_file_transcription_button.setEnabled(False)
             self.main_window.open_file_button.setEnabled(True)
             self.main_window.play_files_button.setEnabled(False)
@@ -225,22 +376,15 @@ class GUI_Controller(QObject):
             self.main_window.error_label.setText('File transcriptions saved.')
 
     def correct_transcription(self):
-        # Enable editing of selected transcription item
-        selected_item = self.main_window.transcription_list.currentItem()
-        if selected_item and not self.editing_mode:
-            edit_line = QLineEdit(selected_item.text())
-            self.main_window.transcription_list.setItemWidget(selected_item, edit_line)
-            edit_line.returnPressed.connect(lambda: self.finish_editing(selected_item, edit_line))
+        # Open the editor of the selected transcription; Return commits the edit to the store
+        index = self.main_window.transcription_list.currentIndex()
+        if index.isValid() and not self.editing_mode:
+            self.main_window.transcription_list.edit(index)
             self.editing_mode = True
             self.update_edit_button()
 
-    def finish_editing(self, item, line_edit):
-        # Finish editing of transcription item
-        new_text = line_edit.text()
-        self.main_window.transcription_list.setItemWidget(item, None)
-        item.setText(new_text)
-        item.setFont(QFont("Arial", 10))
-        item.setFlags(item.flags() & ~Qt.ItemIsSelectable & ~Qt.ItemIsEditable)
+    def finish_editing(self, editor=None, hint=None):
+        # Called when the item editor closes, whether the edit was committed or not
         self.editing_mode = False
         self.update_edit_button()
 
@@ -1,56 +1,147 @@
 import os
-import json
-import vosk
-import wave
-from silero import silero_te
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from PyQt5.QtCore import QThread, pyqtSignal
+from PostProcess.TextEnhancement import get_text_enhancer, BATCH_SETTINGS
+from Decoding import decode_audio, transcribe_long_file, SEGMENT_WORKERS
+from Instrumentation import get_metrics, audio_duration
+from TranscriptionServer import TranscriptionClient
+
+
+class TranscriptionCancelled(Exception):
+    pass
 
 
 class TranscriptionWorker(QThread):
     result_ready = pyqtSignal(list)  # Define the signal for sending results
+    file_result_ready = pyqtSignal(int, str, str)  # (file number, file name, transcription) as soon as a file is done
+    progress = pyqtSignal(int, int)  # (finished files, total files)
 
-    def __init__(self, audio_files, vosk_model):
+    def __init__(self, audio_files, vosk_model, max_workers=2, max_segment_seconds=None, transcription_cache=None,
+                 model_path=None, segment_workers=SEGMENT_WORKERS):
         super().__init__()
         self.audio_files = audio_files
         self.vosk_model = vosk_model
+        self.max_workers = max_workers  # Files decoded at the same time (Vosk releases the GIL while decoding)
+        self.max_segment_seconds = max_segment_seconds  # Long-file mode: decode silence-cut segments concurrently
+        self.segment_workers = segment_workers  # Segments of one file decoded at the same time in long-file mode
+        self.transcription_cache = transcription_cache  # Optional TranscriptionCache, used with model_path
+        self.model_path = model_path  # Identifies the Vosk model in the transcription cache
         self.results = []
+        self._cancelled = threading.Event()
 
     def run(self):
+        # Runs in the worker thread once start() is called; results reach the UI thread through signals
+        total = len(self.audio_files)
+        finished = 0
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
         try:
-            for audio_file in self.audio_files:
-                result = self.post_processing(self.transcribe_audio_vosk(audio_file, self.vosk_model))
-                self.results.append((os.path.basename(audio_file), result))
-        except Exception as e:
-            self.results.append(("Error", f"Error: {str(e)}"))
+            pending = {executor.submit(self.decode_file, audio_file): index
+                       for index, audio_file in enumerate(self.audio_files, start=1)}
+            while pending and not self._cancelled.is_set():
+                # The files whose decoding finished together are post-processed in one batch
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                decoded = sorted((pending.pop(future),) + future.result() for future in done)
+                for index, filename, result in self.post_process_files(decoded):
+                    if self._cancelled.is_set():
+                        break
+                    self.results.append((filename, result))
+                    finished += 1
+                    self.file_result_ready.emit(index, filename, result)
+                    self.progress.emit(finished, total)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
         self.result_ready.emit(self.results)  # Emit the results when done
 
-    def transcribe_audio_vosk(self, audio_file, vosk_model):
-        wf = wave.open(audio_file, 'rb')  # Open the audio file using wave module
-        sample_rate = wf.getframerate()  # Get the sample rate of the audio file
-        chunk_size = int(sample_rate * 0.1)  # Read 100 ms of audio data at a time
-        rec = vosk.KaldiRecognizer(vosk_model, sample_rate)
+    def decode_file(self, audio_file):
+        """
+        Decodes one file, without post-processing.
+
+        Returns:
+        - tuple: (audio file, file name, raw transcription or None, error message or None, start time).
+        """
+        filename = os.path.basename(audio_file)
+        start = time.perf_counter()
+        with get_metrics().span('file', filename=filename):
+            try:
+                return audio_file, filename, self.transcribe_cached(audio_file, self.vosk_model), None, start
+            except TranscriptionCancelled:
+                return audio_file, filename, "", None, start
+            except Exception as e:
+                get_metrics().count('errors_total', stage='transcribe')
+                return audio_file, filename, None, f"Error: {str(e)}", start
+
+    def post_process_files(self, decoded):
+        """
+        Post-processes the raw transcriptions of a group of decoded files together (see post_processing_batch).
+
+        Args:
+        - decoded (list): (file number, audio file, file name, raw transcription, error message, start time) tuples.
+
+        Returns:
+        - list: (file number, file name, transcription or error message) tuples, in the order of decoded.
+        """
+        metrics = get_metrics()
+        texts = [text for _, _, _, text, error, _ in decoded if error is None and text]
+        try:
+            processed = iter(self.post_processing_batch(texts) if texts else [])
+            post_error = None
+        except Exception as e:
+            metrics.count('errors_total', stage='postprocess')
+            processed = iter(())
+            post_error = f"Error: {str(e)}"
+
         results = []
+        for index, audio_file, filename, text, error, start in decoded:
+            if error is None and text:
+                error = post_error
+                text = next(processed, text) if post_error is None else None
+            if metrics.enabled:
+                metrics.record_file('gui', audio_duration(audio_file), time.perf_counter() - start,
+                                    error=error is not None)
+            results.append((index, filename, error if error is not None else text))
+        return results
+
+    def cancel(self):
+        # Stop after the chunks being decoded; files not started yet are skipped
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def transcribe_cached(self, audio_file, vosk_model):
+        # Unchanged files decoded before with the same model and settings are read from the cache
+        with get_metrics().span('decode'):
+            if self.transcription_cache is None or self.model_path is None:
+                return self.transcribe_audio_vosk(audio_file, vosk_model)
+            settings = {'decoder': 'vosk', 'max_segment_seconds': self.max_segment_seconds}
+            return self.transcription_cache.decode(audio_file, self.model_path, settings,
+                                                   lambda: self.transcribe_audio_vosk(audio_file, vosk_model))
+
+    def transcribe_audio_vosk(self, audio_file, vosk_model):
+        if isinstance(vosk_model, TranscriptionClient):  # Remote backend: the server decodes the file
+            result = vosk_model.transcribe(audio_file, should_stop=self._cancelled.is_set)
+            if result is None:
+                raise TranscriptionCancelled()
+            return result['text']
+        if self.max_segment_seconds:
+            transcription = transcribe_long_file(audio_file, vosk_model, self.max_segment_seconds,
+                                                 self.segment_workers, should_stop=self._cancelled.is_set)[0]
+        else:
+            transcription = decode_audio(audio_file, vosk_model, should_stop=self._cancelled.is_set)
+        if self._cancelled.is_set():
+            raise TranscriptionCancelled()
+        return transcription
 
-        while True:
-            data = wf.readframes(chunk_size)
-            if len(data) == 0:
-                break
-            if rec.AcceptWaveform(data):
-                result = rec.Result()
-                results.append(json.loads(result))
-
-        result = rec.FinalResult()
-        if result:
-            results.append(json.loads(result))
-
-        wf.close()  # Close the audio file after processing
-        return ' '.join([res['text'] for res in results])
-
-    def post_processing(self, text):
-        # Applying siler model for capital letters
-        _, _, _, _, apply_te_func = silero_te()
-        return apply_te_func(text=text, lan='de')
+    def post_processing_batch(self, texts):
+        # Applying the shared silero model to all transcripts together, in chunked batches
+        with get_metrics().span('postprocess_batch', texts=len(texts)):
+            if self.transcription_cache is not None:
+                return self.transcription_cache.postprocess(texts, f'silero_te/de/{BATCH_SETTINGS}',
+                                                            get_text_enhancer('de').enhance_batch)
+            return get_text_enhancer('de').enhance_batch(texts)
 
     def get_results(self):
         return self.results
@@ -0,0 +1,223 @@
+import json
+import time
+import wave
+import threading
+import vosk
+from PyQt5.QtCore import QThread, pyqtSignal
+
+LIVE_SAMPLE_RATE = 16000  # Sample rate requested from the microphone
+BLOCK_SECONDS = 0.1  # Audio delivered per callback / fed to the recognizer per step
+
+
+class RingBuffer:
+    """
+    Bounded, thread-safe byte ring buffer between an audio callback (producer) and the recognizer (consumer).
+    When the consumer falls behind by more than the capacity, the oldest audio is dropped and counted.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.dropped_bytes = 0
+        self.closed = False
+        self._buffer = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def write(self, data):
+        data = bytes(data)
+        with self._condition:
+            if len(data) > self.capacity:
+                self.dropped_bytes += len(data) - self.capacity
+                data = data[-self.capacity:]
+            overflow = self._size + len(data) - self.capacity
+            if overflow > 0:
+                self._start = (self._start + overflow) % self.capacity
+                self._size -= overflow
+                self.dropped_bytes += overflow
+
+            end = (self._start + self._size) % self.capacity
+            first = min(len(data), self.capacity - end)
+            self._buffer[end:end + first] = data[:first]
+            self._buffer[:len(data) - first] = data[first:]
+            self._size += len(data)
+            self._condition.notify_all()
+
+    def read(self, max_bytes, timeout=None):
+        # Returns up to max_bytes, waiting up to timeout for data; b'' once closed and drained (or on timeout)
+        with self._condition:
+            if not self._size and not self.closed:
+                self._condition.wait(timeout)
+            count = min(max_bytes, self._size)
+            first = min(count, self.capacity - self._start)
+            data = bytes(self._buffer[self._start:self._start + first]) + bytes(self._buffer[:count - first])
+            self._start = (self._start + count) % self.capacity
+            self._size -= count
+            return data
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def __len__(self):
+        return self._size
+
+
+class MicrophoneSource:
+    """Live audio source: a callback-driven sounddevice input stream of 16-bit mono PCM."""
+
+    def __init__(self, sample_rate=LIVE_SAMPLE_RATE, block_seconds=BLOCK_SECONDS):
+        self.sample_rate = sample_rate
+        self.block_seconds = block_seconds
+        self.stream = None
+
+    def start(self, ring_buffer):
+        import sounddevice as sd
+
+        def callback(indata, frames, time_info, status):
+            ring_buffer.write(indata)
+
+        self.stream = sd.RawInputStream(samplerate=self.sample_rate, channels=1, dtype='int16',
+                                        blocksize=int(self.sample_rate * self.block_seconds), callback=callback)
+        self.stream.start()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+
+class WavFileSource:
+    """Audio source replaying a 16-bit mono WAV file as a fake microphone (e.g. for tests and benchmarks)."""
+
+    def __init__(self, audio_file, realtime=True, block_seconds=BLOCK_SECONDS):
+        self.audio_file = audio_file
+        self.realtime = realtime
+        self.block_seconds = block_seconds
+        with wave.open(audio_file, 'rb') as wf:
+            self.sample_rate = wf.getframerate()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, ring_buffer):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._replay, args=(ring_buffer,), daemon=True)
+        self._thread.start()
+
+    def _replay(self, ring_buffer):
+        with wave.open(self.audio_file, 'rb') as wf:
+            frames_per_block = int(self.sample_rate * self.block_seconds)
+            next_time = time.perf_counter()
+            while not self._stop.is_set():
+                data = wf.readframes(frames_per_block)
+                if not data:
+                    break
+                if self.realtime:
+                    # Deliver each block when a microphone would have delivered it
+                    next_time += self.block_seconds
+                    time.sleep(max(0.0, next_time - time.perf_counter()))
+                ring_buffer.write(data)
+        ring_buffer.close()  # End of the file is the end of the stream
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class LiveTranscriber(QThread):
+    partial_result = pyqtSignal(str)  # Current hypothesis of the utterance being spoken
+    final_result = pyqtSignal(str)  # Text of a finished utterance
+    text_updated = pyqtSignal(str)  # Whole live transcript (finished utterances + current partial)
+
+    def __init__(self, vosk_model, audio_source, buffer_seconds=30):
+        """
+        Streams audio from audio_source through a ring buffer into a KaldiRecognizer and emits partial and final
+        results while audio is still arriving.
+
+        Args:
+        - vosk_model: Vosk model for speech recognition.
+        - audio_source: MicrophoneSource, WavFileSource or any object with sample_rate, start(ring_buffer), stop().
+        - buffer_seconds (float): Capacity of the ring buffer.
+        """
+        super().__init__()
+        self.vosk_model = vosk_model
+        self.audio_source = audio_source
+        self.ring_buffer = RingBuffer(int(audio_source.sample_rate * buffer_seconds) * 2)
+        self.final_texts = []
+        self.time_to_first_partial = None  # Seconds from start until the first non-empty partial result
+        self.final_latencies = []  # Seconds from the end of the last word of an utterance until its final result
+        self._stream_start = None
+        self._last_partial = ''
+        self._last_partial_time = None
+
+    def run(self):
+        sample_rate = self.audio_source.sample_rate
+        rec = vosk.KaldiRecognizer(self.vosk_model, sample_rate)
+        rec.SetWords(True)  # Word end times are needed for the end-of-speech latency
+        block_bytes = int(sample_rate * BLOCK_SECONDS) * 2
+
+        self._stream_start = time.perf_counter()
+        self.audio_source.start(self.ring_buffer)
+        while True:
+            data = self.ring_buffer.read(block_bytes, timeout=BLOCK_SECONDS)
+            if not data:
+                if self.ring_buffer.closed:
+                    break
+                continue
+            if rec.AcceptWaveform(data):
+                self._handle_final(rec.Result())
+            else:
+                self._handle_partial(json.loads(rec.PartialResult()).get('partial', ''))
+        self._handle_final(rec.FinalResult())
+
+    def stop(self):
+        # Stop capturing; audio already buffered is still decoded before run() returns
+        self.audio_source.stop()
+        self.ring_buffer.close()
+
+    def _handle_partial(self, partial):
+        if not partial or partial == self._last_partial:
+            return
+        now = time.perf_counter()
+        if self.time_to_first_partial is None:
+            self.time_to_first_partial = now - self._stream_start
+        self._last_partial = partial
+        self._last_partial_time = now
+        self.partial_result.emit(partial)
+        self.text_updated.emit(self.transcript())
+
+    def _handle_final(self, result_json):
+        result = json.loads(result_json)
+        text = result.get('text', '')
+        if not text:
+            return
+        now = time.perf_counter()
+        words = result.get('result')
+        if words:
+            # Audio time maps to wall-clock time because sources deliver audio in real time
+            speech_end = self._stream_start + words[-1]['end']
+        else:
+            speech_end = self._last_partial_time or now
+        self.final_latencies.append(max(0.0, now - speech_end))
+
+        self.final_texts.append(text)
+        self._last_partial = ''
+        self.final_result.emit(text)
+        self.text_updated.emit(self.transcript())
+
+    def transcript(self):
+        return ' '.join(self.final_texts + ([self._last_partial] if self._last_partial else []))
+
+    def metrics(self):
+        latencies = self.final_latencies
+        return {
+            'time_to_first_partial': self.time_to_first_partial,
+            'mean_final_latency': sum(latencies) / len(latencies) if latencies else None,
+            'max_final_latency': max(latencies) if latencies else None,
+            'utterances': len(self.final_texts),
+            'dropped_seconds': self.ring_buffer.dropped_bytes / 2 / self.audio_source.sample_rate,
+        }
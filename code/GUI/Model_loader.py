@@ -0,0 +1,46 @@
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class ModelLoader(QThread):
+    model_loaded = pyqtSignal(str, object, float)  # (model name, model, seconds spent loading)
+    model_failed = pyqtSignal(str, str)  # (model name, error message)
+
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+
+    def run(self):
+        # Heavy libraries are imported here, in the background thread, so the main window can appear first
+        self.load('vosk', self.load_vosk_model)
+        self.load('spacy', self.load_spacy_model)
+        self.load('silero', self.warm_up_text_enhancer)
+
+    def load(self, name, loader):
+        start = time.perf_counter()
+        try:
+            model = loader()
+        except Exception as e:
+            self.model_failed.emit(name, str(e))
+            return
+        self.model_loaded.emit(name, model, time.perf_counter() - start)
+
+    def load_vosk_model(self):
+        if self.config.get('transcription_server'):
+            # Remote backend: the server holds the model; only check that it answers
+            from TranscriptionServer import TranscriptionClient
+            client = TranscriptionClient(self.config['transcription_server'])
+            client.health()
+            return client
+        import vosk
+        return vosk.Model(self.config['vosk_model_path'])
+
+    def load_spacy_model(self):
+        import spacy
+        return spacy.load(self.config['spacy_model'])
+
+    def warm_up_text_enhancer(self):
+        from PostProcess.TextEnhancement import get_text_enhancer
+        text_enhancer = get_text_enhancer(self.config['language'])
+        text_enhancer.warm_up()
+        return text_enhancer
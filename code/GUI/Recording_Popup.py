@@ -49,13 +49,14 @@ class RecordingPopup(QDialog):
         self.save_button.setEnabled(False)
 
     def stop_recording(self):
-        # Stop recording and timer
-        self.controller.stop_recording()
+        # Stop recording and timer; Start is enabled again by the controller once the rest of the recording
+        # is transcribed
         self.timer.stop()
         self.timer_running = False
-        self.start_recording_button.setEnabled(True)
+        self.start_recording_button.setEnabled(False)
         self.stop_recording_button.setEnabled(False)
         self.save_button.setEnabled(True)
+        self.controller.stop_recording()
 
     def save_and_close(self):
         # Save recording and close the dialog
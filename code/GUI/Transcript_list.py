@@ -0,0 +1,195 @@
+import os
+from array import array
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from PyQt5.QtGui import QFont
+from PostProcess.EntityHighlighting import apply_markup
+
+PREVIEW_CHARS = 300  # Characters of a transcript rendered in the list; the full text is in the tooltip and editor
+TOOLTIP_CHARS = 4000
+
+
+def base_name(filename):
+    """
+    Derives the name of the output file a transcript is appended to: the underscore-separated parts of the file
+    name before the first part containing a digit, e.g. 'Mueller_Brief' for 'Mueller_Brief_003.wav'.
+
+    Args:
+    - filename (str): Audio file name.
+
+    Returns:
+    - str or None: Base name, None if the first part already contains a digit.
+    """
+    parts = []
+    for part in os.path.splitext(filename)[0].split('_'):
+        if any(char.isdigit() for char in part):
+            break
+        parts.append(part)
+    return '_'.join(parts) or None
+
+
+class TranscriptStore:
+    """
+    Compact store of the file transcription results, one column per field instead of one object per file.
+    Entity markup is not stored; it is applied when a row is displayed or saved.
+    """
+
+    def __init__(self):
+        self._numbers = array('l')  # Position of the file in the selection
+        self._filenames = []
+        self._texts = []
+        self._entities = []  # Tuple of (start_char, end_char, label) spans, or None without entities
+
+    def __len__(self):
+        return len(self._texts)
+
+    def extend(self, rows):
+        """
+        Appends results.
+
+        Args:
+        - rows (iterable): (file number, file name, transcription, entity spans) tuples.
+        """
+        for number, filename, transcription, spans in rows:
+            self._numbers.append(number)
+            self._filenames.append(filename)
+            self._texts.append(transcription)
+            self._entities.append(tuple(spans) if spans else None)
+
+    def clear(self):
+        self._numbers = array('l')
+        self._filenames = []
+        self._texts = []
+        self._entities = []
+
+    def number(self, row):
+        return self._numbers[row]
+
+    def filename(self, row):
+        return self._filenames[row]
+
+    def text(self, row):
+        return self._texts[row]
+
+    def set_text(self, row, text):
+        # An edited transcript loses its entity spans, whose offsets no longer match
+        self._texts[row] = text
+        self._entities[row] = None
+
+    def entities(self, row):
+        return list(self._entities[row] or ())
+
+    def highlighted_text(self, row, max_chars=None):
+        """
+        Returns the transcript of a row with its entities marked, optionally only the beginning.
+
+        Args:
+        - row (int): Row number.
+        - max_chars (int or None): Only mark up and return this many characters of the transcript.
+
+        Returns:
+        - str: Marked-up transcript.
+        """
+        text = self._texts[row]
+        spans = self._entities[row] or ()
+        if max_chars is not None and len(text) > max_chars:
+            text = text[:max_chars]
+            spans = [span for span in spans if span[1] <= max_chars]
+        return apply_markup(text, spans).strip()
+
+    def save(self, processed_dir, unmatched_file='no_root_name.txt'):
+        """
+        Appends every transcript to processed_dir/<base name>.txt (see base_name) as the file name followed by the
+        marked-up transcript. Each output file is opened once; names without a base name are listed in
+        unmatched_file.
+
+        Args:
+        - processed_dir (str): Output directory.
+        - unmatched_file (str): File listing the names without a base name.
+
+        Returns:
+        - int: Number of output files written.
+        """
+        groups = {}
+        unmatched = []
+        for row, filename in enumerate(self._filenames):
+            name = base_name(filename)
+            if name is None:
+                unmatched.append(os.path.splitext(filename)[0] + '\n')
+            else:
+                groups.setdefault(name, []).append(f"{filename}\n{self.highlighted_text(row)}\n")
+
+        os.makedirs(processed_dir, exist_ok=True)
+        for name, entries in groups.items():
+            with open(os.path.join(processed_dir, f"{name}.txt"), mode='a', encoding='utf-8') as file:
+                file.writelines(entries)
+        if unmatched:
+            with open(unmatched_file, mode='a', encoding='utf-8') as file:
+                file.writelines(unmatched)
+        return len(groups)
+
+
+class TranscriptListModel(QAbstractListModel):
+    """
+    List model of the file transcriptions over a TranscriptStore, for a QListView.
+
+    Rows are rendered only when the view asks for them, i.e. when they become visible, and show a one-line preview
+    of the transcript; the full text is in the tooltip and in the editor (Qt.EditRole). Results are inserted in
+    batches with append_results, so the view updates once per batch.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = TranscriptStore()
+        self._font = QFont("Arial", 10)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            preview = self.store.highlighted_text(row, PREVIEW_CHARS).replace('\n', ' ')
+            if len(self.store.text(row)) > PREVIEW_CHARS:
+                preview += ' …'
+            return f"File {self.store.number(row)}: {self.store.filename(row)}\n{preview}"
+        if role == Qt.EditRole:
+            return self.store.text(row)
+        if role == Qt.ToolTipRole:
+            return self.store.highlighted_text(row, TOOLTIP_CHARS)
+        if role == Qt.FontRole:
+            return self._font
+        if role == Qt.UserRole:
+            return {'filename': self.store.filename(row), 'transcription': self.store.text(row),
+                    'entities': self.store.entities(row)}
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        self.store.set_text(index.row(), value)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def flags(self, index):
+        return super().flags(index) | Qt.ItemIsEditable
+
+    def append_results(self, rows):
+        """
+        Appends a batch of results with a single row insertion.
+
+        Args:
+        - rows (list): (file number, file name, transcription, entity spans) tuples.
+        """
+        if not rows:
+            return
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.store.extend(rows)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        self.endResetModel()
@@ -0,0 +1,368 @@
+import os
+import json
+import time
+import wave
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # Seconds
+RTF_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5)  # Processing seconds per audio second
+MAX_TRACE_SPANS = 100000  # Finished spans kept for the trace file; older ones are dropped
+METRIC_PREFIX = 'stt_'
+
+
+class _NullSpan:
+    # Returned by span() while instrumentation is disabled
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'attrs', 'start_ns')
+
+    def __init__(self, metrics, name, attrs):
+        self.metrics = metrics
+        self.name = name
+        self.attrs = attrs
+        self.start_ns = 0
+
+    def set(self, **attrs):
+        # Adds attributes known only inside the span, e.g. the length of the decoded text
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.metrics._stack().append(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration_ns = time.perf_counter_ns() - self.start_ns
+        stack = self.metrics._stack()
+        stack.pop()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__  # Shown in the trace; callers count errors themselves
+        if stack:
+            self.attrs['parent'] = stack[-1].name
+        self.metrics._finish_span(self, duration_ns)
+        return False
+
+
+class Metrics:
+    """
+    Low-overhead instrumentation of the transcription pipeline: nested timing spans, counters and histograms.
+
+    Every finished span is observed in the stt_stage_seconds histogram (labelled by span name) and kept in a
+    bounded buffer for the trace file, written in the Chrome trace event format (chrome://tracing, Perfetto).
+    Counters, gauges and histograms are exported in the Prometheus text format, to a file or over HTTP.
+
+    Attributes:
+        enabled (bool): If False, span(), count() and observe() do nothing.
+        counters (dict): (name, labels) -> value.
+        gauges (dict): (name, labels) -> current value, e.g. a queue depth (not part of snapshots).
+        histograms (dict): (name, labels) -> [bucket bounds, bucket counts, sum, count].
+        spans (deque): Finished spans as trace events.
+    """
+
+    def __init__(self, enabled=True, max_spans=MAX_TRACE_SPANS):
+        """
+        Initializes the Metrics registry.
+
+        Args:
+        - enabled (bool): Record anything at all.
+        - max_spans (int): Number of finished spans kept for the trace file.
+        """
+        self.enabled = enabled
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, **attrs):
+        """
+        Times a block of code; spans opened inside it (in the same thread) are nested in it.
+
+        Args:
+        - name (str): Stage name, e.g. 'decode'.
+        - **attrs: Attributes stored with the span in the trace, e.g. filename.
+
+        Returns:
+        - Context manager; its set(**attrs) method adds attributes.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def count(self, name, value=1, **labels):
+        """
+        Increases a counter.
+
+        Args:
+        - name (str): Counter name, e.g. 'audio_seconds_total'.
+        - value (float): Increment.
+        - **labels: Prometheus labels.
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        """
+        Sets a gauge to its current value.
+
+        Args:
+        - name (str): Gauge name, e.g. 'queue_depth'.
+        - value (float): Current value.
+        - **labels: Prometheus labels.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, buckets=STAGE_BUCKETS, **labels):
+        """
+        Adds a value to a histogram.
+
+        Args:
+        - name (str): Histogram name, e.g. 'file_rtf'.
+        - value (float): Observed value.
+        - buckets (tuple): Upper bounds of the buckets, used when the histogram is created.
+        - **labels: Prometheus labels.
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [tuple(buckets), [0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(histogram[0]):
+                if value <= bound:
+                    histogram[1][i] += 1
+                    break
+            histogram[2] += value
+            histogram[3] += 1
+
+    def record_file(self, component, audio_seconds, seconds, error=False):
+        """
+        Records a processed file: audio seconds, file count by status and real-time factor.
+
+        Args:
+        - component (str): Pipeline that processed the file, e.g. 'evaluator' or 'gui'.
+        - audio_seconds (float or None): Duration of the audio, None if unknown.
+        - seconds (float): Processing time of the file.
+        - error (bool): Whether processing failed.
+        """
+        if not self.enabled:
+            return
+        self.count('files_total', component=component, status='error' if error else 'ok')
+        if audio_seconds:
+            self.count('audio_seconds_total', audio_seconds, component=component)
+            if not error:
+                self.observe('file_rtf', seconds / audio_seconds, buckets=RTF_BUCKETS, component=component)
+
+    def _finish_span(self, span, duration_ns):
+        self.observe('stage_seconds', duration_ns / 1e9, stage=span.name)
+        # Appending to a deque is thread-safe; timestamps are in microseconds of the monotonic clock
+        self.spans.append({'name': span.name, 'ph': 'X', 'ts': span.start_ns // 1000, 'dur': duration_ns // 1000,
+                           'pid': os.getpid(), 'tid': threading.get_ident(), 'args': span.attrs})
+
+    def snapshot(self, reset=False):
+        """
+        Returns the recorded data in a picklable form, e.g. to send it from a worker process to merge().
+
+        Args:
+        - reset (bool): Clear the recorded data afterwards.
+
+        Returns:
+        - dict: Counters, histograms and spans.
+        """
+        with self._lock:
+            snapshot = {'counters': list(self.counters.items()),
+                        'histograms': [(key, [h[0], list(h[1]), h[2], h[3]]) for key, h in self.histograms.items()],
+                        'spans': list(self.spans)}
+            if reset:
+                self.counters.clear()
+                self.histograms.clear()
+                self.spans.clear()
+        return snapshot
+
+    def merge(self, snapshot):
+        """
+        Adds the data of a snapshot, e.g. from a worker process, to this registry.
+
+        Args:
+        - snapshot (dict): As returned by snapshot().
+        """
+        if not self.enabled or not snapshot:
+            return
+        with self._lock:
+            for key, value in snapshot['counters']:
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, (buckets, counts, total, count) in snapshot['histograms']:
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    self.histograms[key] = [tuple(buckets), list(counts), total, count]
+                else:
+                    histogram[1] = [a + b for a, b in zip(histogram[1], counts)]
+                    histogram[2] += total
+                    histogram[3] += count
+        self.spans.extend(snapshot['spans'])
+
+    def export_trace(self, path):
+        """
+        Writes the buffered spans as a JSON trace file (Chrome trace event format).
+
+        Args:
+        - path (str): Output file.
+        """
+        _write_atomic(path, json.dumps({'traceEvents': list(self.spans), 'displayTimeUnit': 'ms'}))
+
+    def prometheus_text(self):
+        """
+        Formats the counters, gauges and histograms in the Prometheus text exposition format.
+
+        Returns:
+        - str: Exposition text.
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted((key, [h[0], list(h[1]), h[2], h[3]]) for key, h in self.histograms.items())
+        declared = set()
+        for (name, labels), value in counters:
+            name = METRIC_PREFIX + name
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), value in gauges:
+            name = METRIC_PREFIX + name
+            if name not in declared:
+                lines.append(f"# TYPE {name} gauge")
+                declared.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            name = METRIC_PREFIX + name
+            if name not in declared:
+                lines.append(f"# TYPE {name} histogram")
+                declared.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(float(bound))),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Writes the Prometheus exposition text to a file, e.g. for the node exporter's textfile collector.
+
+        Args:
+        - path (str): Output file.
+        """
+        _write_atomic(path, self.prometheus_text())
+
+    def serve_prometheus(self, port, host='127.0.0.1'):
+        """
+        Serves the Prometheus exposition text over HTTP (any path) from a daemon thread.
+
+        Args:
+        - port (int): TCP port.
+        - host (str): Interface to listen on.
+
+        Returns:
+        - ThreadingHTTPServer: The running server; call shutdown() to stop it.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _write_atomic(path, text):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, mode='w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(temp_path, path)
+
+
+def audio_duration(audio_file):
+    """
+    Reads the duration of a wav file from its header.
+
+    Args:
+    - audio_file (str): Path to the wav file.
+
+    Returns:
+    - float or None: Duration in seconds, None if the file is not a readable wav file.
+    """
+    try:
+        with wave.open(audio_file, 'rb') as wf:
+            return wf.getnframes() / wf.getframerate()
+    except (OSError, EOFError, wave.Error):
+        return None
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Returns the process-wide Metrics registry, created on first use.
+
+    Instrumentation is on by default; set the environment variable STT_METRICS=0 to switch it off.
+
+    Returns:
+    - Metrics: Shared registry.
+    """
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics(enabled=os.environ.get('STT_METRICS', '1') != '0')
+    return _metrics
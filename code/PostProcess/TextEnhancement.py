@@ -0,0 +1,252 @@
+import re
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_CHUNK_WORDS = 60  # Upper bound on words per chunk in batched enhancement
+CHUNK_OVERLAP_WORDS = 8  # Context words from each neighbouring chunk, dropped again when the chunks are joined
+ENHANCE_THREADS = 4  # Chunks enhanced at the same time in batched enhancement
+BATCH_SETTINGS = f'chunks{MAX_CHUNK_WORDS}/overlap{CHUNK_OVERLAP_WORDS}'  # Identifies enhance_batch output in caches
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+_shared_enhancers = {}
+_shared_lock = threading.Lock()
+
+
+class TextEnhancer:
+    """
+    Punctuation and capitalization service built on the Silero text-enhancement model.
+
+    The model is loaded lazily on first use (or explicitly through warm_up) and then reused for every call,
+    so it is built only once per process no matter how many transcripts are enhanced.
+
+    Attributes:
+        language (str): Language code passed to the Silero model.
+        load_time (float or None): Seconds spent loading the model, None until it has been loaded.
+        load_count (int): Number of times the model was loaded (expected to stay at 1).
+        call_count (int): Number of enhanced texts.
+        total_latency (float): Total seconds spent in enhancement calls.
+        call_latencies (deque): Latencies (s) of the most recent calls.
+        last_batch_stats (dict or None): Chunk, word and throughput figures of the last enhance_batch call.
+        num_threads (int): Size of the thread pool of enhance_batch.
+    """
+
+    def __init__(self, language='de', history=1000, num_threads=ENHANCE_THREADS):
+        """
+        Initializes the TextEnhancer without loading the model.
+
+        Args:
+        - language (str): Language code passed to the Silero model.
+        - history (int): Number of recent call latencies to keep.
+        - num_threads (int): Size of the thread pool of enhance_batch, created on its first call.
+        """
+        self.language = language
+        self.load_time = None
+        self.load_count = 0
+        self.call_count = 0
+        self.total_latency = 0.0
+        self.call_latencies = deque(maxlen=history)
+        self.last_batch_stats = None
+        self.num_threads = num_threads
+        self._apply_te_func = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self):
+        return self._apply_te_func is not None
+
+    def warm_up(self):
+        """
+        Loads the model now instead of on the first call.
+
+        Returns:
+        - float: Seconds spent loading the model.
+        """
+        self._get_apply_te_func()
+        return self.load_time
+
+    def _get_apply_te_func(self):
+        # Double-checked locking: concurrent first callers wait for a single load
+        if self._apply_te_func is None:
+            with self._lock:
+                if self._apply_te_func is None:
+                    from silero import silero_te  # Imported here so that importing this module stays cheap
+
+                    start = time.perf_counter()
+                    _, _, _, _, apply_te_func = silero_te()
+                    self.load_time = time.perf_counter() - start
+                    self.load_count += 1
+                    self._apply_te_func = apply_te_func
+        return self._apply_te_func
+
+    def enhance(self, text):
+        """
+        Restores punctuation and capitalization of a transcript.
+
+        Args:
+        - text (str): Raw transcribed text.
+
+        Returns:
+        - str: Processed text.
+        """
+        apply_te_func = self._get_apply_te_func()
+        start = time.perf_counter()
+        processed_text = apply_te_func(text=text, lan=self.language)
+        latency = time.perf_counter() - start
+
+        with self._lock:
+            self.call_count += 1
+            self.total_latency += latency
+            self.call_latencies.append(latency)
+        return processed_text
+
+    def enhance_batch(self, texts, max_words=MAX_CHUNK_WORDS, overlap=CHUNK_OVERLAP_WORDS):
+        """
+        Restores punctuation and capitalization of many transcripts at once.
+
+        Every transcript is split into chunks of at most max_words words (see chunk_windows). Each chunk is
+        enhanced together with up to overlap words of its neighbours as context, so that a cut in the middle of a
+        sentence gets no capital letter or full stop, and the context words are dropped again when the chunks are
+        joined back per transcript. The Silero model takes one text per call, so the chunks of all transcripts
+        are enhanced concurrently on the long-lived thread pool of the enhancer, longest first.
+
+        Args:
+        - texts (list): Raw transcribed texts.
+        - max_words (int): Maximum number of words per chunk, without its context.
+        - overlap (int): Context words taken from each neighbouring chunk.
+
+        Returns:
+        - list: Processed texts, in the order of texts.
+        """
+        windows = []  # (text index, chunk index, window text, context words before, context words after)
+        chunk_counts = []
+        for text_index, text in enumerate(texts):
+            text_windows = chunk_windows(text, max_words, overlap)
+            chunk_counts.append(len(text_windows))
+            windows.extend((text_index, chunk_index) + window for chunk_index, window in enumerate(text_windows))
+
+        # Long chunks first, so that no long chunk is left running alone at the end
+        windows.sort(key=lambda item: len(item[2]), reverse=True)
+        enhanced = [[None] * count for count in chunk_counts]
+
+        start = time.perf_counter()
+        for (text_index, chunk_index, *_), result in zip(windows, self._get_executor().map(self._enhance_window,
+                                                                                         windows)):
+            enhanced[text_index][chunk_index] = result
+        elapsed = time.perf_counter() - start
+
+        num_words = sum(len(window[2].split()) - window[3] - window[4] for window in windows)
+        self.last_batch_stats = {
+            'texts': len(texts),
+            'chunks': len(windows),
+            'words': num_words,
+            'context_words': sum(window[3] + window[4] for window in windows),
+            'threads': self.num_threads,
+            'seconds': elapsed,
+            'words_per_second': num_words / elapsed if elapsed > 0 else None,
+        }
+        return [' '.join(text_chunks) for text_chunks in enhanced]
+
+    def _enhance_window(self, window):
+        # Enhances a chunk with its context and keeps the words of the chunk. The model only adds punctuation and
+        # changes case, so words map one to one; should it ever merge or split words, the chunk is enhanced alone.
+        _, _, text, before, after = window
+        enhanced = self.enhance(text)
+        if not before and not after:
+            return enhanced
+        words = text.split()
+        enhanced_words = enhanced.split()
+        if len(enhanced_words) != len(words):
+            return self.enhance(' '.join(words[before:len(words) - after]))
+        return ' '.join(enhanced_words[before:len(enhanced_words) - after])
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.num_threads,
+                                                    thread_name_prefix=f'text-enhancer-{self.language}')
+            return self._executor
+
+    def stats(self):
+        """
+        Returns load and call timings of the service.
+
+        Returns:
+        - dict: load_time, load_count, call_count, total_latency and mean_latency (seconds).
+        """
+        with self._lock:
+            return {
+                'load_time': self.load_time,
+                'load_count': self.load_count,
+                'call_count': self.call_count,
+                'total_latency': self.total_latency,
+                'mean_latency': self.total_latency / self.call_count if self.call_count else None,
+            }
+
+
+def split_into_chunks(text, max_words=MAX_CHUNK_WORDS):
+    """
+    Splits a transcript into chunks of at most max_words words, cutting at sentence ends where the text has any.
+
+    Args:
+    - text (str): Transcript to split.
+    - max_words (int): Maximum number of words per chunk.
+
+    Returns:
+    - list: Chunks in text order (empty for an empty text).
+    """
+    chunks = []
+    current = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        words = sentence.split()
+        if current and len(current) + len(words) > max_words:
+            chunks.append(' '.join(current))
+            current = []
+        # Raw ASR output has no sentence ends, so long runs are cut into fixed-size word windows
+        while len(words) > max_words:
+            chunks.append(' '.join(words[:max_words]))
+            words = words[max_words:]
+        current.extend(words)
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def chunk_windows(text, max_words=MAX_CHUNK_WORDS, overlap=CHUNK_OVERLAP_WORDS):
+    """
+    Splits a transcript into chunks (see split_into_chunks) and extends each chunk by up to overlap words of the
+    previous and the next chunk as context.
+
+    Args:
+    - text (str): Transcript to split.
+    - max_words (int): Maximum number of words per chunk, without its context.
+    - overlap (int): Context words taken from each neighbouring chunk.
+
+    Returns:
+    - list: (window text, context words before the chunk, context words after the chunk) per chunk, in text order.
+    """
+    chunks = [chunk.split() for chunk in split_into_chunks(text, max_words)]
+    windows = []
+    for index, words in enumerate(chunks):
+        before = chunks[index - 1][-overlap:] if index > 0 and overlap > 0 else []
+        after = chunks[index + 1][:overlap] if index + 1 < len(chunks) and overlap > 0 else []
+        windows.append((' '.join(before + words + after), len(before), len(after)))
+    return windows
+
+
+def get_text_enhancer(language='de'):
+    """
+    Returns the process-wide TextEnhancer for a language, creating it on first request.
+
+    Args:
+    - language (str): Language code passed to the Silero model.
+
+    Returns:
+    - TextEnhancer: Shared text-enhancement service.
+    """
+    with _shared_lock:
+        if language not in _shared_enhancers:
+            _shared_enhancers[language] = TextEnhancer(language)
+        return _shared_enhancers[language]
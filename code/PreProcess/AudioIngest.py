@@ -0,0 +1,310 @@
+import os
+import wave
+from math import gcd
+import numpy as np
+from scipy.signal import firwin
+
+TARGET_RATE = 16000  # Sample rate of the Vosk models
+BLOCK_SECONDS = 0.5  # Audio decoded per block
+TAPS_PER_PHASE = 32  # Filter length of the resampler, per polyphase component
+KAISER_BETA = 8.0
+
+
+class PolyphaseResampler:
+    """
+    Streaming rational resampler: a windowed-sinc low-pass FIR filter evaluated in polyphase form, so only the
+    output samples are computed. The state between blocks is the last few input samples, so a signal resampled
+    block by block is identical to the signal resampled in one piece.
+
+    Attributes:
+        up (int), down (int): Resampling ratio to_rate / from_rate in lowest terms.
+        phases (np.ndarray): Polyphase components of the filter, shape (up, taps per phase).
+    """
+
+    def __init__(self, from_rate, to_rate, taps_per_phase=TAPS_PER_PHASE):
+        """
+        Initializes the PolyphaseResampler.
+
+        Args:
+        - from_rate (int): Sample rate of the input.
+        - to_rate (int): Sample rate of the output.
+        - taps_per_phase (int): Filter taps per output sample; more taps give a steeper anti-aliasing filter.
+        """
+        divisor = gcd(int(from_rate), int(to_rate))
+        self.up = int(to_rate) // divisor
+        self.down = int(from_rate) // divisor
+        self.taps_per_phase = taps_per_phase
+        num_taps = taps_per_phase * self.up
+        if self.up == self.down:  # Same rate: a delayed unit impulse passes the signal through unchanged
+            taps = np.zeros(num_taps)
+            taps[(num_taps - 1) // 2] = 1.0
+        else:
+            taps = firwin(num_taps, 1.0 / max(self.up, self.down), window=('kaiser', KAISER_BETA)) * self.up
+        self.phases = taps.reshape(taps_per_phase, self.up).T[:, ::-1].astype(np.float32)
+        self.delay = (num_taps - 1) // 2  # Group delay of the filter, in upsampled samples
+        self._history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self._history_start = -(taps_per_phase - 1)  # Input index of the first history sample
+        self._received = 0  # Input samples received so far
+        self._produced = 0  # Output samples produced so far
+
+    def process(self, block):
+        """
+        Resamples the next block of the signal.
+
+        Args:
+        - block (np.ndarray): Mono float samples.
+
+        Returns:
+        - np.ndarray: float32 output samples that depend only on the input received so far.
+        """
+        self._received += len(block)
+        buffer = np.concatenate((self._history, np.asarray(block, dtype=np.float32)))
+
+        # Output n needs the input samples up to (n * down + delay) // up
+        last_input = self._received - 1
+        count = max(0, ((last_input + 1) * self.up - self.delay - 1) // self.down + 1 - self._produced)
+        output = self._compute(buffer, count)
+
+        keep_from = (self._produced * self.down + self.delay) // self.up - (self.taps_per_phase - 1)
+        keep_from = min(max(keep_from, self._history_start), self._received)
+        self._history = buffer[keep_from - self._history_start:]
+        self._history_start = keep_from
+        return output
+
+    def flush(self):
+        """
+        Returns the remaining output samples at the end of the signal, so that the output has
+        ceil(input samples * up / down) samples in total.
+
+        Returns:
+        - np.ndarray: float32 output samples.
+        """
+        total = -(-self._received * self.up // self.down)
+        padding = np.zeros(self.taps_per_phase, dtype=np.float32)
+        buffer = np.concatenate((self._history, padding))
+        return self._compute(buffer, max(0, total - self._produced))
+
+    def _compute(self, buffer, count):
+        if count <= 0:
+            return np.zeros(0, dtype=np.float32)
+        positions = (np.arange(self._produced, self._produced + count, dtype=np.int64) * self.down + self.delay)
+        phase = positions % self.up
+        last = positions // self.up - self._history_start  # Buffer index of the newest input sample used
+        windows = np.lib.stride_tricks.sliding_window_view(buffer, self.taps_per_phase)
+        output = np.einsum('ij,ij->i', windows[last - (self.taps_per_phase - 1)], self.phases[phase])
+        self._produced += count
+        return output.astype(np.float32, copy=False)
+
+
+def is_target_pcm(audio_file, target_rate=TARGET_RATE):
+    """
+    Checks whether a file is already 16-bit mono PCM wav at the target rate, i.e. can be fed to the recognizer
+    as it is.
+
+    Args:
+    - audio_file (str or file): Path to the audio file, or a seekable binary file object (rewound afterwards).
+    - target_rate (int): Required sample rate.
+
+    Returns:
+    - bool: True for 16-bit mono PCM wav files at target_rate.
+    """
+    try:
+        with wave.open(audio_file, 'rb') as wf:
+            return wf.getsampwidth() == 2 and wf.getnchannels() == 1 and wf.getframerate() == target_rate
+    except (OSError, EOFError, wave.Error):
+        return False
+    finally:
+        _rewind(audio_file)
+
+
+def audio_info(audio_file):
+    """
+    Reads the sample rate, channel count and length of an audio file.
+
+    Args:
+    - audio_file (str): Path to a WAV, FLAC or MP3 file.
+
+    Returns:
+    - tuple: (sample rate, channels, frames); frames is None if the format does not tell.
+    """
+    try:
+        with wave.open(audio_file, 'rb') as wf:
+            return wf.getframerate(), wf.getnchannels(), wf.getnframes()
+    except (EOFError, wave.Error):
+        pass
+    import soundfile as sf
+    info = sf.info(audio_file)
+    return info.samplerate, info.channels, info.frames or None
+
+
+def iter_native_blocks(audio_file, block_seconds=BLOCK_SECONDS):
+    """
+    Decodes an audio file block by block at its own sample rate, without temporary files.
+
+    Integer PCM wav files are read with the wave module; other wav encodings, FLAC and MP3 are decoded with
+    soundfile (libsndfile 1.1 or later for MP3), falling back to audioread (ffmpeg piped into memory) for formats
+    soundfile cannot open. audioread needs a path, so file objects are limited to what wave and soundfile read.
+
+    Args:
+    - audio_file (str or file): Path to the audio file, or a seekable binary file object (e.g. an upload).
+    - block_seconds (float): Audio per block.
+
+    Yields:
+    - tuple: (float32 samples in [-1, 1] of shape (frames, channels), sample rate).
+    """
+    try:
+        wf = wave.open(audio_file, 'rb')
+    except (EOFError, wave.Error):
+        wf = None
+        _rewind(audio_file)
+    if wf is not None:
+        with wf:
+            sample_rate, channels, width = wf.getframerate(), wf.getnchannels(), wf.getsampwidth()
+            block_frames = max(1, int(sample_rate * block_seconds))
+            while True:
+                data = wf.readframes(block_frames)
+                if not data:
+                    return
+                yield _pcm_to_float(data, width).reshape(-1, channels), sample_rate
+        return
+
+    try:
+        import soundfile as sf
+        with sf.SoundFile(audio_file) as file:
+            block_frames = max(1, int(file.samplerate * block_seconds))
+            for block in file.blocks(blocksize=block_frames, dtype='float32', always_2d=True):
+                yield block, file.samplerate
+        return
+    except (ImportError, RuntimeError) as e:  # soundfile missing, or libsndfile cannot read the format
+        error = e
+
+    try:
+        import audioread
+    except ImportError:
+        raise error
+    if not isinstance(audio_file, (str, bytes, os.PathLike)):
+        raise error
+    with audioread.audio_open(audio_file) as file:
+        for data in file:
+            yield _pcm_to_float(data, 2).reshape(-1, file.channels), file.samplerate
+
+
+def iter_float_blocks(audio_file, target_rate=TARGET_RATE, block_seconds=BLOCK_SECONDS):
+    """
+    Decodes an audio file into mono float32 blocks, resampled to target_rate with a PolyphaseResampler.
+
+    Args:
+    - audio_file (str or file): Path to the audio file, or a seekable binary file object.
+    - target_rate (int or None): Output sample rate; None keeps the rate of the file.
+    - block_seconds (float): Audio per block of the source.
+
+    Yields:
+    - tuple: (mono float32 samples, sample rate).
+    """
+    resampler = None
+    sample_rate = None
+    for block, sample_rate in iter_native_blocks(audio_file, block_seconds):
+        mono = block[:, 0] if block.shape[1] == 1 else block.mean(axis=1, dtype=np.float32)
+        if target_rate is None or sample_rate == target_rate:
+            yield mono, sample_rate
+            continue
+        if resampler is None:
+            resampler = PolyphaseResampler(sample_rate, target_rate)
+        output = resampler.process(mono)
+        if len(output):
+            yield output, target_rate
+    if resampler is not None:
+        tail = resampler.flush()
+        if len(tail):
+            yield tail, target_rate
+
+
+def iter_pcm16_blocks(audio_file, target_rate=TARGET_RATE, block_seconds=BLOCK_SECONDS):
+    """
+    Decodes an audio file into 16-bit mono PCM blocks at target_rate, as the recognizer expects them.
+
+    Args:
+    - audio_file (str or file): Path to the audio file, or a seekable binary file object.
+    - target_rate (int): Output sample rate.
+    - block_seconds (float): Audio per block of the source.
+
+    Yields:
+    - np.ndarray: int16 samples.
+    """
+    if is_target_pcm(audio_file, target_rate):  # Already in the recognizer's format: no float round trip
+        with wave.open(audio_file, 'rb') as wf:
+            block_frames = max(1, int(target_rate * block_seconds))
+            while True:
+                data = wf.readframes(block_frames)
+                if not data:
+                    return
+                yield np.frombuffer(data, dtype='<i2')
+
+    for block, _ in iter_float_blocks(audio_file, target_rate, block_seconds):
+        yield float_to_pcm16(block)
+
+
+def load_audio(audio_file, target_rate=TARGET_RATE, dtype=np.float32):
+    """
+    Decodes a whole audio file into one mono array. The array is allocated once from the length in the header
+    where the format provides it, so the peak memory stays close to the size of the result.
+
+    Args:
+    - audio_file (str): Path to the audio file.
+    - target_rate (int or None): Output sample rate; None keeps the rate of the file.
+    - dtype (np.dtype): Floating point type of the result.
+
+    Returns:
+    - tuple: (mono samples in [-1, 1], sample rate).
+    """
+    try:
+        source_rate, _, frames = audio_info(audio_file)
+    except Exception:  # Formats only audioread can open; the array then grows as needed
+        source_rate, frames = None, None
+    audio = None
+    length = 0
+    sample_rate = target_rate or source_rate
+    for block, sample_rate in iter_float_blocks(audio_file, target_rate):
+        if audio is None:
+            audio = np.empty(-(-frames * sample_rate // source_rate) if frames else sample_rate * 60, dtype=dtype)
+        if length + len(block) > len(audio):
+            audio = np.resize(audio, max(2 * len(audio), length + len(block)))
+        audio[length:length + len(block)] = block
+        length += len(block)
+    if audio is None:
+        return np.zeros(0, dtype=dtype), sample_rate
+    return audio[:length], sample_rate
+
+
+def float_to_pcm16(samples):
+    """
+    Converts float samples in [-1, 1] to 16-bit PCM, clipping out-of-range values.
+
+    Args:
+    - samples (np.ndarray): Float samples.
+
+    Returns:
+    - np.ndarray: int16 samples.
+    """
+    return np.clip(np.round(samples * 32768.0), -32768, 32767).astype(np.int16)
+
+
+def _rewind(audio_file):
+    # wave.open leaves a file object somewhere in the header; the next reader has to start from the beginning
+    if hasattr(audio_file, 'seek'):
+        audio_file.seek(0)
+
+
+def _pcm_to_float(data, width):
+    if width == 1:  # 8-bit wav is unsigned
+        return (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if width == 2:
+        return np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    if width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        samples = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8)
+                   | (raw[:, 2].astype(np.int32) << 16))
+        return (np.where(samples >= 1 << 23, samples - (1 << 24), samples)).astype(np.float32) / float(1 << 23)
+    if width == 4:
+        return (np.frombuffer(data, dtype='<i4') / float(1 << 31)).astype(np.float32)
+    raise ValueError(f"Unsupported sample width: {width} bytes")
@@ -3,14 +3,88 @@ import librosa
 import torch
 import pyworld as pw
 from scipy.signal import butter, lfilter
+from Instrumentation import get_metrics
+from PreProcess.AudioIngest import load_audio
 
 MAX_AUDIO_LENGTH = 44100 * 30  # 30 seconds
+MAX_AUDIO_DURATION = 30  # Seconds, for the sample-rate-aware length limit
 
 
 class AudioProcessor:
-    def __init__(self):
+    def __init__(self, top_db=20, cutoff=8000, n_mels=80, max_length=MAX_AUDIO_LENGTH, cache=None,
+                 dtype=np.float64, max_duration=None, pad=True, sample_rate=None):
+        """
+        Initializes the AudioProcessor.
+
+        Args:
+        - top_db (float): Silence threshold (in decibels) used by remove_silence.
+        - cutoff (float): Cutoff frequency of the low-pass filter.
+        - n_mels (int): Number of mel bands.
+        - max_length (int): Length (in samples) the audio is truncated or zero-padded to.
+        - cache (FeatureCache or None): Persistent cache of extracted features (default: None, no caching).
+        - dtype (np.dtype): Floating point type the audio is processed in.
+        - max_duration (float or None): If set, the length limit in seconds, converted to samples with the
+          actual sample rate of each file (overrides max_length).
+        - pad (bool): Zero-pad shorter audio to the length limit. Without padding the spectrograms keep their
+          real length; use collate_variable_length to batch them.
+        - sample_rate (int or None): Rate the audio is resampled to while it is decoded (see
+          PreProcess.AudioIngest), e.g. 16000 to match the recognizer; None keeps the rate of each file.
+
+        AudioProcessor.compact() returns the float32, sample-rate-aware, unpadded configuration.
+        """
         self.audio = None
         self.sr = None
+        self.top_db = top_db
+        self.cutoff = cutoff
+        self.n_mels = n_mels
+        self.max_length = max_length
+        self.cache = cache
+        self.dtype = np.dtype(dtype)
+        self.max_duration = max_duration
+        self.pad = pad
+        self.sample_rate = sample_rate
+        self._world_audio = None  # Audio buffer the memoized WORLD analysis belongs to
+        self._world_features = None
+
+    @classmethod
+    def compact(cls, max_duration=MAX_AUDIO_DURATION, **kwargs):
+        """
+        Creates an AudioProcessor that works in float32, limits the length by duration rather than a fixed
+        number of samples, and returns unpadded variable-length spectrograms.
+
+        Args:
+        - max_duration (float): Length limit in seconds.
+        - **kwargs: Further AudioProcessor arguments.
+
+        Returns:
+        - AudioProcessor: Compact processor.
+        """
+        return cls(dtype=np.float32, max_duration=max_duration, pad=False, **kwargs)
+
+    def max_length_for(self, sr):
+        """
+        Returns the length limit in samples for audio with the given sample rate.
+
+        Args:
+        - sr (int): Sample rate of the audio.
+
+        Returns:
+        - int: Maximum number of samples.
+        """
+        if self.max_duration is not None:
+            return int(self.max_duration * sr)
+        return self.max_length
+
+    def feature_params(self):
+        """
+        Returns the parameters that determine the extracted features, as used in feature cache keys.
+
+        Returns:
+        - dict: Processing parameters.
+        """
+        return {'top_db': self.top_db, 'cutoff': self.cutoff, 'n_mels': self.n_mels, 'max_length': self.max_length,
+                'dtype': self.dtype.name, 'max_duration': self.max_duration, 'pad': self.pad,
+                'sample_rate': self.sample_rate}
 
     def preprocess_audio(self, audio_file):
         """
@@ -22,49 +96,91 @@ class AudioProcessor:
 
         Returns:
         - torch.Tensor or None: Preprocessed mel-spectrogram features with channel dimension added, or None if error occurs.
+
+        With a feature cache, features of unchanged audio processed with the same parameters are loaded from the
+        cache instead; self.audio and self.sr are then not updated.
         """
+        metrics = get_metrics()
+        with metrics.span('preprocess', filename=audio_file):
+            return self._preprocess_audio(audio_file, metrics)
+
+    def _preprocess_audio(self, audio_file, metrics):
+        cache_key = None
+        if self.cache is not None:
+            try:
+                cache_key = self.cache.key(audio_file, self.feature_params())
+            except OSError as e:
+                print(f"Error hashing audio file {audio_file}: {e}")
+                metrics.count('errors_total', stage='load')
+                return None
+            cached = self.cache.get(cache_key)
+            metrics.count('cache_hits_total' if cached is not None else 'cache_misses_total', cache='feature')
+            if cached is not None:
+                return torch.from_numpy(cached).unsqueeze(0)  # Add channel dimension
+
         try:
-            self.audio, self.sr = librosa.load(audio_file, sr=None, dtype=np.float64)  # Load audio with 'float64' dtype
+            with metrics.span('load'):
+                # Decode WAV/FLAC/MP3 to mono in the configured dtype, resampled on the fly if sample_rate is set
+                self.audio, self.sr = load_audio(audio_file, target_rate=self.sample_rate, dtype=self.dtype)
         except Exception as e:
             print(f"Error loading audio file {audio_file}: {e}")
+            metrics.count('errors_total', stage='load')
             return None
+        metrics.count('audio_seconds_total', len(self.audio) / self.sr, component='preprocess')
 
         # Check for non-finite values in loaded audio
         if not np.isfinite(self.audio).all():
             print(f"Audio buffer is not finite everywhere in {audio_file}")
+            metrics.count('errors_total', stage='load')
             return None
 
         # Apply silence removal
         try:
-            self.audio = self.remove_silence(self.audio)
+            with metrics.span('remove_silence'):
+                self.audio = self.remove_silence(self.audio, top_db=self.top_db)
         except Exception as e:
             print(f"Error removing silence from {audio_file}: {e}")
+            metrics.count('errors_total', stage='remove_silence')
             return None
 
         sampling_frequency = self.sr
 
         # Apply low-pass filtering
         try:
-            self.audio = self.lpf(self.audio, sampling_frequency)
+            with metrics.span('lpf'):
+                self.audio = self.lpf(self.audio, sampling_frequency).astype(self.dtype, copy=False)
         except Exception as e:
             print(f"Error applying low-pass filter to {audio_file}: {e}")
+            metrics.count('errors_total', stage='lpf')
             return None
 
         # Ensure audio length does not exceed maximum allowed
-        if len(self.audio) > MAX_AUDIO_LENGTH:
-            self.audio = self.audio[:MAX_AUDIO_LENGTH]
-        else:
-            self.audio = np.pad(self.audio, (0, max(0, MAX_AUDIO_LENGTH - len(self.audio))), 'constant')
+        max_length = self.max_length_for(sampling_frequency)
+        if len(self.audio) > max_length:
+            self.audio = self.audio[:max_length]
+        elif self.pad:
+            self.audio = np.pad(self.audio, (0, max(0, max_length - len(self.audio))), 'constant')
 
         # Extract mel-spectrogram features
         try:
-            mel_spectrogram = librosa.feature.melspectrogram(y=self.audio, sr=sampling_frequency, n_mels=80)
-            mel_spectrogram_db = librosa.power_to_db(mel_spectrogram, ref=np.max)
-            return torch.tensor(mel_spectrogram_db).unsqueeze(0)  # Add channel dimension
+            with metrics.span('melspectrogram'):
+                mel_spectrogram = librosa.feature.melspectrogram(y=self.audio, sr=sampling_frequency,
+                                                                 n_mels=self.n_mels)
+                mel_spectrogram_db = librosa.power_to_db(mel_spectrogram, ref=np.max)
         except Exception as e:
             print(f"Error extracting mel-spectrogram features from {audio_file}: {e}")
+            metrics.count('errors_total', stage='melspectrogram')
             return None
 
+        # A failed cache write (read-only directory, full disk) does not discard the computed features
+        if cache_key is not None:
+            try:
+                self.cache.put(cache_key, mel_spectrogram_db)
+            except OSError as e:
+                print(f"Error caching features of {audio_file}: {e}")
+                metrics.count('errors_total', stage='feature_cache')
+        return torch.tensor(mel_spectrogram_db).unsqueeze(0)  # Add channel dimension
+
     def butter_lowpass(self, cutoff, fs, order=5):
         """
         Butterworth low-pass filter.
@@ -94,7 +210,7 @@ class AudioProcessor:
         - np.ndarray: Filtered audio signal.
         """
         nyquist = fs / 2
-        cutoff = min(8000 / nyquist, 1)
+        cutoff = min(self.cutoff / nyquist, 1)
         b, a = self.butter_lowpass(cutoff, fs)
         y = lfilter(b, a, data)
         return y
@@ -114,6 +230,37 @@ class AudioProcessor:
         non_silent_audio = np.concatenate([audio[start:end] for start, end in non_silent_intervals])
         return non_silent_audio
 
+    def analyze_world(self):
+        """
+        Runs the WORLD analysis (harvest f0, CheapTrick spectral envelope, D4C aperiodicity) of the audio once
+        and memoizes it until self.audio is replaced.
+
+        Returns:
+        - tuple: (f0, sp, ap) arrays.
+        """
+        if self._world_audio is not self.audio:
+            x = np.ascontiguousarray(self.audio, dtype=np.float64)
+            f0, t = pw.harvest(x, self.sr)
+            sp = pw.cheaptrick(x, f0, t, self.sr)
+            ap = pw.d4c(x, f0, t, self.sr)
+            self._world_features = (f0, sp, ap)
+            self._world_audio = self.audio
+        return self._world_features
+
+    def extract_prosodic_features(self, features=('pitch', 'intensity', 'spectral')):
+        """
+        Extracts several prosodic features from a single WORLD analysis of the audio.
+
+        Args:
+        - features (tuple): Names of the features to extract ('pitch', 'intensity', 'spectral').
+
+        Returns:
+        - dict: Feature name to value, as returned by the corresponding extract_* method.
+        """
+        extractors = {'pitch': self.extract_pitch, 'intensity': self.extract_intensity,
+                      'spectral': self.extract_spectral_features}
+        return {name: extractors[name]() for name in features}
+
     def extract_pitch(self):
         """
         Extracts pitch (fundamental frequency) from the audio.
@@ -121,7 +268,7 @@ class AudioProcessor:
         Returns:
         - float: Mean pitch value.
         """
-        f0, _ = pw.harvest(self.audio, self.sr)
+        f0, _, _ = self.analyze_world()
         return np.mean(f0)
 
     def extract_intensity(self):
@@ -131,7 +278,7 @@ class AudioProcessor:
         Returns:
         - float: Mean intensity value.
         """
-        f0, sp, ap = pw.wav2world(self.audio.astype(np.float64), self.sr)
+        _, _, ap = self.analyze_world()
         return np.mean(ap)
 
     def extract_spectral_features(self):
@@ -141,7 +288,7 @@ class AudioProcessor:
         Returns:
         - np.ndarray: Mean spectral features.
         """
-        f0, sp, ap = pw.wav2world(self.audio.astype(np.float64), self.sr)
+        _, sp, _ = self.analyze_world()
         return np.mean(sp, axis=1)
 
     def time_stretch(self, rate):
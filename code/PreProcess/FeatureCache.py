@@ -0,0 +1,200 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import numpy as np
+
+CACHE_VERSION = 1  # Bump when the feature extraction changes in a way the parameters do not capture
+
+
+class FeatureCache:
+    """
+    Persistent, content-addressed cache of extracted audio features.
+
+    Entries are keyed by the SHA-256 of the audio file content plus the processing parameters, and stored as
+    .npy files that are memory-mapped on load. When the cache grows beyond max_bytes, the least recently used
+    entries are evicted (the modification time of an entry is refreshed on every hit).
+
+    Attributes:
+        cache_dir (str): Directory holding the cached features.
+        max_bytes (int or None): Size bound of the cache, None for unbounded.
+        hits (int), misses (int), stores (int), evictions (int): Usage statistics of this instance.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        """
+        Initializes the FeatureCache, creating the cache directory if needed.
+
+        Args:
+        - cache_dir (str): Directory holding the cached features.
+        - max_bytes (int or None): Size bound of the cache (default: 2 GB), None for unbounded.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._content_hashes = {}  # (path, mtime_ns, size) -> content hash, to avoid re-hashing unchanged files
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(os.path.getsize(path) for path in self._entry_paths())
+
+    def key(self, audio_file, params):
+        """
+        Computes the cache key of an audio file processed with the given parameters.
+
+        Args:
+        - audio_file (str): Path to the audio file.
+        - params (dict): Processing parameters (e.g. top_db, cutoff, n_mels, max length).
+
+        Returns:
+        - str: Hexadecimal cache key.
+        """
+        params_json = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(f"{self.content_hash(audio_file)}|{params_json}|{CACHE_VERSION}".encode()).hexdigest()
+
+    def content_hash(self, audio_file):
+        """
+        Returns the SHA-256 of the content of a file, reusing the previous hash while the file is unchanged.
+
+        Args:
+        - audio_file (str): Path to the file.
+
+        Returns:
+        - str: Hexadecimal content hash.
+        """
+        stat = os.stat(audio_file)
+        signature = (os.path.abspath(audio_file), stat.st_mtime_ns, stat.st_size)
+        content_hash = self._content_hashes.get(signature)
+        if content_hash is None:
+            sha = hashlib.sha256()
+            with open(audio_file, 'rb') as file:
+                for block in iter(lambda: file.read(1 << 20), b''):
+                    sha.update(block)
+            content_hash = sha.hexdigest()
+            self._content_hashes[signature] = content_hash
+        return content_hash
+
+    def get(self, key):
+        """
+        Loads a cached feature array.
+
+        Args:
+        - key (str): Cache key.
+
+        Returns:
+        - np.ndarray or None: Memory-mapped (copy-on-write) feature array, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            features = np.load(path, mmap_mode='c')
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass  # Read-only or shared cache directory: the entry is still valid
+
+        with self._lock:
+            self.hits += 1
+        return features
+
+    def put(self, key, features):
+        """
+        Stores a feature array and evicts old entries if the cache exceeds its size bound.
+
+        Args:
+        - key (str): Cache key.
+        - features (np.ndarray): Feature array to store.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see a partially written entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                np.save(file, np.ascontiguousarray(features))
+            size = os.path.getsize(tmp_path)
+            try:
+                previous_size = os.path.getsize(path)
+            except OSError:
+                previous_size = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            self.stores += 1
+            self._total_bytes += size - previous_size
+            if self.max_bytes is not None and self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def __getstate__(self):
+        # Locks cannot be pickled (e.g. when a dataset is sent to DataLoader workers)
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        # Remove least recently used entries until the cache is back under 90% of its bound
+        entries = []
+        for path in self._entry_paths():
+            try:
+                entries.append((os.stat(path).st_mtime_ns, path))
+            except OSError:
+                continue  # Removed by another process sharing the cache since the walk
+        entries.sort()
+        target = 0.9 * self.max_bytes
+        for _, path in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                continue
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def _entry_paths(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.npy'):
+                    yield os.path.join(root, name)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.npy')
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def stats(self):
+        """
+        Returns the usage statistics of the cache.
+
+        Returns:
+        - dict: hits, misses, stores, evictions, hit_rate and total_bytes.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else None,
+            'total_bytes': self._total_bytes,
+        }
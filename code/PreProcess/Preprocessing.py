@@ -1,6 +1,29 @@
 import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from PreProcess.Audioprocessing import AudioProcessor
+from PreProcess.FeatureCache import FeatureCache
+
+PROSODIC_FEATURES = ('pitch', 'intensity', 'spectral')
+
+
+def _prosodic_features_of_file(audio_file, features=PROSODIC_FEATURES):
+    """
+    Preprocesses one file (without padding) and extracts its prosodic features from a single WORLD analysis.
+
+    Args:
+        audio_file (str): Path to the audio file.
+        features (tuple): Names of the features to extract.
+
+    Returns:
+        dict: File name and features, or None if the file could not be preprocessed.
+    """
+    audio_processor = AudioProcessor(pad=False)
+    if audio_processor.preprocess_audio(audio_file) is None:
+        return None
+    row = {'filename': os.path.splitext(os.path.basename(audio_file))[0]}
+    row.update(audio_processor.extract_prosodic_features(features))
+    return row
 
 
 class Preprocessor:
@@ -15,19 +38,32 @@ class Preprocessor:
         audio_processor (AudioProcessor): Instance of AudioProcessor for audio preprocessing.
     """
 
-    def __init__(self, audio_dir, num_files=None):
+    def __init__(self, audio_dir, num_files=None, cache_dir=None):
         """
         Initialize Preprocessor with audio directory and optional number of files.
 
         Args:
             audio_dir (str): Directory containing audio files.
             num_files (int or None): Number of files to preprocess (default: None, preprocess all).
+            cache_dir (str or None): Directory of a persistent feature cache (default: None, no caching).
         """
         self.audio_dir = audio_dir
         self.num_files = num_files
         self.audio_files = [os.path.join(self.audio_dir, f) for f in os.listdir(self.audio_dir) if f.endswith('.wav')]
         self.filenames = [os.path.splitext(os.path.basename(f))[0] for f in self.audio_files]
-        self.audio_processor = AudioProcessor()
+        self.audio_processor = AudioProcessor(cache=FeatureCache(cache_dir) if cache_dir else None)
+
+    def iter_filenames(self):
+        """
+        Streams the names (without extension) of the wav files in the directory, without extracting features.
+
+        Yields:
+            str: File name of each audio file.
+        """
+        with os.scandir(self.audio_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.wav'):
+                    yield os.path.splitext(entry.name)[0]
 
     def preprocess_directory(self):
         """
@@ -46,3 +82,19 @@ class Preprocessor:
             preprocessed_data.append(self.audio_processor.preprocess_audio(audio_file))
 
         return preprocessed_data
+
+    def extract_prosodic_table(self, features=PROSODIC_FEATURES, num_workers=None):
+        """
+        Computes the prosodic features of every audio file in the directory, in parallel worker processes.
+
+        Args:
+            features (tuple): Names of the features to extract ('pitch', 'intensity', 'spectral').
+            num_workers (int or None): Number of worker processes (default: one per CPU core).
+
+        Returns:
+            list: One dict per successfully processed file with 'filename' and the requested features,
+            in the order of audio_files.
+        """
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            rows = executor.map(_prosodic_features_of_file, self.audio_files, [features] * len(self.audio_files))
+            return [row for row in rows if row is not None]
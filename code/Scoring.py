@@ -0,0 +1,225 @@
+import os
+from functools import partial
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Per-utterance scores. Word counts follow jiwer.process_words (hits, substitutions, deletions, insertions against
+# the reference words, with the same alignment where several have the minimum cost), character counts follow
+# torchmetrics' CharErrorRate (edit distance over raw characters).
+UtteranceScore = namedtuple('UtteranceScore', ['wer', 'cer', 'hits', 'substitutions', 'deletions', 'insertions',
+                                               'ref_words', 'char_errors', 'ref_chars', 'hyp_chars'])
+
+# Length the character edit distance is divided by. The evaluation always passed the ground truth as the
+# torchmetrics 'preds' and the transcription as 'target', so its CER is relative to the hypothesis; 'reference'
+# gives the textbook CER (jiwer.cer, CharErrorRate with the arguments the other way round).
+CER_DENOMINATORS = ('hypothesis', 'reference')
+CER_DENOMINATOR = 'hypothesis'
+
+
+def edit_distance(reference, hypothesis):
+    """
+    Computes the Levenshtein distance between two token sequences with a bit-parallel kernel (Myers/Hyyrö),
+    processing one hypothesis token per step over all reference positions at once.
+
+    Args:
+    - reference (sequence): Reference tokens (characters of a string, or a list of words).
+    - hypothesis (sequence): Hypothesis tokens.
+
+    Returns:
+    - int: Minimum number of substitutions, deletions and insertions turning reference into hypothesis.
+    """
+    m = len(reference)
+    if m == 0:
+        return len(hypothesis)
+    if len(hypothesis) == 0:
+        return m
+
+    # Bit mask of the reference positions holding each token
+    peq = {}
+    for i, token in enumerate(reference):
+        peq[token] = peq.get(token, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+    for token in hypothesis:
+        eq = peq.get(token, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return score
+
+
+def alignment_counts(reference, hypothesis):
+    """
+    Counts hits, substitutions, deletions and insertions of a minimum-cost alignment of two token sequences.
+
+    Where several alignments have the minimum cost, the same one as rapidfuzz's Levenshtein.editops (and so
+    jiwer.process_words) is counted: the common prefix and suffix are matched first, and the backtrace through
+    the bit-parallel matrix prefers deletions, then insertions, then substitutions.
+
+    Args:
+    - reference (sequence): Reference tokens.
+    - hypothesis (sequence): Hypothesis tokens.
+
+    Returns:
+    - tuple: (hits, substitutions, deletions, insertions).
+    """
+    # Tokens are mapped to ints so the kernel compares small integers only
+    vocabulary = {}
+    ref = [vocabulary.setdefault(token, len(vocabulary)) for token in reference]
+    hyp = [vocabulary.setdefault(token, len(vocabulary)) for token in hypothesis]
+
+    prefix = 0
+    while prefix < len(ref) and prefix < len(hyp) and ref[prefix] == hyp[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < len(ref) - prefix and suffix < len(hyp) - prefix and ref[-1 - suffix] == hyp[-1 - suffix]:
+        suffix += 1
+    ref = ref[prefix:len(ref) - suffix]
+    hyp = hyp[prefix:len(hyp) - suffix]
+    hits = prefix + suffix
+    if not ref or not hyp:
+        return hits, 0, len(ref), len(hyp)
+
+    # Same kernel as edit_distance, keeping the vertical delta vectors of every hypothesis position
+    peq = {}
+    for i, token in enumerate(ref):
+        peq[token] = peq.get(token, 0) | (1 << i)
+    mask = (1 << len(ref)) - 1
+    pv = mask
+    mv = 0
+    pv_rows = []
+    mv_rows = []
+    for token in hyp:
+        eq = peq.get(token, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+        pv_rows.append(pv)
+        mv_rows.append(mv)
+
+    substitutions = deletions = insertions = 0
+    col = len(ref)
+    row = len(hyp)
+    while row and col:
+        if pv_rows[row - 1] >> (col - 1) & 1:
+            deletions += 1
+            col -= 1
+        else:
+            row -= 1
+            if row and mv_rows[row - 1] >> (col - 1) & 1:
+                insertions += 1
+            else:
+                col -= 1
+                if ref[col] == hyp[row]:
+                    hits += 1
+                else:
+                    substitutions += 1
+    return hits, substitutions, deletions + col, insertions + row
+
+
+def score_pair(reference, hypothesis, cer_denominator=CER_DENOMINATOR):
+    """
+    Scores one hypothesis against its reference.
+
+    Args:
+    - reference (str): Ground truth transcription.
+    - hypothesis (str): Transcribed text.
+    - cer_denominator (str): 'hypothesis' (the evaluation's CER so far) or 'reference', see CER_DENOMINATOR.
+
+    Returns:
+    - UtteranceScore: WER, CER and the underlying counts.
+    """
+    ref_words = reference.split()
+    if not ref_words:
+        raise ValueError("The reference transcription must contain at least one word")
+    if cer_denominator not in CER_DENOMINATORS:
+        raise ValueError(f"Unknown CER denominator {cer_denominator}, expected one of {CER_DENOMINATORS}")
+    hits, substitutions, deletions, insertions = alignment_counts(ref_words, hypothesis.split())
+    char_errors = edit_distance(reference, hypothesis)
+    char_count = len(reference) if cer_denominator == 'reference' else len(hypothesis)
+
+    return UtteranceScore(
+        wer=(substitutions + deletions + insertions) / len(ref_words),
+        cer=char_errors / char_count if char_count else float('inf'),  # As torchmetrics for an empty target
+        hits=hits,
+        substitutions=substitutions,
+        deletions=deletions,
+        insertions=insertions,
+        ref_words=len(ref_words),
+        char_errors=char_errors,
+        ref_chars=len(reference),
+        hyp_chars=len(hypothesis),
+    )
+
+
+def _score_chunk(pairs, cer_denominator=CER_DENOMINATOR):
+    return [score_pair(reference, hypothesis, cer_denominator) for reference, hypothesis in pairs]
+
+
+def score_corpus(pairs, num_workers=1, chunk_size=256, cer_denominator=CER_DENOMINATOR):
+    """
+    Scores a list of (reference, hypothesis) pairs per utterance and for the whole corpus.
+
+    Args:
+    - pairs (list): (reference, hypothesis) string pairs.
+    - num_workers (int or None): Number of worker processes; 1 scores in this process, None uses one per core.
+    - chunk_size (int): Number of pairs sent to a worker at a time.
+    - cer_denominator (str): 'hypothesis' or 'reference', see CER_DENOMINATOR.
+
+    Returns:
+    - tuple: (list of UtteranceScore in the order of pairs, dict of corpus-level micro-averaged scores with
+      'wer', 'cer' and the summed counts).
+    """
+    pairs = list(pairs)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    if num_workers > 1 and len(pairs) > chunk_size:
+        chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            scores = [score for chunk_scores in executor.map(partial(_score_chunk, cer_denominator=cer_denominator),
+                                                             chunks) for score in chunk_scores]
+    else:
+        scores = _score_chunk(pairs, cer_denominator)
+
+    return scores, corpus_scores(scores, cer_denominator)
+
+
+def corpus_scores(scores, cer_denominator=CER_DENOMINATOR):
+    """
+    Micro-averages per-utterance scores: total errors divided by total reference length (for CER, the total
+    length selected by cer_denominator).
+
+    Args:
+    - scores (list): UtteranceScore entries.
+    - cer_denominator (str): 'hypothesis' or 'reference', see CER_DENOMINATOR.
+
+    Returns:
+    - dict: 'wer', 'cer' and the summed counts.
+    """
+    totals = {field: sum(getattr(score, field) for score in scores)
+              for field in ('hits', 'substitutions', 'deletions', 'insertions', 'ref_words', 'char_errors',
+                            'ref_chars', 'hyp_chars')}
+    word_errors = totals['substitutions'] + totals['deletions'] + totals['insertions']
+    char_count = totals['ref_chars'] if cer_denominator == 'reference' else totals['hyp_chars']
+    totals['wer'] = word_errors / totals['ref_words'] if totals['ref_words'] else 0.0
+    totals['cer'] = totals['char_errors'] / char_count if char_count else 0.0
+    return totals
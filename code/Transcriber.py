@@ -1,10 +1,125 @@
 import os
 import json
+import time
 import vosk
-import wave
-from jiwer import wer  # Library for Word Error Rate calculation
-from silero import silero_te  # Library for text enhancement
-from torchmetrics.text import CharErrorRate  # Torch library for Character Error Rate calculation
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PostProcess.TextEnhancement import get_text_enhancer, BATCH_SETTINGS  # Shared Silero text enhancement
+from dir.GroundTruth import GroundTruthIndex  # Ground truth transcriptions indexed by utterance id
+from Scoring import score_pair, corpus_scores, CER_DENOMINATOR  # Word and Character Error Rate calculation
+from Decoding import decode_audio, decode_audio_words, transcribe_long_file, SEGMENT_WORKERS  # Shared Vosk decoding routines
+from TranscriptionCache import TranscriptionCache  # Persistent cache of decodes and post-processed texts
+from Instrumentation import get_metrics, audio_duration  # Per-stage timing spans, counters and histograms
+
+# Per-process state of the parallel batch workers (see TranscriptionEvaluator.iter_transcriptions_parallel)
+_worker_model = None
+_worker_evaluator = None
+
+# Resident memory of a loaded Vosk model relative to its size on disk (graph and acoustic model plus decoder state)
+MODEL_MEMORY_FACTOR = 1.5
+
+
+def physical_cores():
+    """
+    Counts the physical CPU cores this process may run on. Hyper-threads share a core's execution units, and a
+    second Vosk worker on the same core doubles the memory without adding throughput.
+
+    Returns:
+    - int: Number of distinct (package, core) pairs of the usable CPUs, or the number of usable CPUs where the
+      topology cannot be read.
+    """
+    cpus = os.sched_getaffinity(0) if hasattr(os, 'sched_getaffinity') else range(os.cpu_count() or 1)
+    cores = set()
+    try:
+        for cpu in cpus:
+            topology = f'/sys/devices/system/cpu/cpu{cpu}/topology'
+            with open(os.path.join(topology, 'physical_package_id')) as f:
+                package = f.read().strip()
+            with open(os.path.join(topology, 'core_id')) as f:
+                cores.add((package, f.read().strip()))
+    except OSError:
+        return len(cpus) or 1
+    return len(cores) or 1
+
+
+def available_memory():
+    """
+    Returns the memory available to new processes in bytes, or None where it cannot be determined.
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_num_workers(model_path):
+    """
+    Default number of batch worker processes: one per physical core, bounded by how many copies of the model
+    fit into the available memory (every worker loads its own copy).
+
+    Args:
+    - model_path (str): Directory of the Vosk model.
+
+    Returns:
+    - int: Number of worker processes, at least 1.
+    """
+    num_workers = physical_cores()
+    model_bytes = 0
+    for root, _, files in os.walk(model_path):
+        for name in files:
+            try:
+                model_bytes += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    memory = available_memory()
+    if model_bytes and memory:
+        num_workers = min(num_workers, int(memory // (model_bytes * MODEL_MEMORY_FACTOR)))
+    return max(1, num_workers)
+
+
+def _init_worker(model_path, audio_dir, metadata_dir, output_txt, max_segment_seconds, segment_workers,
+                 transcription_cache_dir, word_timings):
+    """
+    Initializes a batch worker process: loads its own Vosk model once and keeps it for all files it handles.
+
+    Args:
+    - model_path (str): Directory of the Vosk model to load.
+    - audio_dir (str), metadata_dir (str), output_txt (str), max_segment_seconds (float or None),
+      segment_workers (int), transcription_cache_dir (str or None), word_timings (bool): Same arguments as
+      TranscriptionEvaluator.
+    """
+    global _worker_model, _worker_evaluator
+    import torch
+    torch.set_num_threads(1)  # One process per core, so keep torch from oversubscribing the CPU
+    _worker_model = vosk.Model(model_path)
+    _worker_evaluator = TranscriptionEvaluator(audio_dir, metadata_dir, output_txt,
+                                               max_segment_seconds=max_segment_seconds,
+                                               segment_workers=segment_workers,
+                                               transcription_cache_dir=transcription_cache_dir,
+                                               model_path=model_path, word_timings=word_timings)
+    get_text_enhancer().warm_up()
+
+
+def _transcribe_in_worker(filename):
+    """
+    Transcribes and post-processes a single file inside a batch worker process.
+
+    Args:
+    - filename (str): File name without the '.wav' extension.
+
+    Returns:
+    - tuple: (filename, transcription, utterances with word timings or None, error message or None,
+      metrics recorded for the file).
+    """
+    audio_file = os.path.join(_worker_evaluator.audio_dir, filename + '.wav')
+    transcription, utterances, error = _worker_evaluator.transcribe_file(filename, audio_file, _worker_model, True)
+    return filename, transcription, utterances, error, get_metrics().snapshot(reset=True)
 
 
 class TranscriptionEvaluator:
@@ -13,7 +128,9 @@ class TranscriptionEvaluator:
     and saving the results to a text file.
     """
 
-    def __init__(self, audio_dir, metadata_dir, output_txt):
+    def __init__(self, audio_dir, metadata_dir, output_txt, batch_post_processing=False, ground_truth_index=None,
+                 max_segment_seconds=None, transcription_cache_dir=None, model_path=None, word_timings=False,
+                 transcript_writer=None, cer_denominator=CER_DENOMINATOR, segment_workers=SEGMENT_WORKERS):
         """
         Initializes the TranscriptionEvaluator.
 
@@ -21,28 +138,51 @@ class TranscriptionEvaluator:
         - audio_dir (str): Directory containing audio files to transcribe.
         - metadata_dir (str): Directory containing metadata (metadata.csv) with ground truth transcriptions.
         - output_txt (str): Output text file to save the results of the evaluation.
+        - batch_post_processing (bool): If True, transcribe_and_evaluate decodes all files first and then
+          post-processes the transcripts together in chunked batches (see post_processing_batch).
+        - ground_truth_index (str or None): Path of a persistent sqlite index of metadata.csv
+          (default: None, the index is kept in memory).
+        - max_segment_seconds (float or None): If set, long-file mode: recordings are cut at silences into
+          segments of at most this length, which are decoded concurrently (see Decoding.transcribe_long_file).
+        - transcription_cache_dir (str or None): Directory of a persistent TranscriptionCache; unchanged files
+          are then not decoded or post-processed again (default: None, no cache).
+        - model_path (str or None): Directory of the Vosk model, identifying it in the cache. Decodes are only
+          cached when it is given.
+        - word_timings (bool): Decode with word-level start, end and confidence (see Decoding.decode_audio_words).
+        - transcript_writer (TranscriptWriter or None): Receives the structured result of every evaluated file
+          (JSONL / Parquet), in addition to the lines of output_txt.
+        - cer_denominator (str): 'hypothesis' (default, the CER reported so far: edit distance divided by the
+          length of the transcription) or 'reference' (divided by the length of the ground truth), see
+          Scoring.CER_DENOMINATOR.
+        - segment_workers (int): Segments of a recording decoded at the same time in long-file mode.
         """
         self.audio_dir = audio_dir
         self.metadata_dir = metadata_dir
         self.output_txt = output_txt
+        self.batch_post_processing = batch_post_processing
+        self.max_segment_seconds = max_segment_seconds
+        self.segment_workers = segment_workers
+        self.transcription_cache_dir = transcription_cache_dir
+        self.transcription_cache = TranscriptionCache(transcription_cache_dir) if transcription_cache_dir else None
+        self.model_path = model_path
+        self.word_timings = word_timings
+        self.transcript_writer = transcript_writer
+        self.cer_denominator = cer_denominator
         self.transcription = None
         self.ground_truth_transcription = None
         self.char_to_index = {}  # Dictionary to map characters to indices
+        self.scores = []  # UtteranceScore of every evaluated file, for corpus-level scores
+        self.ground_truth = GroundTruthIndex(os.path.join(metadata_dir, 'metadata.csv'), ground_truth_index)
 
     def prepare_char_to_index(self):
         """
         Prepares a character-to-index mapping based on unique characters found in the metadata transcriptions.
         """
-        metadata_file = os.path.join(self.metadata_dir, 'metadata.csv')
-        with open(metadata_file, mode='r', encoding='utf-8') as file:
-            unique_chars = set()
-            for row in file:
-                _, transcription = row.strip().split('|')
-                unique_chars.update(set(transcription))
+        unique_chars = self.ground_truth.unique_chars()
 
-            # Assign an index to each unique character
-            for i, char in enumerate(sorted(unique_chars)):
-                self.char_to_index[char] = i
+        # Assign an index to each unique character
+        for i, char in enumerate(sorted(unique_chars)):
+            self.char_to_index[char] = i
 
     def transcribe_and_evaluate(self, vosk_model, dataset):
         """
@@ -51,38 +191,162 @@ class TranscriptionEvaluator:
 
         Args:
         - vosk_model: Vosk model for speech recognition.
-        - dataset: Dataset containing preprocessed data for transcription.
+        - dataset: Iterable of file names (without '.wav'), e.g. Preprocessor.iter_filenames(), or a
+          SpeechDataset of (features, filename) samples. Features are not used for Vosk decoding.
 
         Returns:
         - results (list): List of tuples (filename, WER score, CER score) for each transcribed audio file.
         """
         results = []
+        raw_transcriptions = []
 
         with open(self.output_txt, mode='w', encoding='utf-8') as file:
-            for spectrograms, filenames in dataset:
-                for i in range(len(spectrograms)):
-                    audio_file = os.path.join(self.audio_dir, filenames + '.wav')
+            for sample in dataset:
+                filename = sample if isinstance(sample, str) else sample[1]
+                audio_file = os.path.join(self.audio_dir, filename + '.wav')
+
+                # Transcribe audio using Vosk
+                self.transcription, utterances, error = self.transcribe_file(filename, audio_file, vosk_model,
+                                                                             not self.batch_post_processing)
+                if error:
+                    print(error)
 
-                    # Transcribe audio using Vosk
-                    try:
-                        self.transcription = self.post_processing(self.transcribe_audio_vosk(audio_file, vosk_model))
-                    except Exception as e:
-                        print(f"Error transcribing {audio_file}: {e}")
-                        self.transcription = ""
+                if self.batch_post_processing:
+                    raw_transcriptions.append((filename, self.transcription, utterances))
+                else:
+                    results.append(self.evaluate_transcription(filename, self.transcription, file, utterances))
 
-                    # Evaluate transcription
-                    self.ground_truth_transcription = self.get_ground_truth_transcription(filenames)
-                    wer_score = wer(self.ground_truth_transcription, self.transcription)
-                    cer_score = self.compute_cer()
+            if self.batch_post_processing:
+                processed = self.post_processing_batch([text for _, text, _ in raw_transcriptions])
+                for (filename, _, utterances), transcription in zip(raw_transcriptions, processed):
+                    results.append(self.evaluate_transcription(filename, transcription, file, utterances))
+
+        return results
 
-                    # Save transcription to file
-                    file.write(f"{filenames}: '{self.transcription}' | '{self.ground_truth_transcription}'. "
-                               f"WER = {wer_score}\n")
+    def transcribe_and_evaluate_parallel(self, model_path, filenames, num_workers=None):
+        """
+        Parallel counterpart of transcribe_and_evaluate. Files are decoded by a pool of worker processes, each
+        holding its own Vosk model, and the per-file lines are written to output_txt in the order of filenames.
+
+        Args:
+        - model_path (str): Directory of the Vosk model; every worker loads it once at start-up.
+        - filenames (list): File names (without '.wav') to transcribe from audio_dir.
+        - num_workers (int or None): Number of worker processes (default: default_num_workers(model_path)).
+
+        Returns:
+        - results (list): List of tuples (filename, WER score, CER score), in the order of filenames.
+        """
+        filenames = list(filenames)
+        order = {filename: i for i, filename in enumerate(filenames)}
+        pending = {}  # Finished files waiting for their predecessors to be written
+        next_index = 0
+        results = []
+
+        with open(self.output_txt, mode='w', encoding='utf-8') as file:
+            for result in self.iter_transcriptions_parallel(model_path, filenames, num_workers):
+                pending[order[result[0]]] = result
 
-                    results.append((filenames, wer_score, cer_score))
+                # Write every result whose predecessors are done, so output order does not depend on timing
+                while next_index in pending:
+                    done_filename, self.transcription, utterances = pending.pop(next_index)
+                    results.append(self.evaluate_transcription(done_filename, self.transcription, file, utterances))
+                    next_index += 1
 
         return results
 
+    def iter_transcriptions_parallel(self, model_path, filenames, num_workers=None):
+        """
+        Transcribes files in a pool of worker processes and yields the results as soon as each file is done.
+
+        Args:
+        - model_path (str): Directory of the Vosk model; every worker loads it once at start-up.
+        - filenames (list): File names (without '.wav') to transcribe from audio_dir.
+        - num_workers (int or None): Number of worker processes (default: default_num_workers(model_path)).
+
+        Yields:
+        - tuple: (filename, post-processed transcription, utterances with word timings or None), in completion
+          order.
+        """
+        if num_workers is None:
+            num_workers = default_num_workers(model_path)
+
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                 initargs=(model_path, self.audio_dir, self.metadata_dir, self.output_txt,
+                                           self.max_segment_seconds, self.segment_workers,
+                                           self.transcription_cache_dir, self.word_timings)) as executor:
+            futures = [executor.submit(_transcribe_in_worker, filename) for filename in filenames]
+            for future in as_completed(futures):
+                filename, transcription, utterances, error, worker_metrics = future.result()
+                get_metrics().merge(worker_metrics)
+                if error:
+                    print(error)
+                yield filename, transcription, utterances
+
+    def evaluate_transcription(self, filename, transcription, file, utterances=None):
+        """
+        Scores a transcription against the ground truth and writes its line to the open output file, and its
+        structured result to the transcript writer if there is one.
+
+        Args:
+        - filename (str): File name without the '.wav' extension.
+        - transcription (str): Post-processed transcription of the file.
+        - file: Open output text file.
+        - utterances (list or None): Utterances with word timings, see Decoding.parse_utterances.
+
+        Returns:
+        - tuple: (filename, WER score, CER score).
+        """
+        self.transcription = transcription
+        self.ground_truth_transcription = self.get_ground_truth_transcription(filename)
+        with get_metrics().span('score', filename=filename):
+            score = score_pair(self.ground_truth_transcription, self.transcription, self.cer_denominator)
+        self.scores.append(score)
+        wer_score, cer_score = score.wer, score.cer
+
+        # Save transcription to file
+        file.write(f"{filename}: '{self.transcription}' | '{self.ground_truth_transcription}'. "
+                   f"WER = {wer_score}\n")
+        if self.transcript_writer is not None:
+            self.transcript_writer.write(filename, self.transcription, self.ground_truth_transcription, score,
+                                         audio_duration(os.path.join(self.audio_dir, filename + '.wav')), utterances)
+
+        return filename, wer_score, cer_score
+
+    def transcribe_file(self, filename, audio_file, vosk_model, post_process=True):
+        """
+        Transcribes (and optionally post-processes) one file inside a 'file' timing span and records its
+        audio duration and real-time factor.
+
+        Args:
+        - filename (str): File name without the '.wav' extension.
+        - audio_file (str): Path to the audio file.
+        - vosk_model: Vosk model for speech recognition.
+        - post_process (bool): Apply post_processing to the transcription.
+
+        Returns:
+        - tuple: (transcription, utterances with word timings or None, error message or None); the transcription
+          is empty on errors. Utterances are only returned with word_timings.
+        """
+        metrics = get_metrics()
+        start = time.perf_counter()
+        utterances = None
+        with metrics.span('file', filename=filename):
+            try:
+                if self.word_timings:
+                    utterances = self.transcribe_words_cached(audio_file, vosk_model)
+                    transcription = ' '.join(utterance['text'] for utterance in utterances)
+                else:
+                    transcription = self.transcribe_cached(audio_file, vosk_model)
+                if post_process:
+                    transcription = self.post_processing(transcription)
+                error = None
+            except Exception as e:
+                metrics.count('errors_total', stage='transcribe')
+                transcription, error = "", f"Error transcribing {audio_file}: {e}"
+        if metrics.enabled:
+            metrics.record_file('evaluator', audio_duration(audio_file), time.perf_counter() - start, bool(error))
+        return transcription, utterances, error
+
     def transcribe_audio_vosk(self, audio_file, vosk_model):
         """
         Transcribes an audio file using Vosk.
@@ -94,26 +358,71 @@ class TranscriptionEvaluator:
         Returns:
         - transcription (str): Transcribed text from the audio file.
         """
-        wf = wave.open(audio_file, 'rb')  # Open the audio file using wave module
-        sample_rate = wf.getframerate()  # Get the sample rate of the audio file
-        chunk_size = int(sample_rate * 0.1)  # Read 100 ms of audio data at a time
-        rec = vosk.KaldiRecognizer(vosk_model, sample_rate)
-        results = []
+        if self.max_segment_seconds:
+            return transcribe_long_file(audio_file, vosk_model, self.max_segment_seconds, self.segment_workers)[0]
+        return decode_audio(audio_file, vosk_model)
 
-        while True:
-            data = wf.readframes(chunk_size)
-            if len(data) == 0:
-                break
-            if rec.AcceptWaveform(data):
-                result = rec.Result()
-                results.append(json.loads(result))
+    def transcribe_audio_words(self, audio_file, vosk_model):
+        """
+        Transcribes an audio file using Vosk, keeping the start, end and confidence of every word.
 
-        result = rec.FinalResult()
-        if result:
-            results.append(json.loads(result))
+        Args:
+        - audio_file (str): Path to the audio file to transcribe.
+        - vosk_model: Vosk model for speech recognition.
 
-        wf.close()  # Close the audio file after processing
-        return ' '.join([res['text'] for res in results])
+        Returns:
+        - utterances (list): Utterances with word timings, see Decoding.parse_utterances.
+        """
+        if self.max_segment_seconds:
+            segments = transcribe_long_file(audio_file, vosk_model, self.max_segment_seconds, self.segment_workers,
+                                            words=True)[1]
+            return [utterance for segment in segments for utterance in segment['utterances']]
+        return decode_audio_words(audio_file, vosk_model)
+
+    def decoder_settings(self):
+        """
+        Returns the decoder settings that influence the transcription, part of the transcription cache key.
+
+        Returns:
+        - dict: Decoder settings.
+        """
+        return {'decoder': 'vosk', 'max_segment_seconds': self.max_segment_seconds}
+
+    def transcribe_cached(self, audio_file, vosk_model):
+        """
+        Transcribes an audio file using Vosk, reusing the raw transcription from the transcription cache
+        if the file, the model and the decoder settings are unchanged.
+
+        Args:
+        - audio_file (str): Path to the audio file to transcribe.
+        - vosk_model: Vosk model for speech recognition.
+
+        Returns:
+        - transcription (str): Raw transcribed text from the audio file.
+        """
+        with get_metrics().span('decode'):
+            if self.transcription_cache is None or self.model_path is None:
+                return self.transcribe_audio_vosk(audio_file, vosk_model)
+            return self.transcription_cache.decode(audio_file, self.model_path, self.decoder_settings(),
+                                                   lambda: self.transcribe_audio_vosk(audio_file, vosk_model))
+
+    def transcribe_words_cached(self, audio_file, vosk_model):
+        """
+        Word-timing counterpart of transcribe_cached; the utterances are cached as JSON.
+
+        Args:
+        - audio_file (str): Path to the audio file to transcribe.
+        - vosk_model: Vosk model for speech recognition.
+
+        Returns:
+        - utterances (list): Utterances with word timings, see Decoding.parse_utterances.
+        """
+        with get_metrics().span('decode'):
+            if self.transcription_cache is None or self.model_path is None:
+                return self.transcribe_audio_words(audio_file, vosk_model)
+            return json.loads(self.transcription_cache.decode(
+                audio_file, self.model_path, {**self.decoder_settings(), 'words': True},
+                lambda: json.dumps(self.transcribe_audio_words(audio_file, vosk_model))))
 
     def get_ground_truth_transcription(self, filename):
         """
@@ -125,15 +434,12 @@ class TranscriptionEvaluator:
         Returns:
         - transcription (str): Ground truth transcription.
         """
-        metadata_file = os.path.join(self.metadata_dir, 'metadata.csv')
-        with open(metadata_file, mode='r', encoding='utf-8') as file:
-            for row in file:
-                file_name, transcription = row.strip().split('|')
-                if file_name == filename:
-                    if not transcription:  # Check if the transcription is empty
-                        return "<EMPTY_TRANSCRIPTION>"  # Return a default value for empty transcriptions
-                    return transcription
-        return "<TRANSCRIPTION_NOT_FOUND>"
+        transcription = self.ground_truth.get(filename)
+        if transcription is None:
+            return "<TRANSCRIPTION_NOT_FOUND>"
+        if not transcription:  # Check if the transcription is empty
+            return "<EMPTY_TRANSCRIPTION>"  # Return a default value for empty transcriptions
+        return transcription
 
     def compute_cer(self):
         """
@@ -142,13 +448,20 @@ class TranscriptionEvaluator:
         Returns:
         - cer_score (float): Character Error Rate (CER) score.
         """
-        cer = CharErrorRate()
-        cer.update(self.ground_truth_transcription, self.transcription)
-        return cer.compute().item()
+        return score_pair(self.ground_truth_transcription, self.transcription, self.cer_denominator).cer
+
+    def corpus_scores(self):
+        """
+        Computes corpus-level (micro-averaged) scores over all files evaluated so far.
+
+        Returns:
+        - dict: Corpus WER and CER with the summed substitution, deletion and insertion counts.
+        """
+        return corpus_scores(self.scores, self.cer_denominator)
 
     def post_processing(self, text):
         """
-        Applies post-processing to the transcribed text using functions from the Silero library.
+        Applies post-processing to the transcribed text using the shared Silero text-enhancement model.
 
         Args:
         - text (str): Transcribed text.
@@ -156,5 +469,31 @@ class TranscriptionEvaluator:
         Returns:
         - processed_text (str): Processed text.
         """
-        _, _, _, _, apply_te_func = silero_te()
-        return apply_te_func(text=text, lan='de')
+        with get_metrics().span('postprocess'):
+            if self.transcription_cache is not None:
+                return self.transcription_cache.postprocess(
+                    [text], 'silero_te/de', lambda texts: [get_text_enhancer('de').enhance(texts[0])])[0]
+            return get_text_enhancer('de').enhance(text)
+
+    def post_processing_batch(self, texts):
+        """
+        Applies post-processing to many transcribed texts at once, in chunked batches.
+
+        Args:
+        - texts (list): Transcribed texts.
+
+        Returns:
+        - processed_texts (list): Processed texts, in the order of texts.
+        """
+        text_enhancer = get_text_enhancer('de')
+        with get_metrics().span('postprocess_batch', texts=len(texts)):
+            if self.transcription_cache is None:
+                processed_texts = text_enhancer.enhance_batch(texts)
+            else:
+                hits = self.transcription_cache.hits
+                processed_texts = self.transcription_cache.postprocess(
+                    texts, f'silero_te/de/{BATCH_SETTINGS}', text_enhancer.enhance_batch)
+                if self.transcription_cache.hits - hits == len(texts):
+                    return processed_texts  # Every text came from the cache
+        print(f"Post-processing throughput: {text_enhancer.last_batch_stats['words_per_second']} words/s")
+        return processed_texts
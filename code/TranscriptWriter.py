@@ -0,0 +1,154 @@
+import os
+import json
+
+BATCH_ROWS = 65536  # Rows buffered per table before they are written as one record batch / row group
+
+# Columns of the tables: (name, Arrow type name)
+TABLE_COLUMNS = {
+    'files': (('file', 'string'), ('transcription', 'string'), ('reference', 'string'), ('wer', 'float64'),
+              ('cer', 'float64'), ('audio_seconds', 'float64'), ('utterances', 'int32'), ('words', 'int32'),
+              ('mean_confidence', 'float64')),
+    'utterances': (('file', 'string'), ('utterance', 'int32'), ('start', 'float64'), ('end', 'float64'),
+                   ('text', 'string'), ('confidence', 'float64'), ('words', 'int32')),
+    'words': (('file', 'string'), ('utterance', 'int32'), ('position', 'int32'), ('word', 'string'),
+              ('start', 'float64'), ('end', 'float64'), ('confidence', 'float64')),
+}
+TABLE_FORMATS = ('parquet', 'arrow')
+
+
+class TranscriptWriter:
+    """
+    Writes structured transcription results while they are produced, so that evaluation runs of any size never
+    hold more than one batch in memory.
+
+    - JSONL: one line per file with its transcription, reference, scores and utterances with word timings.
+    - Tables (Parquet, or the Arrow IPC file format), written in batches of batch_rows rows:
+      files.<ext> (one row per file), utterances.<ext> (one row per utterance) and words.<ext> (one row per
+      word, with start, end and confidence), joined by the 'file' and 'utterance' columns.
+
+    The tables need pyarrow, which is only imported when table_dir is given.
+
+    Attributes:
+        jsonl_path (str or None): Path of the JSONL file.
+        table_dir (str or None): Directory of the tables.
+        table_format (str): 'parquet' or 'arrow'.
+        batch_rows (int): Rows buffered per table before a batch is written.
+        rows (dict): Rows written so far per table.
+    """
+
+    def __init__(self, jsonl_path=None, table_dir=None, table_format='parquet', batch_rows=BATCH_ROWS):
+        """
+        Initializes the TranscriptWriter and opens its output files.
+
+        Args:
+        - jsonl_path (str or None): Path of the JSONL file, None for no JSONL output.
+        - table_dir (str or None): Directory of the tables, None for no table output.
+        - table_format (str): 'parquet' or 'arrow' (Arrow IPC file, e.g. for pyarrow.ipc.open_file or Polars).
+        - batch_rows (int): Rows buffered per table before a batch is written.
+        """
+        if table_format not in TABLE_FORMATS:
+            raise ValueError(f"Unknown table format {table_format}, expected one of {TABLE_FORMATS}")
+        self.jsonl_path = jsonl_path
+        self.table_dir = table_dir
+        self.table_format = table_format
+        self.batch_rows = batch_rows
+        self.rows = {name: 0 for name in TABLE_COLUMNS}
+        self._jsonl = open(jsonl_path, mode='w', encoding='utf-8') if jsonl_path else None
+        self._buffers = {name: {column: [] for column, _ in columns} for name, columns in TABLE_COLUMNS.items()}
+        self._writers = {}
+        self._schemas = {}
+        if table_dir:
+            try:
+                import pyarrow as pa
+            except ImportError:
+                self.close()
+                raise ImportError("Table output needs pyarrow (pip install pyarrow)")
+            os.makedirs(table_dir, exist_ok=True)
+            for name, columns in TABLE_COLUMNS.items():
+                self._schemas[name] = pa.schema([(column, getattr(pa, type_name)()) for column, type_name in columns])
+
+    def write(self, filename, transcription, reference=None, score=None, audio_seconds=None, utterances=None):
+        """
+        Adds the results of one file.
+
+        Args:
+        - filename (str): File name without extension.
+        - transcription (str): Final (post-processed) transcription.
+        - reference (str or None): Ground truth transcription.
+        - score (UtteranceScore or None): WER/CER of the transcription, see Scoring.score_pair.
+        - audio_seconds (float or None): Duration of the audio.
+        - utterances (list or None): Utterances with word timings, see Decoding.parse_utterances.
+        """
+        utterances = utterances or []
+        word_count = sum(len(utterance['words']) for utterance in utterances)
+        mean_confidence = (sum(word['conf'] for utterance in utterances for word in utterance['words']) / word_count
+                           if word_count else None)
+        record = {'file': filename, 'transcription': transcription, 'reference': reference,
+                  'wer': score.wer if score is not None else None, 'cer': score.cer if score is not None else None,
+                  'audio_seconds': audio_seconds, 'utterances': len(utterances), 'words': word_count,
+                  'mean_confidence': mean_confidence}
+        if self._jsonl is not None:
+            self._jsonl.write(json.dumps({**record, 'utterances': utterances}, ensure_ascii=False) + '\n')
+        if not self.table_dir:
+            return
+
+        self._append('files', record)
+        for index, utterance in enumerate(utterances):
+            self._append('utterances', {'file': filename, 'utterance': index, 'start': utterance['start'],
+                                        'end': utterance['end'], 'text': utterance['text'],
+                                        'confidence': utterance['confidence'], 'words': len(utterance['words'])})
+            for position, word in enumerate(utterance['words']):
+                self._append('words', {'file': filename, 'utterance': index, 'position': position,
+                                       'word': word['word'], 'start': word['start'], 'end': word['end'],
+                                       'confidence': word['conf']})
+
+    def _append(self, name, row):
+        buffer = self._buffers[name]
+        for column, values in buffer.items():
+            values.append(row[column])
+        if len(buffer['file']) >= self.batch_rows:
+            self._flush(name)
+
+    def _flush(self, name):
+        # Writes the buffered rows of a table as one record batch (a row group in Parquet)
+        import pyarrow as pa
+        buffer = self._buffers[name]
+        if not buffer['file']:
+            return
+        batch = pa.RecordBatch.from_arrays([pa.array(values, type=field.type) for values, field
+                                            in zip(buffer.values(), self._schemas[name])], schema=self._schemas[name])
+        self._open_writer(name).write_table(pa.Table.from_batches([batch]))
+        self.rows[name] += batch.num_rows
+        for values in buffer.values():
+            values.clear()
+
+    def _open_writer(self, name):
+        import pyarrow as pa
+        if name not in self._writers:
+            path = os.path.join(self.table_dir, f"{name}.{self.table_format}")
+            if self.table_format == 'parquet':
+                import pyarrow.parquet as pq
+                self._writers[name] = pq.ParquetWriter(path, self._schemas[name])
+            else:
+                self._writers[name] = pa.ipc.new_file(path, self._schemas[name])
+        return self._writers[name]
+
+    def close(self):
+        """
+        Writes the remaining rows and closes the output files. Tables without any row are written empty.
+        """
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
+        if self._schemas:
+            for name in TABLE_COLUMNS:
+                self._flush(name)
+                self._open_writer(name).close()  # A table without rows is still written, with its schema
+            self._writers = {}
+            self._schemas = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,362 @@
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import argparse
+import threading
+from Instrumentation import get_metrics
+
+CACHE_FILE = 'transcriptions.sqlite'
+
+
+class TranscriptionCache:
+    """
+    Persistent cache of transcriptions, stored in an sqlite database.
+
+    Raw Vosk output is keyed by the audio content hash, the identity of the model directory and the decoder
+    settings. Post-processed text is stored separately, keyed by the hash of the raw text and a post-processing
+    id, so changing post-processing keeps all decodes. When the cache grows beyond max_bytes, the least
+    recently used entries are evicted. The total size of the entries is kept in the database (meta table) and
+    updated with every insert and removal, so checking the bound does not scan the cache.
+
+    Attributes:
+        cache_dir (str): Directory holding the cache database.
+        max_bytes (int or None): Size bound of the cached texts, None for unbounded.
+        hits (int), misses (int): Lookup statistics of this instance.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 ** 2):
+        """
+        Initializes the TranscriptionCache, creating the cache directory and database if needed.
+
+        Args:
+        - cache_dir (str): Directory holding the cache database.
+        - max_bytes (int or None): Size bound of the cached texts (default: 512 MB), None for unbounded.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._content_hashes = {}
+        self._model_identities = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        # Parallel worker processes share the database; the timeout lets writers wait for each other
+        self._connection = sqlite3.connect(os.path.join(cache_dir, CACHE_FILE), timeout=30,
+                                           check_same_thread=False)
+        with self._connection:
+            self._connection.execute('CREATE TABLE IF NOT EXISTS decodes (key TEXT PRIMARY KEY, audio_hash TEXT, '
+                                     'model_id TEXT, settings TEXT, raw TEXT, size INTEGER, last_access REAL)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS postprocessed (raw_hash TEXT, postprocess_id TEXT, '
+                                     'text TEXT, size INTEGER, last_access REAL, '
+                                     'PRIMARY KEY (raw_hash, postprocess_id))')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)')
+            if self._connection.execute("SELECT 1 FROM meta WHERE name = 'total_bytes'").fetchone() is None:
+                self._set_total_bytes(self._sum_bytes())  # New database, or one created before the running total
+
+    def content_hash(self, audio_file):
+        """
+        Returns the SHA-256 of the content of a file, reusing the previous hash while the file is unchanged.
+
+        Args:
+        - audio_file (str): Path to the file.
+
+        Returns:
+        - str: Hexadecimal content hash.
+        """
+        stat = os.stat(audio_file)
+        signature = (os.path.abspath(audio_file), stat.st_mtime_ns, stat.st_size)
+        if signature not in self._content_hashes:
+            sha = hashlib.sha256()
+            with open(audio_file, 'rb') as file:
+                for block in iter(lambda: file.read(1 << 20), b''):
+                    sha.update(block)
+            self._content_hashes[signature] = sha.hexdigest()
+        return self._content_hashes[signature]
+
+    def model_identity(self, model_dir):
+        """
+        Identifies a model directory by the relative paths, sizes and modification times of its files.
+
+        Args:
+        - model_dir (str): Vosk model directory.
+
+        Returns:
+        - str: Hexadecimal model identity.
+        """
+        model_dir = os.path.abspath(model_dir)
+        if model_dir not in self._model_identities:
+            sha = hashlib.sha256()
+            for root, dirs, files in os.walk(model_dir):
+                dirs.sort()
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    sha.update(f"{os.path.relpath(path, model_dir)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+            self._model_identities[model_dir] = sha.hexdigest()
+        return self._model_identities[model_dir]
+
+    def decode_key(self, audio_file, model_dir, settings):
+        """
+        Computes the key of a decode.
+
+        Args:
+        - audio_file (str): Path to the audio file.
+        - model_dir (str): Vosk model directory.
+        - settings (dict): Decoder settings that influence the output.
+
+        Returns:
+        - tuple: (key, audio hash, model identity, settings JSON).
+        """
+        audio_hash = self.content_hash(audio_file)
+        model_id = self.model_identity(model_dir)
+        settings_json = json.dumps(settings, sort_keys=True)
+        key = hashlib.sha256(f"{audio_hash}|{model_id}|{settings_json}".encode()).hexdigest()
+        return key, audio_hash, model_id, settings_json
+
+    def get_decode(self, audio_file, model_dir, settings):
+        """
+        Looks up the raw Vosk output of an audio file.
+
+        Args:
+        - audio_file (str): Path to the audio file.
+        - model_dir (str): Vosk model directory.
+        - settings (dict): Decoder settings.
+
+        Returns:
+        - str or None: Cached raw transcription, or None on a miss.
+        """
+        key = self.decode_key(audio_file, model_dir, settings)[0]
+        return self._lookup('decodes', 'SELECT raw FROM decodes WHERE key = ?',
+                            'UPDATE decodes SET last_access = ? WHERE key = ?', (key,))
+
+    def put_decode(self, audio_file, model_dir, settings, raw):
+        """
+        Stores the raw Vosk output of an audio file.
+
+        Args:
+        - audio_file (str): Path to the audio file.
+        - model_dir (str): Vosk model directory.
+        - settings (dict): Decoder settings.
+        - raw (str): Raw transcription.
+        """
+        key, audio_hash, model_id, settings_json = self.decode_key(audio_file, model_dir, settings)
+        size = len(raw.encode())
+        self._store('SELECT size FROM decodes WHERE key = ?', (key,),
+                    'INSERT OR REPLACE INTO decodes VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (key, audio_hash, model_id, settings_json, raw, size, time.time()), size)
+
+    def get_postprocessed(self, raw, postprocess_id):
+        """
+        Looks up the post-processed version of a raw transcription.
+
+        Args:
+        - raw (str): Raw transcription.
+        - postprocess_id (str): Identifies the post-processing (model, language, chunking).
+
+        Returns:
+        - str or None: Cached post-processed text, or None on a miss.
+        """
+        return self._lookup('postprocessed',
+                            'SELECT text FROM postprocessed WHERE raw_hash = ? AND postprocess_id = ?',
+                            'UPDATE postprocessed SET last_access = ? WHERE raw_hash = ? AND postprocess_id = ?',
+                            (_text_hash(raw), postprocess_id))
+
+    def put_postprocessed(self, raw, postprocess_id, text):
+        """
+        Stores the post-processed version of a raw transcription.
+
+        Args:
+        - raw (str): Raw transcription.
+        - postprocess_id (str): Identifies the post-processing.
+        - text (str): Post-processed text.
+        """
+        raw_hash = _text_hash(raw)
+        size = len(text.encode())
+        self._store('SELECT size FROM postprocessed WHERE raw_hash = ? AND postprocess_id = ?',
+                    (raw_hash, postprocess_id), 'INSERT OR REPLACE INTO postprocessed VALUES (?, ?, ?, ?, ?)',
+                    (raw_hash, postprocess_id, text, size, time.time()), size)
+
+    def decode(self, audio_file, model_dir, settings, transcribe):
+        """
+        Returns the raw transcription of an audio file, decoding and storing it only on a cache miss.
+
+        Args:
+        - audio_file (str): Path to the audio file.
+        - model_dir (str): Vosk model directory.
+        - settings (dict): Decoder settings.
+        - transcribe (callable): Called without arguments on a miss; returns the raw transcription.
+
+        Returns:
+        - str: Raw transcription.
+        """
+        raw = self.get_decode(audio_file, model_dir, settings)
+        if raw is None:
+            raw = transcribe()
+            self.put_decode(audio_file, model_dir, settings, raw)
+        return raw
+
+    def postprocess(self, texts, postprocess_id, process):
+        """
+        Returns the post-processed versions of raw transcriptions, processing only the cache misses.
+
+        Args:
+        - texts (list): Raw transcriptions.
+        - postprocess_id (str): Identifies the post-processing.
+        - process (callable): Called with the list of missed texts; returns their post-processed versions.
+
+        Returns:
+        - list: Post-processed texts, in the order of texts.
+        """
+        processed = [self.get_postprocessed(text, postprocess_id) for text in texts]
+        missed = [i for i, text in enumerate(processed) if text is None]
+        if missed:
+            for i, text in zip(missed, process([texts[i] for i in missed])):
+                self.put_postprocessed(texts[i], postprocess_id, text)
+                processed[i] = text
+        return processed
+
+    def _lookup(self, table, select, touch, params):
+        with self._lock:
+            row = self._connection.execute(select, params).fetchone()
+            get_metrics().count('cache_misses_total' if row is None else 'cache_hits_total', cache=table)
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._connection:
+                self._connection.execute(touch, (time.time(),) + params)
+            return row[0]
+
+    def _store(self, select_size, key_params, insert, params, size):
+        # The running total is updated first: that statement opens the write transaction, so no other process
+        # can replace the same entry between reading its old size and inserting the new one
+        with self._lock, self._connection:
+            self._connection.execute(f"UPDATE meta SET value = value + ? - COALESCE(({select_size}), 0) "
+                                     "WHERE name = 'total_bytes'", (size,) + key_params)
+            self._connection.execute(insert, params)
+            if self.max_bytes is not None and self._total_bytes() > self.max_bytes:
+                self._prune(int(0.9 * self.max_bytes))
+
+    def _total_bytes(self):
+        return self._connection.execute("SELECT value FROM meta WHERE name = 'total_bytes'").fetchone()[0]
+
+    def _set_total_bytes(self, total):
+        self._connection.execute("INSERT OR REPLACE INTO meta VALUES ('total_bytes', ?)", (total,))
+
+    def _sum_bytes(self):
+        # Full scan, only used to create and resynchronize the running total
+        return sum(self._connection.execute(f'SELECT COALESCE(SUM(size), 0) FROM {table}').fetchone()[0]
+                   for table in ('decodes', 'postprocessed'))
+
+    def _prune(self, max_bytes):
+        # Delete least recently used entries of both tables until the total size fits
+        entries = self._connection.execute(
+            "SELECT 'decodes', key, NULL, size, last_access FROM decodes UNION ALL "
+            "SELECT 'postprocessed', raw_hash, postprocess_id, size, last_access FROM postprocessed "
+            "ORDER BY last_access").fetchall()
+        total = sum(entry[3] for entry in entries)
+        removed = 0
+        for table, key, postprocess_id, size, _ in entries:
+            if total <= max_bytes:
+                break
+            if table == 'decodes':
+                self._connection.execute('DELETE FROM decodes WHERE key = ?', (key,))
+            else:
+                self._connection.execute('DELETE FROM postprocessed WHERE raw_hash = ? AND postprocess_id = ?',
+                                         (key, postprocess_id))
+            total -= size
+            removed += 1
+        self._set_total_bytes(total)
+        return removed
+
+    def prune(self, max_bytes=None, older_than=None):
+        """
+        Removes entries to bring the cache under a size, and/or entries not used for a while.
+
+        Args:
+        - max_bytes (int or None): Size to prune the cache down to (least recently used entries go first).
+        - older_than (float or None): Remove entries not used for this many seconds.
+
+        Returns:
+        - int: Number of removed entries.
+        """
+        removed = 0
+        with self._lock, self._connection:
+            if older_than is not None:
+                cutoff = time.time() - older_than
+                for table in ('decodes', 'postprocessed'):
+                    removed += self._connection.execute(f'DELETE FROM {table} WHERE last_access < ?',
+                                                        (cutoff,)).rowcount
+                self._set_total_bytes(self._sum_bytes())
+            if max_bytes is not None:
+                removed += self._prune(max_bytes)
+        return removed
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM decodes')
+            self._connection.execute('DELETE FROM postprocessed')
+            self._set_total_bytes(0)
+
+    def stats(self):
+        """
+        Returns the contents and lookup statistics of the cache.
+
+        Returns:
+        - dict: Entry counts and sizes per table, models, and hits/misses of this instance.
+        """
+        with self._lock:
+            decodes, decode_bytes = self._connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM decodes').fetchone()
+            postprocessed, postprocessed_bytes = self._connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM postprocessed').fetchone()
+            models = self._connection.execute('SELECT COUNT(DISTINCT model_id) FROM decodes').fetchone()[0]
+        return {
+            'decodes': decodes,
+            'decode_bytes': decode_bytes,
+            'postprocessed': postprocessed,
+            'postprocessed_bytes': postprocessed_bytes,
+            'models': models,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def close(self):
+        self._connection.close()
+
+
+def _text_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or prune the transcription cache.')
+    parser.add_argument('--cache-dir', required=True, help='Directory of the transcription cache.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help='Show entry counts and sizes.')
+    prune_parser = subparsers.add_parser('prune', help='Remove least recently used or old entries.')
+    prune_parser.add_argument('--max-mb', type=float, help='Prune the cache down to this size.')
+    prune_parser.add_argument('--older-than-days', type=float, help='Remove entries unused for this many days.')
+    subparsers.add_parser('clear', help='Remove all entries.')
+    args = parser.parse_args()
+
+    cache = TranscriptionCache(args.cache_dir, max_bytes=None)
+    if args.command == 'stats':
+        print(json.dumps(cache.stats(), indent=2))
+    elif args.command == 'prune':
+        removed = cache.prune(max_bytes=int(args.max_mb * 1024 ** 2) if args.max_mb is not None else None,
+                              older_than=args.older_than_days * 86400 if args.older_than_days is not None else None)
+        print(f"Removed {removed} entries")
+    else:
+        cache.clear()
+        print("Cache cleared")
+    cache.close()
+
+
+if __name__ == '__main__':
+    main()
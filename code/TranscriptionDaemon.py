@@ -0,0 +1,366 @@
+import os
+import json
+import time
+import signal
+import sqlite3
+import argparse
+import threading
+from Transcriber import TranscriptionEvaluator
+from Instrumentation import get_metrics, audio_duration
+from config import load_config
+from Decoding import SEGMENT_WORKERS
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac')
+POLL_SECONDS = 5  # Interval between scans of the watched directory
+SETTLE_SECONDS = 2  # Files modified more recently than this may still be copied and are left for the next scan
+MAX_ATTEMPTS = 3  # Failed jobs are retried until they failed this often
+THROUGHPUT_WINDOW = 600  # Seconds of finished jobs the throughput figures are computed over
+
+
+class JobQueue:
+    """
+    Durable queue of transcription jobs in an sqlite database, one row per audio file.
+
+    A job is 'queued', 'running', 'done' or 'failed'. Jobs are claimed in the order they were queued; a file is
+    queued again when its size or modification time changes. Jobs left 'running' by a crashed daemon are put back
+    into the queue by recover(), so finished jobs are never redone; a job that was interrupted as often as a job
+    may fail (e.g. a file crashing the decoder) is given up instead. The queue is meant for one daemon at a time.
+    """
+
+    def __init__(self, db_path):
+        """
+        Initializes the JobQueue, creating the database if needed.
+
+        Args:
+        - db_path (str): Path to the sqlite database.
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS jobs (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, '
+                'status TEXT, attempts INTEGER DEFAULT 0, queued_at REAL, started_at REAL, finished_at REAL, '
+                'audio_seconds REAL, output TEXT, error TEXT)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, queued_at)')
+
+    def enqueue(self, path, mtime_ns, size):
+        """
+        Queues a file, unless it is already known with the same size and modification time.
+
+        Args:
+        - path (str): Path to the audio file.
+        - mtime_ns (int), size (int): Modification time and size of the file.
+
+        Returns:
+        - bool: True if the file was (re-)queued.
+        """
+        with self._lock, self._connection:
+            row = self._connection.execute('SELECT mtime_ns, size FROM jobs WHERE path = ?', (path,)).fetchone()
+            if row is not None and tuple(row) == (mtime_ns, size):
+                return False
+            self._connection.execute(
+                'INSERT OR REPLACE INTO jobs (path, mtime_ns, size, status, attempts, queued_at) '
+                "VALUES (?, ?, ?, 'queued', 0, ?)", (path, mtime_ns, size, time.time()))
+            return True
+
+    def claim(self):
+        """
+        Marks the oldest queued job as running.
+
+        Returns:
+        - str or None: Path of the claimed file, or None if the queue is empty.
+        """
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT path FROM jobs WHERE status = 'queued' ORDER BY queued_at LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 "
+                                     'WHERE path = ?', (time.time(), row[0]))
+            return row[0]
+
+    def complete(self, path, output, audio_seconds=None):
+        """
+        Marks a job as done.
+
+        Args:
+        - path (str): Path of the audio file.
+        - output (str): Path of the written transcript.
+        - audio_seconds (float or None): Duration of the audio.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("UPDATE jobs SET status = 'done', finished_at = ?, output = ?, "
+                                     'audio_seconds = ?, error = NULL WHERE path = ?',
+                                     (time.time(), output, audio_seconds, path))
+
+    def fail(self, path, error, max_attempts=MAX_ATTEMPTS):
+        """
+        Records a failed attempt; the job is queued again until it failed max_attempts times.
+
+        Args:
+        - path (str): Path of the audio file.
+        - error (str): Error message.
+        - max_attempts (int): Attempts before the job is given up.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                'finished_at = ?, error = ? WHERE path = ?', (max_attempts, time.time(), error, path))
+
+    def recover(self, max_attempts=MAX_ATTEMPTS):
+        """
+        Puts jobs left running by a crashed or killed daemon back into the queue, unless they were already claimed
+        max_attempts times: a file that takes the process down with it would otherwise be retried forever.
+
+        Args:
+        - max_attempts (int): Attempts before the job is given up, as in fail().
+
+        Returns:
+        - tuple: (number of jobs queued again, number of jobs given up).
+        """
+        with self._lock, self._connection:
+            failed = self._connection.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE status = 'running' "
+                'AND attempts >= ?', (time.time(), f"Interrupted {max_attempts} times while transcribing",
+                                      max_attempts)).rowcount
+            queued = self._connection.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+            return queued, failed
+
+    def stats(self, window=THROUGHPUT_WINDOW):
+        """
+        Returns the queue depth and the throughput of the last window seconds.
+
+        Args:
+        - window (float): Length of the throughput window in seconds.
+
+        Returns:
+        - dict: Job counts per status, files per minute, audio seconds per second and mean job seconds.
+        """
+        since = time.time() - window
+        with self._lock:
+            counts = dict(self._connection.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status'))
+            done, audio_seconds, job_seconds = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(audio_seconds), 0), COALESCE(SUM(finished_at - started_at), 0) "
+                "FROM jobs WHERE status = 'done' AND finished_at >= ?", (since,)).fetchone()
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'files_per_minute': round(done * 60 / window, 2),
+            'audio_seconds_per_second': round(audio_seconds / window, 2),
+            'mean_job_seconds': round(job_seconds / done, 2) if done else None,
+        }
+
+    def close(self):
+        self._connection.close()
+
+
+class TranscriptionDaemon:
+    """
+    Headless transcription service: watches a directory, queues new audio files in a JobQueue and transcribes them
+    with worker threads sharing one Vosk model, using TranscriptionEvaluator's transcribe_audio_vosk and
+    post_processing. Each transcript is written atomically to output_dir/<file name with extension>.txt, so that
+    recordings of the same name in different formats do not overwrite each other.
+
+    Attributes:
+        watch_dir (str): Directory watched for audio files.
+        output_dir (str): Directory the transcripts are written to.
+        queue (JobQueue): Durable job store.
+        num_workers (int): Number of worker threads.
+    """
+
+    def __init__(self, watch_dir, output_dir, queue, vosk_model, model_path=None, num_workers=2,
+                 poll_seconds=POLL_SECONDS, transcription_cache_dir=None, max_segment_seconds=None,
+                 segment_workers=SEGMENT_WORKERS):
+        """
+        Initializes the TranscriptionDaemon.
+
+        Args:
+        - watch_dir (str): Directory watched for audio files.
+        - output_dir (str): Directory the transcripts are written to.
+        - queue (JobQueue): Durable job store.
+        - vosk_model: Loaded Vosk model, shared by the workers.
+        - model_path (str or None): Directory of the Vosk model, identifying it in the transcription cache.
+        - num_workers (int): Number of worker threads (Vosk releases the GIL while decoding).
+        - poll_seconds (float): Interval between scans of watch_dir.
+        - transcription_cache_dir (str or None): Directory of a persistent TranscriptionCache.
+        - max_segment_seconds (float or None): Long-file mode, see TranscriptionEvaluator.
+        - segment_workers (int): Segments of a recording decoded at the same time in long-file mode.
+        """
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir
+        self.queue = queue
+        self.vosk_model = vosk_model
+        self.num_workers = num_workers
+        self.poll_seconds = poll_seconds
+        self.evaluator = TranscriptionEvaluator(watch_dir, watch_dir, os.devnull,
+                                                max_segment_seconds=max_segment_seconds,
+                                                segment_workers=segment_workers,
+                                                transcription_cache_dir=transcription_cache_dir,
+                                                model_path=model_path)
+        self.settling = 0  # Audio files left out of the last scan because they were still being written
+        self._stop = threading.Event()
+        self._work_available = threading.Event()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def scan(self):
+        """
+        Queues the audio files of watch_dir that are new or changed and no longer being written.
+
+        Returns:
+        - int: Number of queued files.
+        """
+        queued = 0
+        settling = 0
+        settled_before = time.time() - SETTLE_SECONDS
+        with os.scandir(self.watch_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime > settled_before:
+                    settling += 1
+                    continue
+                if self.queue.enqueue(os.path.abspath(entry.path), stat.st_mtime_ns, stat.st_size):
+                    queued += 1
+        self.settling = settling
+        if queued:
+            self._work_available.set()
+        return queued
+
+    def process(self, audio_file):
+        """
+        Transcribes one file and writes its transcript atomically (temporary file, then rename).
+
+        Args:
+        - audio_file (str): Path to the audio file.
+
+        Returns:
+        - tuple: (path of the transcript, duration of the audio in seconds or None).
+        """
+        start = time.perf_counter()
+        audio_seconds = audio_duration(audio_file)
+        with get_metrics().span('file', filename=os.path.basename(audio_file)):
+            transcription = self.evaluator.post_processing(
+                self.evaluator.transcribe_cached(audio_file, self.vosk_model))
+        output_file = os.path.join(self.output_dir, os.path.basename(audio_file) + '.txt')
+        temp_file = f"{output_file}.{threading.get_ident()}.tmp"
+        with open(temp_file, mode='w', encoding='utf-8') as file:
+            file.write(transcription + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, output_file)
+        get_metrics().record_file('daemon', audio_seconds, time.perf_counter() - start)
+        return output_file, audio_seconds
+
+    def worker(self):
+        # Claims and processes jobs until the daemon stops; waits for the next scan when the queue is empty
+        while not self._stop.is_set():
+            audio_file = self.queue.claim()
+            if audio_file is None:
+                self._work_available.clear()
+                self._work_available.wait(self.poll_seconds)
+                continue
+            try:
+                output_file, audio_seconds = self.process(audio_file)
+                self.queue.complete(audio_file, output_file, audio_seconds)
+            except Exception as e:
+                print(f"Error transcribing {audio_file}: {e}")
+                get_metrics().count('errors_total', stage='transcribe')
+                self.queue.fail(audio_file, str(e))
+
+    def run(self, once=False, status_file=None):
+        """
+        Recovers interrupted jobs, then scans and processes until stop() is called.
+
+        Args:
+        - once (bool): Process the files present now, including those still being written, and return when the
+          queue is empty.
+        - status_file (str or None): JSON file updated with the queue stats after every scan.
+        """
+        recovered, given_up = self.queue.recover()
+        if recovered:
+            print(f"Resuming {recovered} interrupted jobs")
+        if given_up:
+            print(f"Giving up {given_up} jobs interrupted {MAX_ATTEMPTS} times")
+        workers = [threading.Thread(target=self.worker, daemon=True) for _ in range(self.num_workers)]
+        for thread in workers:
+            thread.start()
+
+        while not self._stop.is_set():
+            self.scan()
+            stats = self.report(status_file)
+            if once and stats['queued'] == 0 and stats['running'] == 0 and not self.settling:
+                break
+            self._stop.wait(self.poll_seconds if not once else 0.5)
+
+        self._stop.set()
+        self._work_available.set()
+        for thread in workers:
+            thread.join()
+        self.report(status_file)
+
+    def report(self, status_file=None):
+        # Publishes the queue stats as gauges and, if requested, as a JSON file
+        stats = self.queue.stats()
+        metrics = get_metrics()
+        for status in ('queued', 'running', 'done', 'failed'):
+            metrics.gauge('jobs', stats[status], status=status)
+        metrics.gauge('jobs_files_per_minute', stats['files_per_minute'])
+        if status_file:
+            temp_file = f"{status_file}.tmp"
+            with open(temp_file, mode='w', encoding='utf-8') as file:
+                json.dump(dict(stats, updated=time.strftime('%Y-%m-%dT%H:%M:%S')), file, indent=2)
+            os.replace(temp_file, status_file)
+        return stats
+
+    def stop(self):
+        # Running jobs are finished; queued jobs stay in the database for the next start
+        self._stop.set()
+        self._work_available.set()
+
+
+def main():
+    config = load_config()
+    parser = argparse.ArgumentParser(description='Watch a directory and transcribe new audio files into text files.')
+    parser.add_argument('watch_dir', help='Directory watched for audio files.')
+    parser.add_argument('--output-dir', default='PROCESSED_TRANSCRIPTION', help='Directory of the transcripts.')
+    parser.add_argument('--db', default='transcription_jobs.sqlite', help='sqlite job database.')
+    parser.add_argument('--model', default=config['vosk_model_path'], help='Vosk model directory.')
+    parser.add_argument('--workers', type=int, default=2, help='Number of worker threads.')
+    parser.add_argument('--poll-seconds', type=float, default=POLL_SECONDS)
+    parser.add_argument('--max-segment-seconds', type=float, default=None, help='Long-file mode segment length.')
+    parser.add_argument('--segment-workers', type=int, default=SEGMENT_WORKERS,
+                        help='Segments of a recording decoded at the same time in long-file mode.')
+    parser.add_argument('--status-file', default=None, help='JSON file updated with queue depth and throughput.')
+    parser.add_argument('--metrics-port', type=int, default=0, help='Serve Prometheus metrics on this port.')
+    parser.add_argument('--once', action='store_true', help='Process the files present now, then exit.')
+    parser.add_argument('--status', action='store_true', help='Print the queue stats of --db and exit.')
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db)
+    if args.status:
+        print(json.dumps(queue.stats(), indent=2))
+        return
+
+    import vosk
+    daemon = TranscriptionDaemon(args.watch_dir, args.output_dir, queue, vosk.Model(args.model),
+                                 model_path=args.model, num_workers=args.workers, poll_seconds=args.poll_seconds,
+                                 transcription_cache_dir=config.get('transcription_cache_dir') or None,
+                                 max_segment_seconds=args.max_segment_seconds,
+                                 segment_workers=args.segment_workers)
+    if args.metrics_port:
+        get_metrics().serve_prometheus(args.metrics_port)
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    signal.signal(signal.SIGINT, lambda *_: daemon.stop())
+    print(f"Watching {args.watch_dir} with {args.workers} workers")
+    daemon.run(once=args.once, status_file=args.status_file)
+    print(json.dumps(queue.stats(), indent=2))
+    queue.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,513 @@
+import io
+import os
+import json
+import time
+import wave
+import queue
+import signal
+import argparse
+import tempfile
+import threading
+import http.client
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import vosk
+from Decoding import feed_blocks, join_results
+from PreProcess.AudioIngest import TARGET_RATE, PolyphaseResampler, iter_pcm16_blocks, float_to_pcm16
+from Instrumentation import get_metrics
+from config import load_config
+
+SERVER_PORT = 8765
+MAX_QUEUE = 8  # Requests admitted beyond the recognizers; they wait for one to become free
+QUEUE_TIMEOUT = 30  # Seconds an admitted request waits for a recognizer before it gets a 503
+MAX_UPLOAD_BYTES = 1 << 30  # Larger uploads are refused with 413
+SPOOL_BYTES = 32 << 20  # Uploads larger than this are spooled to a temporary file instead of memory
+READ_BYTES = 1 << 16  # Request body read per call
+RETRY_AFTER_SECONDS = 1  # Retry-After sent with 429 and 503 responses
+MAX_RETRIES = 5  # Attempts of the client when the server is overloaded
+
+
+class RequestError(Exception):
+    """Error answered with an HTTP status, e.g. 429 when the admission queue is full."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RecognizerPool:
+    """
+    Fixed set of KaldiRecognizers on one shared Vosk model, with bounded admission.
+
+    A request first takes an admission slot (admission()); there are as many slots as recognizers plus max_queue,
+    and a request finding none free is refused at once with 429. An admitted request then waits up to
+    queue_timeout for a recognizer (recognizer()) and gets 503 if none became free. A recognizer is returned to
+    the pool after its final result, which leaves it ready for the next utterance; a recognizer whose request
+    failed halfway is replaced by a new one.
+
+    Attributes:
+        size (int): Number of recognizers.
+        max_queue (int): Requests that may wait for a recognizer.
+        queue_timeout (float): Seconds a request waits for a recognizer.
+        busy (int): Recognizers in use.
+        waiting (int): Admitted requests waiting for a recognizer.
+    """
+
+    def __init__(self, vosk_model, size=2, max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT,
+                 sample_rate=TARGET_RATE):
+        """
+        Initializes the RecognizerPool.
+
+        Args:
+        - vosk_model: Loaded Vosk model, shared by all recognizers.
+        - size (int): Number of recognizers, i.e. requests decoded at the same time.
+        - max_queue (int): Requests that may wait for a recognizer.
+        - queue_timeout (float): Seconds a request waits for a recognizer.
+        - sample_rate (int): Sample rate of the recognizers.
+        """
+        self.vosk_model = vosk_model
+        self.size = size
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.sample_rate = sample_rate
+        self.busy = 0
+        self.waiting = 0
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(self._new_recognizer())
+        self._slots = threading.BoundedSemaphore(size + max_queue)
+        self._lock = threading.Lock()
+
+    def _new_recognizer(self):
+        return vosk.KaldiRecognizer(self.vosk_model, self.sample_rate)
+
+    def _update(self, busy=0, waiting=0):
+        with self._lock:
+            self.busy += busy
+            self.waiting += waiting
+            metrics = get_metrics()
+            metrics.gauge('recognizers_busy', self.busy)
+            metrics.gauge('requests_waiting', self.waiting)
+
+    @contextmanager
+    def admission(self):
+        # Holds an admission slot for the whole request; raises RequestError(429) if there is none
+        if not self._slots.acquire(blocking=False):
+            raise RequestError(429, f"Server busy: {self.size} requests decoding, {self.max_queue} waiting")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def recognizer(self):
+        # Yields (recognizer, seconds waited for it); raises RequestError(503) after queue_timeout
+        start = time.perf_counter()
+        self._update(waiting=1)
+        try:
+            rec = self._idle.get(timeout=self.queue_timeout)
+        except queue.Empty:
+            raise RequestError(503, f"No recognizer became free within {self.queue_timeout} s")
+        finally:
+            self._update(waiting=-1)
+        self._update(busy=1)
+        finished = False
+        try:
+            yield rec, time.perf_counter() - start
+            finished = True
+        finally:
+            self._update(busy=-1)
+            self._idle.put(rec if finished else self._new_recognizer())
+
+
+class TranscriptionServer:
+    """
+    Local HTTP transcription service: loads the Vosk model once and decodes concurrent requests with a
+    RecognizerPool, so several workstations share one model instead of each loading its own.
+
+    Endpoints:
+        POST /transcribe: An audio file (WAV, FLAC or MP3) as raw request body or multipart/form-data upload.
+        POST /stream?rate=16000: Raw 16-bit mono PCM, usually sent with chunked transfer encoding; each chunk is
+            decoded as it arrives, so the result is ready right after the last chunk.
+        GET /health: Pool size and load. GET /metrics: Prometheus metrics.
+
+    Both POST endpoints accept postprocess=1 to restore punctuation and capitalization with Silero. They answer
+    with JSON: the text, the audio duration and the latency of the request (queue wait, decode, total); overloaded
+    requests get 429 or 503 with a Retry-After header.
+
+    Attributes:
+        pool (RecognizerPool): Recognizers shared by the requests.
+        language (str): Language of the text enhancer used for postprocess=1.
+        max_upload_bytes (int): Largest accepted request body.
+    """
+
+    def __init__(self, vosk_model, num_recognizers=2, max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT,
+                 language='de', max_upload_bytes=MAX_UPLOAD_BYTES):
+        """
+        Initializes the TranscriptionServer.
+
+        Args:
+        - vosk_model: Loaded Vosk model.
+        - num_recognizers (int): Requests decoded at the same time (Vosk releases the GIL while decoding).
+        - max_queue (int): Requests that may wait for a recognizer before new ones are refused with 429.
+        - queue_timeout (float): Seconds a request waits for a recognizer before it gets a 503.
+        - language (str): Language of the text enhancer.
+        - max_upload_bytes (int): Largest accepted request body.
+        """
+        self.pool = RecognizerPool(vosk_model, num_recognizers, max_queue, queue_timeout)
+        self.language = language
+        self.max_upload_bytes = max_upload_bytes
+
+    def transcribe(self, audio_file):
+        """
+        Decodes an audio file with a recognizer of the pool.
+
+        Args:
+        - audio_file (str or file): Path or seekable binary file object of a WAV, FLAC or MP3 file.
+
+        Returns:
+        - dict: 'text', 'audio_seconds', 'queue_seconds' and 'decode_seconds'; raises RequestError(415) if the
+          audio cannot be decoded.
+        """
+        blocks = iter_pcm16_blocks(audio_file, TARGET_RATE)
+        try:
+            return self._decode(_checked_audio(blocks))
+        finally:
+            blocks.close()
+
+    def transcribe_stream(self, chunks, sample_rate=TARGET_RATE):
+        """
+        Decodes raw 16-bit mono PCM while it arrives.
+
+        Args:
+        - chunks (iterable): Byte strings of little-endian 16-bit PCM, split anywhere.
+        - sample_rate (int): Sample rate of the audio; other rates than the recognizer's are resampled.
+
+        Returns:
+        - dict: As transcribe(), plus 'finalize_seconds': time from the last chunk to the result.
+        """
+        received = {}
+
+        def blocks():
+            resampler = PolyphaseResampler(sample_rate, TARGET_RATE) if sample_rate != TARGET_RATE else None
+            remainder = b''
+            for chunk in chunks:
+                data = remainder + chunk
+                usable = len(data) - len(data) % 2
+                remainder = data[usable:]
+                if not usable:
+                    continue
+                samples = np.frombuffer(data[:usable], dtype='<i2')
+                yield samples if resampler is None else float_to_pcm16(resampler.process(samples / 32768.0))
+            if resampler is not None:
+                yield float_to_pcm16(resampler.flush())
+            received['end'] = time.perf_counter()
+
+        result = self._decode(blocks())
+        result['finalize_seconds'] = time.perf_counter() - received.get('end', time.perf_counter())
+        return result
+
+    def _decode(self, blocks):
+        samples = [0]
+
+        def counted():
+            for block in blocks:
+                samples[0] += len(block)
+                yield block
+
+        with self.pool.recognizer() as (rec, queue_seconds):
+            start = time.perf_counter()
+            with get_metrics().span('decode'):
+                raw_results = feed_blocks(rec, counted())
+            decode_seconds = time.perf_counter() - start
+        return {'text': join_results(raw_results), 'audio_seconds': samples[0] / TARGET_RATE,
+                'queue_seconds': queue_seconds, 'decode_seconds': decode_seconds}
+
+    def post_process(self, text):
+        # Punctuation and capitalization, outside the recognizer lease so decoding is not held up
+        from PostProcess.TextEnhancement import get_text_enhancer
+        with get_metrics().span('postprocess'):
+            return get_text_enhancer(self.language).enhance(text)
+
+    def health(self):
+        """
+        Reports the pool size and the current load.
+
+        Returns:
+        - dict: Status, recognizers, busy recognizers, waiting requests, queue bound and sample rate.
+        """
+        return {'status': 'ok', 'recognizers': self.pool.size, 'busy': self.pool.busy,
+                'waiting': self.pool.waiting, 'max_queue': self.pool.max_queue, 'sample_rate': TARGET_RATE}
+
+    def make_http_server(self, host='127.0.0.1', port=SERVER_PORT):
+        """
+        Creates the HTTP server; call serve_forever() on it to start serving.
+
+        Args:
+        - host (str): Interface to listen on.
+        - port (int): TCP port.
+
+        Returns:
+        - ThreadingHTTPServer: Server with one thread per connection.
+        """
+        server = ThreadingHTTPServer((host, port), _RequestHandler)
+        server.transcription_server = self
+        return server
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive and chunked request bodies
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/health':
+            self._send_json(200, self.server.transcription_server.health())
+        elif path == '/metrics':
+            self._send(200, get_metrics().prometheus_text().encode(), 'text/plain; version=0.0.4')
+        else:
+            self._send_json(404, {'error': f"Unknown path {path}"})
+
+    def do_POST(self):
+        self._body_read = False  # The handler serves all requests of a keep-alive connection
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        service = self.server.transcription_server
+        metrics = get_metrics()
+        endpoint = url.path.strip('/')
+        start = time.perf_counter()
+        status = 200
+        with metrics.span('request', endpoint=endpoint):
+            try:
+                if endpoint not in ('transcribe', 'stream'):
+                    raise RequestError(404, f"Unknown path {url.path}")
+                with service.pool.admission():
+                    if endpoint == 'transcribe':
+                        with self._read_upload(service.max_upload_bytes) as audio_file:
+                            result = service.transcribe(audio_file)
+                    else:
+                        rate = params.get('rate', [str(TARGET_RATE)])[0]
+                        if not rate.isdigit() or int(rate) <= 0:
+                            raise RequestError(400, f"Invalid sample rate {rate}")
+                        result = service.transcribe_stream(self._iter_body(service.max_upload_bytes), int(rate))
+                if params.get('postprocess', ['0'])[0] not in ('0', 'false', ''):
+                    result['text'] = service.post_process(result['text'])
+                result['latency_seconds'] = time.perf_counter() - start
+                self._send_json(200, result)
+            except RequestError as e:
+                status = e.status
+                self._discard_body()
+                self._send_json(status, {'error': str(e)})
+            except (ConnectionError, http.client.HTTPException) as e:
+                status = 499  # Client went away; nothing can be sent
+                self.close_connection = True
+                print(f"Request aborted: {e}")
+            except Exception as e:
+                status = 500
+                self.close_connection = True
+                metrics.count('errors_total', stage='server')
+                self._send_json(500, {'error': str(e)})
+        seconds = time.perf_counter() - start
+        metrics.count('requests_total', endpoint=endpoint, status=str(status))
+        metrics.observe('request_seconds', seconds, endpoint=endpoint)
+        if status == 200:
+            metrics.observe('queue_wait_seconds', result['queue_seconds'], endpoint=endpoint)
+            metrics.record_file('server', result['audio_seconds'], result['decode_seconds'])
+
+    def _discard_body(self):
+        # Reads an unread small body, so a refused client gets its response instead of a connection reset
+        length = self.headers.get('Content-Length')
+        if self._body_read or not length or int(length) > SPOOL_BYTES:
+            self.close_connection = True
+            return
+        for _ in self._read_exactly(int(length)):
+            pass
+
+    def _iter_body(self, max_bytes):
+        # Yields the request body as it arrives, for Content-Length and chunked transfer encoding
+        self._body_read = True
+        total = 0
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            while True:
+                size = int(self.rfile.readline(1024).split(b';', 1)[0].strip() or b'0', 16)
+                if size == 0:
+                    while self.rfile.readline(1024) not in (b'\r\n', b'\n', b''):  # Skip trailers
+                        pass
+                    return
+                total += size
+                if total > max_bytes:
+                    raise RequestError(413, f"Request body larger than {max_bytes} bytes")
+                yield from self._read_exactly(size)
+                self.rfile.readline(1024)  # CRLF closing the chunk
+        else:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > max_bytes:
+                raise RequestError(413, f"Request body larger than {max_bytes} bytes")
+            yield from self._read_exactly(length)
+
+    def _read_exactly(self, length):
+        while length > 0:
+            data = self.rfile.read(min(length, READ_BYTES))
+            if not data:
+                raise ConnectionError("Connection closed before the end of the request body")
+            length -= len(data)
+            yield data
+
+    @contextmanager
+    def _read_upload(self, max_bytes):
+        # Spools the body into a seekable file; a multipart/form-data upload yields its first file part
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as body:
+            for data in self._iter_body(max_bytes):
+                body.write(data)
+            if not body.tell():
+                raise RequestError(400, "The request body is empty")
+            body.seek(0)
+            content_type = self.headers.get('Content-Type', '')
+            if not content_type.startswith('multipart/form-data'):
+                yield body
+                return
+            message = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {content_type}\r\n\r\n".encode() + body.read())
+            for part in message.iter_parts():
+                if part.get_filename():
+                    yield io.BytesIO(part.get_payload(decode=True))
+                    return
+            raise RequestError(400, "The multipart upload contains no file")
+
+    def _send_json(self, status, data):
+        self._send(status, json.dumps(data).encode(), 'application/json')
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if status in (429, 503):
+            self.send_header('Retry-After', str(RETRY_AFTER_SECONDS))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TranscriptionClient:
+    """
+    Client of a TranscriptionServer. The GUI uses it in place of a local Vosk model when the setting
+    transcription_server is set, see GUI.Model_loader.
+
+    Attributes:
+        url (str): Base URL of the server, e.g. http://127.0.0.1:8765.
+        timeout (float): Socket timeout of a request in seconds.
+        max_retries (int): Attempts when the server answers 429 or 503.
+    """
+
+    def __init__(self, url, timeout=600, max_retries=MAX_RETRIES):
+        """
+        Initializes the TranscriptionClient.
+
+        Args:
+        - url (str): Base URL of the server.
+        - timeout (float): Socket timeout of a request in seconds.
+        - max_retries (int): Attempts when the server answers 429 or 503.
+        """
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+    def health(self):
+        """
+        Asks the server for its health, e.g. to check the URL before the first transcription.
+
+        Returns:
+        - dict: Health of the server; raises an OSError (e.g. URLError) if it cannot be reached.
+        """
+        with urllib.request.urlopen(f"{self.url}/health", timeout=10) as response:
+            return json.load(response)
+
+    def transcribe(self, audio_file, post_process=False, should_stop=None):
+        """
+        Uploads an audio file and returns the server's result. Requests refused with 429 or 503 are retried
+        after the Retry-After delay, doubled on every further refusal; other errors, e.g. 415 for audio the server
+        cannot decode, raise a RuntimeError at once.
+
+        Args:
+        - audio_file (str): Path to a WAV, FLAC or MP3 file.
+        - post_process (bool): Let the server restore punctuation and capitalization.
+        - should_stop (callable or None): Checked before every attempt; returns None when it returns True.
+
+        Returns:
+        - dict or None: Result with 'text' and the latency figures, see TranscriptionServer.
+        """
+        url = f"{self.url}/transcribe?postprocess={int(post_process)}"
+        delay = RETRY_AFTER_SECONDS
+        for attempt in range(1, self.max_retries + 1):
+            if should_stop is not None and should_stop():
+                return None
+            with open(audio_file, 'rb') as file:
+                request = urllib.request.Request(url, data=file, method='POST', headers={
+                    'Content-Type': 'application/octet-stream',
+                    'Content-Length': str(os.fstat(file.fileno()).st_size)})
+                try:
+                    with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                        return json.load(response)
+                except urllib.error.HTTPError as e:
+                    if e.code not in (429, 503) or attempt == self.max_retries:
+                        raise RuntimeError(f"Transcription server: {e.code} {_error_message(e)}")
+                    delay = max(delay, float(e.headers.get('Retry-After') or 0))
+            time.sleep(delay)
+            delay *= 2
+
+
+def _checked_audio(blocks):
+    # Turns the errors of reading the upload into a client error: wave/soundfile cannot parse it (corrupt or
+    # unsupported format) or it has an unsupported sample width. Errors of the recognizer are not caught here.
+    try:
+        yield from blocks
+    except (ValueError, RuntimeError, EOFError, wave.Error) as e:
+        # libsndfile errors carry their reason without the name of the (temporary) file
+        raise RequestError(415, f"Cannot decode the audio: {getattr(e, 'error_string', None) or e}")
+
+
+def _error_message(error):
+    try:
+        return json.load(error)['error']
+    except (ValueError, KeyError, OSError):
+        return error.reason
+
+
+def main():
+    config = load_config()
+    parser = argparse.ArgumentParser(description='Serve transcriptions over HTTP with one shared Vosk model.')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on (0.0.0.0 for the network).')
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--model', default=config['vosk_model_path'], help='Vosk model directory.')
+    parser.add_argument('--recognizers', type=int, default=2, help='Requests decoded at the same time.')
+    parser.add_argument('--max-queue', type=int, default=MAX_QUEUE, help='Requests waiting before 429.')
+    parser.add_argument('--queue-timeout', type=float, default=QUEUE_TIMEOUT, help='Seconds waited before 503.')
+    args = parser.parse_args()
+
+    vosk.SetLogLevel(-1)
+    start = time.perf_counter()
+    vosk_model = vosk.Model(args.model)
+    print(f"Model loaded in {time.perf_counter() - start:.1f} s")
+    service = TranscriptionServer(vosk_model, args.recognizers, args.max_queue, args.queue_timeout,
+                                  language=config['language'])
+    http_server = service.make_http_server(args.host, args.port)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=http_server.shutdown).start())
+    print(f"Serving on http://{args.host}:{args.port} with {args.recognizers} recognizers")
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    http_server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Real-time factor of Vosk decoding for a sweep of recognizer block sizes.
+
+Compares the previous per-chunk path (wave.readframes of 100 ms, json.loads per result) with
+Decoding.decode_wav (memory-mapped PCM, memoryview blocks, one json.loads per file) at several block sizes.
+RTF = decoding time / audio duration; lower is faster.
+
+Usage (from the code/ directory):
+    python benchmarks/block_size_sweep.py --model ../Model/vosk-model-de-0.21 [--files 10]
+"""
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import vosk  # noqa: E402
+from Decoding import decode_wav  # noqa: E402
+
+BLOCK_SIZES = (0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 4.0)
+
+
+def readframes_decode(audio_file, vosk_model):
+    # The per-chunk path decode_wav replaced
+    wf = wave.open(audio_file, 'rb')
+    sample_rate = wf.getframerate()
+    rec = vosk.KaldiRecognizer(vosk_model, sample_rate)
+    results = []
+    while True:
+        data = wf.readframes(int(sample_rate * 0.1))
+        if len(data) == 0:
+            break
+        if rec.AcceptWaveform(data):
+            results.append(json.loads(rec.Result()))
+    results.append(json.loads(rec.FinalResult()))
+    wf.close()
+    return ' '.join(res['text'] for res in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', required=True, help='Vosk model directory.')
+    parser.add_argument('--audio-dir', default=os.path.join(os.path.dirname(__file__), '..', '..',
+                                                            'Audio', 'Examples', 'Audio'))
+    parser.add_argument('--files', type=int, default=10, help='Number of files decoded per setting.')
+    parser.add_argument('--block-sizes', type=float, nargs='+', default=BLOCK_SIZES)
+    args = parser.parse_args()
+
+    vosk_model = vosk.Model(args.model)
+    audio_files = sorted(os.path.join(args.audio_dir, f)
+                         for f in os.listdir(args.audio_dir) if f.endswith('.wav'))[:args.files]
+    audio_seconds = 0.0
+    for audio_file in audio_files:
+        with wave.open(audio_file, 'rb') as wf:
+            audio_seconds += wf.getnframes() / wf.getframerate()
+
+    settings = [('readframes 0.1 s', lambda f: readframes_decode(f, vosk_model))]
+    settings += [(f'memoryview {block:g} s', lambda f, b=block: decode_wav(f, vosk_model, block_seconds=b))
+                 for block in args.block_sizes]
+
+    print(f"{len(audio_files)} files, {audio_seconds:.1f} s of audio")
+    for name, decode in settings:
+        start = time.perf_counter()
+        for audio_file in audio_files:
+            decode(audio_file)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<22} RTF {elapsed / audio_seconds:.4f}  ({elapsed:.2f} s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Check that chunked Silero enhancement (TextEnhancer.enhance_batch) stays close to enhancing each transcript whole.
+
+The references of the metadata file are normalized to raw Vosk-like output (lower case, no punctuation) and
+enhanced once as whole texts and once in chunks, with and without the context overlap. Per variant the
+word-level difference to the whole-text output (case and punctuation count, so a wrong capital letter or full
+stop at a chunk edge is an error), the WER of both outputs against the reference and the throughput are reported.
+The script exits with status 1 if the chunked output with overlap differs from the whole-text output by more than
+--tolerance (word error rate between the two).
+
+Needs the Silero model (pip install silero).
+
+Usage (from the code/ directory):
+    python benchmarks/enhancement_chunking.py --metadata ../Audio/Examples/metadata.csv
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def normalize(text):
+    # Vosk-like output: lower case words without punctuation
+    return ' '.join(''.join(c for c in word if c.isalnum()) for word in text.lower().split()).strip()
+
+
+def main():
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--metadata', default=os.path.join(base_dir, 'Audio', 'Examples', 'metadata.csv'))
+    parser.add_argument('--max-words', type=int, default=None, help='Words per chunk (default: MAX_CHUNK_WORDS).')
+    parser.add_argument('--overlap', type=int, default=None, help='Context words (default: CHUNK_OVERLAP_WORDS).')
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help='Allowed word error rate between chunked (with overlap) and whole-text output.')
+    args = parser.parse_args()
+
+    from dir.GroundTruth import read_metadata
+    from Scoring import score_pair, corpus_scores
+    from PostProcess.TextEnhancement import get_text_enhancer, MAX_CHUNK_WORDS, CHUNK_OVERLAP_WORDS
+
+    max_words = args.max_words or MAX_CHUNK_WORDS
+    overlap = CHUNK_OVERLAP_WORDS if args.overlap is None else args.overlap
+    references = [reference for _, reference in read_metadata(args.metadata) if reference]
+    texts = [normalize(reference) for reference in references]
+    text_enhancer = get_text_enhancer('de')
+    text_enhancer.warm_up()
+    print(f"{len(texts)} transcripts, {sum(len(text.split()) for text in texts)} words, "
+          f"chunks of {max_words} words")
+
+    start = time.perf_counter()
+    whole = [text_enhancer.enhance(text) for text in texts]
+    whole_seconds = time.perf_counter() - start
+    reference_scores = corpus_scores([score_pair(reference, text) for reference, text in zip(references, whole)])
+    print(f"{'variant':<18}{'vs whole WER':>14}{'vs reference WER':>18}{'seconds':>10}")
+    print(f"{'whole':<18}{0.0:>14.4f}{reference_scores['wer']:>18.4f}{whole_seconds:>10.2f}")
+
+    difference = None
+    for variant_overlap in (0, overlap):
+        start = time.perf_counter()
+        chunked = text_enhancer.enhance_batch(texts, max_words=max_words, overlap=variant_overlap)
+        seconds = time.perf_counter() - start
+        difference = corpus_scores([score_pair(a, b) for a, b in zip(whole, chunked)])['wer']
+        reference_wer = corpus_scores([score_pair(reference, text)
+                                       for reference, text in zip(references, chunked)])['wer']
+        print(f"{f'chunks, overlap {variant_overlap}':<18}{difference:>14.4f}{reference_wer:>18.4f}{seconds:>10.2f}")
+
+    if difference > args.tolerance:
+        sys.exit(f"Chunked output differs from whole-text output by WER {difference:.4f} > {args.tolerance}")
+
+
+if __name__ == '__main__':
+    main()
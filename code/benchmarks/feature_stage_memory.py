@@ -0,0 +1,75 @@
+"""
+Before/after comparison of the evaluation pipeline with and without the mel-spectrogram feature stage.
+
+Each variant runs in its own subprocess so that its peak RSS is measured in isolation:
+- features: Preprocessor.preprocess_directory() materializes every spectrogram (the old default path).
+- stream:   Preprocessor.iter_filenames() streams file names, and each wav is read the way the recognizer
+            reads it.
+Vosk decoding itself costs the same in both variants and is left out so no model is needed.
+
+Usage (from the code/ directory):
+    python benchmarks/feature_stage_memory.py --audio-dir ../Audio/Examples/Audio
+"""
+import os
+import sys
+import json
+import time
+import wave
+import resource
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def run_stage(stage, audio_dir):
+    from PreProcess.Preprocessing import Preprocessor
+
+    start = time.perf_counter()
+    preprocessor = Preprocessor(audio_dir)
+    num_files = 0
+    if stage == 'features':
+        preprocessed_data = preprocessor.preprocess_directory()
+        num_files = len(preprocessed_data)
+        filenames = preprocessor.filenames
+    else:
+        filenames = preprocessor.iter_filenames()
+
+    for filename in filenames:
+        with wave.open(os.path.join(audio_dir, filename + '.wav'), 'rb') as wf:
+            wf.readframes(wf.getnframes())
+        if stage != 'features':
+            num_files += 1
+
+    return {
+        'stage': stage,
+        'files': num_files,
+        'seconds': time.perf_counter() - start,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio-dir', default=os.path.join(os.path.dirname(__file__), '..', '..',
+                                                            'Audio', 'Examples', 'Audio'))
+    parser.add_argument('--stage', choices=['features', 'stream'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        print(json.dumps(run_stage(args.stage, args.audio_dir)))
+        return
+
+    results = {}
+    for stage in ('features', 'stream'):
+        output = subprocess.run([sys.executable, __file__, '--audio-dir', args.audio_dir, '--stage', stage],
+                                check=True, capture_output=True, text=True).stdout
+        results[stage] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'stage':<10}{'files':>8}{'wall-clock (s)':>16}{'peak RSS (MB)':>16}")
+    for stage, result in results.items():
+        print(f"{stage:<10}{result['files']:>8}{result['seconds']:>16.2f}{result['peak_rss_mb']:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
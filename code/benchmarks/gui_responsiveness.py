@@ -0,0 +1,89 @@
+"""
+UI responsiveness while files are transcribed in the background by TranscriptionWorker.
+
+A QTimer ticks every 10 ms on the Qt event loop while the worker decodes 20 files; the delay of each tick
+beyond its schedule is the event-loop latency a user would feel. The decoder is a local stand-in that holds no
+GIL while "decoding" (like Vosk), so no model is needed. The run fails if the worst latency exceeds 50 ms.
+
+Usage (from the code/ directory):
+    QT_QPA_PLATFORM=offscreen python benchmarks/gui_responsiveness.py
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PyQt5.QtCore import QCoreApplication, QTimer  # noqa: E402
+from GUI.GUI_Transcriber import TranscriptionWorker  # noqa: E402
+
+TICK_MS = 10
+
+
+class StandInTranscriptionWorker(TranscriptionWorker):
+    """TranscriptionWorker whose decoder and post-processing are deterministic local stand-ins."""
+
+    def __init__(self, audio_files, decode_seconds, max_workers):
+        super().__init__(audio_files, vosk_model=None, max_workers=max_workers)
+        self.decode_seconds = decode_seconds
+
+    def transcribe_audio_vosk(self, audio_file, vosk_model):
+        # hashlib releases the GIL on large buffers, like the native Vosk decoder does
+        deadline = time.perf_counter() + self.decode_seconds
+        block = audio_file.encode() * (1 << 16)
+        while time.perf_counter() < deadline:
+            hashlib.sha256(block).digest()
+        return f"transkript von {os.path.basename(audio_file)}"
+
+    def post_processing_batch(self, texts):
+        return [text.capitalize() + '.' for text in texts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--decode-seconds', type=float, default=0.5, help='Stand-in decode time per file.')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--max-latency-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    latencies = []
+    received = []
+    expected = [time.perf_counter() + TICK_MS / 1000]
+
+    def tick():
+        now = time.perf_counter()
+        latencies.append(max(0.0, now - expected[0]) * 1000)
+        expected[0] = now + TICK_MS / 1000
+
+    timer = QTimer()
+    timer.setTimerType(0)  # Qt.PreciseTimer
+    timer.timeout.connect(tick)
+    timer.start(TICK_MS)
+
+    worker = StandInTranscriptionWorker([f'file_{i:03d}.wav' for i in range(args.files)], args.decode_seconds,
+                                        args.workers)
+    worker.file_result_ready.connect(lambda index, filename, text: received.append(index))
+    worker.finished.connect(app.quit)
+
+    start = time.perf_counter()
+    worker.start()
+    app.exec_()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[int(0.99 * (len(latencies) - 1))] if latencies else 0.0
+    worst = latencies[-1] if latencies else 0.0
+    print(f"{len(received)}/{args.files} files in {elapsed:.2f} s with {args.workers} workers; "
+          f"event-loop latency p99 {p99:.1f} ms, max {worst:.1f} ms over {len(latencies)} ticks")
+    if worst > args.max_latency_ms or len(received) != args.files:
+        print(f"FAIL: UI blocked for more than {args.max_latency_ms:.0f} ms")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+GUI start-up time: time-to-window (main window shown and painted) and time-to-ready (Vosk and spaCy models
+loaded in the background, transcription buttons enabled). Also lists which heavy libraries were already
+imported when the window appeared, to check that they are imported lazily.
+
+Usage (from the code/ directory, so that img/ resolves):
+    python benchmarks/gui_startup.py [--timeout 300]
+"""
+import os
+import sys
+import time
+import json
+import argparse
+
+START = time.perf_counter()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+HEAVY_MODULES = ('torch', 'silero', 'spacy', 'librosa')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--timeout', type=float, default=300, help='Seconds to wait for the models.')
+    args = parser.parse_args()
+
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    from mainGUI import MainWindow
+
+    app = QApplication(sys.argv)
+    report = {}
+
+    main_window = MainWindow()
+    main_window.show()
+    app.processEvents()
+    report['time_to_window'] = time.perf_counter() - START
+    report['heavy_modules_at_window'] = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    def ready():
+        report['time_to_ready'] = time.perf_counter() - START
+        app.quit()
+
+    main_window.controller.modelsReady.connect(ready)
+    QTimer.singleShot(int(args.timeout * 1000), app.quit)
+    if not main_window.controller.is_ready():
+        app.exec_()
+
+    report['model_load_seconds'] = main_window.controller.loaded_models
+    report.setdefault('time_to_ready', None)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
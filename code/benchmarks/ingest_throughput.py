@@ -0,0 +1,101 @@
+"""
+Throughput and memory of the audio ingest layer (PreProcess/AudioIngest.py) on a long recording.
+
+Writes a synthetic --minutes long wav file at --rate Hz with --channels channels (default: one hour of 44.1 kHz
+stereo) and converts it to 16 kHz mono in several ways, each in a fresh process so peak RSS is its own:
+
+- imports: only imports numpy and scipy.signal, the fixed part of every peak RSS
+- stream: iter_pcm16_blocks, the blocks the recognizer is fed with (Decoding.decode_audio)
+- load: load_audio, the whole file as one array (AudioProcessor with sample_rate=16000)
+- scipy: reading the whole file and resampling it with scipy.signal.resample_poly in one piece
+- librosa: librosa.load(sr=16000), the previous feature path with resampling (if librosa is installed)
+
+Usage (from the code/ directory):
+    python benchmarks/ingest_throughput.py [--minutes 60] [--rate 44100] [--channels 2] [--modes stream load]
+"""
+import os
+import sys
+import time
+import wave
+import resource
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+MODES = ('imports', 'stream', 'load', 'scipy', 'librosa')
+
+
+def write_test_file(path, minutes, rate, channels):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        for start in range(0, int(minutes * 60 * rate), rate * 10):
+            t = np.arange(start, start + rate * 10) / rate
+            signal = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(len(t))
+            frames = np.repeat((signal * 32767).astype('<i2')[:, None], channels, axis=1)
+            wf.writeframes(frames.tobytes())
+
+
+def run_mode(mode, audio_file):
+    start = time.perf_counter()
+    if mode == 'imports':
+        import numpy  # noqa: F401
+        import scipy.signal  # noqa: F401
+        samples = 0
+    elif mode == 'stream':
+        from PreProcess.AudioIngest import iter_pcm16_blocks
+        samples = sum(len(block) for block in iter_pcm16_blocks(audio_file))
+    elif mode == 'load':
+        from PreProcess.AudioIngest import load_audio
+        samples = len(load_audio(audio_file)[0])
+    elif mode == 'scipy':
+        import numpy as np
+        from scipy.signal import resample_poly
+        with wave.open(audio_file, 'rb') as wf:
+            rate, channels = wf.getframerate(), wf.getnchannels()
+            audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype='<i2').reshape(-1, channels)
+        mono = audio.mean(axis=1, dtype=np.float32) / 32768.0
+        divisor = np.gcd(rate, 16000)
+        samples = len(resample_poly(mono, 16000 // divisor, rate // divisor))
+    else:
+        import librosa
+        samples = len(librosa.load(audio_file, sr=16000)[0])
+    seconds = time.perf_counter() - start
+    return samples, seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=60)
+    parser.add_argument('--rate', type=int, default=44100)
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        audio_file = os.path.join(temp_dir, 'long.wav')
+        write_test_file(audio_file, args.minutes, args.rate, args.channels)
+        audio_seconds = args.minutes * 60
+        print(f"{args.minutes:g} min, {args.rate} Hz, {args.channels} ch: "
+              f"{os.path.getsize(audio_file) / 1024 ** 2:.0f} MB wav")
+        print(f"{'mode':<10}{'seconds':>10}{'x realtime':>12}{'peak RSS MB':>14}{'16 kHz samples':>16}")
+
+        spawn = multiprocessing.get_context('spawn')
+        for mode in args.modes:
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                    samples, seconds, peak_rss_mb = executor.submit(run_mode, mode, audio_file).result()
+            except ImportError as e:
+                print(f"{mode:<10}skipped: {e}")
+                continue
+            print(f"{mode:<10}{seconds:>10.2f}{audio_seconds / max(seconds, 1e-9):>12.0f}{peak_rss_mb:>14.0f}{samples:>16}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Speed of the Kaldi data-directory builder (dir/Dataset_dirs.py) on a synthetic speaker tree.
+
+Creates --files tiny wav files spread over gender/speaker/recording folders, then times a full build, an
+incremental run without changes and an incremental run after touching --changed of the files. With --soundfile
+the old per-file duration lookup (soundfile opening every wav, serially) is timed as well.
+
+Usage (from the code/ directory):
+    python benchmarks/kaldi_builder.py [--files 100000] [--workers 16] [--tree /tmp/kaldi_tree]
+"""
+import os
+import sys
+import time
+import wave
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dir.Dataset_dirs import KaldiDatasetBuilder  # noqa: E402
+
+FILES_PER_RECORDING_FOLDER = 100
+SPEAKERS_PER_GENDER = 50
+SAMPLE_RATE = 16000
+
+
+def create_tree(root, num_files, seconds=0.01):
+    frames = b'\x00\x00' * int(SAMPLE_RATE * seconds)
+    wav_files = []
+    for i in range(0, num_files, FILES_PER_RECORDING_FOLDER):
+        gender = 'MF'[(i // FILES_PER_RECORDING_FOLDER) % 2]
+        speaker = f'speaker{(i // (2 * FILES_PER_RECORDING_FOLDER)) % SPEAKERS_PER_GENDER:03d}'
+        folder = os.path.join(root, f'Audio_{gender}', speaker, f'recording{i:07d}')
+        os.makedirs(os.path.join(folder, 'wavs'))
+        with open(os.path.join(folder, 'metadata.csv'), mode='w', encoding='utf-8') as metadata:
+            for j in range(i, min(i + FILES_PER_RECORDING_FOLDER, num_files)):
+                wav_file = os.path.join(folder, 'wavs', f'utt{j:07d}.wav')
+                with wave.open(wav_file, 'wb') as wf:
+                    wf.setnchannels(1)
+                    wf.setsampwidth(2)
+                    wf.setframerate(SAMPLE_RATE)
+                    wf.writeframes(frames)
+                metadata.write(f'utt{j:07d}|Synthetischer Satz Nummer {j}|\n')
+                wav_files.append(wav_file)
+    return wav_files
+
+
+def timed(name, run):
+    start = time.perf_counter()
+    result = run()
+    print(f"{name:<40}{time.perf_counter() - start:>10.2f} s   {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=100000)
+    parser.add_argument('--changed', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--tree', default=None, help='Where to create the tree (default: a temporary directory).')
+    parser.add_argument('--soundfile', action='store_true', help='Also time the old soundfile-based durations.')
+    args = parser.parse_args()
+
+    root = args.tree or tempfile.mkdtemp(prefix='kaldi_tree_')
+    try:
+        input_dir, output_dir = os.path.join(root, 'input'), os.path.join(root, 'kaldi_dataset')
+        start = time.perf_counter()
+        wav_files = create_tree(input_dir, args.files)
+        print(f"Created {len(wav_files)} wav files in {time.perf_counter() - start:.1f} s")
+
+        builder = KaldiDatasetBuilder(input_dir, output_dir, args.workers)
+        timed('full build', builder.build)
+        timed('incremental, nothing changed', builder.build)
+        for wav_file in wav_files[::max(1, len(wav_files) // args.changed)][:args.changed]:
+            os.utime(wav_file, ns=(time.time_ns(), time.time_ns()))
+        timed(f'incremental, {args.changed} files touched', builder.build)
+
+        if args.soundfile:
+            import soundfile as sf
+
+            def soundfile_durations():
+                for wav_file in wav_files:
+                    with sf.SoundFile(wav_file, 'r') as f:
+                        len(f) / f.samplerate
+                return f"{len(wav_files)} files"
+            timed('old: soundfile durations, serial', soundfile_durations)
+    finally:
+        if not args.tree:
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Latency of streaming live transcription, with a WAV file replayed in real time as a fake microphone.
+
+Reports the time to the first partial result and the delay between the end of each utterance's last word and
+its final result.
+
+Usage (from the code/ directory):
+    python benchmarks/live_latency.py --model ../Model/vosk-model-de-0.21 ../Audio/Examples/Audio/Fabi001.wav
+"""
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import vosk  # noqa: E402
+from PyQt5.QtCore import QCoreApplication  # noqa: E402
+from GUI.Live_transcriber import LiveTranscriber, WavFileSource  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('audio_files', nargs='+')
+    parser.add_argument('--model', required=True, help='Vosk model directory.')
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    vosk_model = vosk.Model(args.model)
+    for audio_file in args.audio_files:
+        transcriber = LiveTranscriber(vosk_model, WavFileSource(audio_file, realtime=True))
+        transcriber.finished.connect(app.quit)
+        transcriber.start()
+        app.exec_()
+        print(json.dumps({'file': os.path.basename(audio_file), **transcriber.metrics()}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Throughput (docs/second) of named entity highlighting on synthetic discharge letters.
+
+Compares the old per-document path (full default pipeline, token-by-token string rebuilding) with
+EntityHighlighter (nlp.pipe over batches with only the NER components, span offsets), optionally with
+several processes.
+
+Usage (from the code/ directory):
+    python benchmarks/ner_throughput.py [--docs 1000] [--batch-size 64] [--n-process 1 2 4]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PostProcess.EntityHighlighting import EntityHighlighter, apply_markup  # noqa: E402
+
+DOCTORS = ['Müller', 'Meier', 'Braun', 'Fischer', 'Schulz', 'Wagner', 'Becker', 'Hoffmann']
+PATIENTS = ['Anna Schmidt', 'Johann Becker', 'Claudia Hoffmann', 'Thomas Lange', 'Petra Keller', 'Jonas Wolf']
+CITIES = ['München', 'Hamburg', 'Köln', 'Frankfurt', 'Berlin', 'Aachen', 'Stuttgart']
+STREETS = ['Bahnhofstraße', 'Lindenstraße', 'Rosenstraße', 'Bergstraße', 'Goethestraße']
+FINDINGS = [
+    'Eine Sonographie des Abdomens zeigte eine dilatierte Gallenblase mit mehreren Konkrementen.',
+    'Die CT des Schädels ergab einen ischämischen Infarkt im Bereich der linken A. cerebri media.',
+    'Die initiale Röntgenaufnahme des Thorax zeigte eine großflächige Infiltration im rechten Lungenfeld.',
+    'Eine notfallmäßige Appendektomie wurde durchgeführt und verlief komplikationslos.',
+    'Unter physiotherapeutischer Therapie verbesserte sich der Zustand des Patienten deutlich.',
+]
+
+
+def synthetic_letters(count, seed=0):
+    rng = random.Random(seed)
+    letters = []
+    for _ in range(count):
+        findings = ' '.join(rng.sample(FINDINGS, 3))
+        letters.append(
+            f"Sehr geehrter Herr Dr. {rng.choice(DOCTORS)}, im Folgenden berichten wir über unsere gemeinsame "
+            f"Patientin Frau {rng.choice(PATIENTS)}, wohnhaft in der {rng.choice(STREETS)} {rng.randint(1, 99)}, "
+            f"in {rng.randint(10000, 99999)} {rng.choice(CITIES)}, die sich in unserer stationären Behandlung "
+            f"befand. {findings} Wir danken für die ambulante Weiterbetreuung und verbleiben mit freundlichen "
+            f"Grüßen Prof. Dr. {rng.choice(DOCTORS)}")
+    return letters
+
+
+def per_document(nlp, letters):
+    # The previous GUI path: full pipeline per document and string concatenation per token
+    for letter in letters:
+        formatted_text = ""
+        for token in nlp(letter):
+            if token.ent_type_:
+                formatted_text += f"[!|{token.text}|!]{token.whitespace_}"
+            else:
+                formatted_text += f"{token.text}{token.whitespace_}"
+
+
+def batched(nlp, letters, batch_size, n_process):
+    highlighter = EntityHighlighter(nlp, batch_size=batch_size, n_process=n_process)
+    for letter, spans in zip(letters, highlighter.entity_spans(letters)):
+        apply_markup(letter, spans)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=1000)
+    parser.add_argument('--model', default='de_core_news_sm')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--n-process', type=int, nargs='+', default=[1, 2])
+    args = parser.parse_args()
+
+    import spacy
+    nlp = spacy.load(args.model)
+    letters = synthetic_letters(args.docs)
+
+    runs = [('per-document, full pipeline', lambda: per_document(nlp, letters))]
+    for n_process in args.n_process:
+        runs.append((f'nlp.pipe NER-only, batch {args.batch_size}, {n_process} proc',
+                     lambda n=n_process: batched(nlp, letters, args.batch_size, n)))
+
+    for name, run in runs:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<45}{args.docs / elapsed:>10.1f} docs/s")
+
+
+if __name__ == '__main__':
+    main()
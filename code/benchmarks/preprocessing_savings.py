@@ -0,0 +1,83 @@
+"""
+Memory and FLOP savings of the compact preprocessing mode (AudioProcessor.compact()) over the padded default.
+
+The default mode keeps float64 audio zero-padded to MAX_AUDIO_LENGTH samples whatever the sample rate, and the
+compact mode keeps float32 audio at its real length (limited to MAX_AUDIO_DURATION seconds at the real rate).
+The estimate uses the wav headers only; with --measure both processors are also run on every file and the
+actual spectrogram sizes and wall-clock times are reported (silence removal makes real clips shorter still).
+
+Usage (from the code/ directory):
+    python benchmarks/preprocessing_savings.py --audio-dir ../Audio/Examples/Audio [--measure]
+"""
+import os
+import sys
+import math
+import time
+import wave
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+N_FFT = 2048  # librosa.feature.melspectrogram defaults
+HOP_LENGTH = 512
+N_MELS = 80
+MAX_AUDIO_LENGTH = 44100 * 30
+MAX_AUDIO_DURATION = 30
+
+
+def frame_flops(n_fft=N_FFT, n_mels=N_MELS):
+    # Real FFT (~2.5 N log2 N), windowing, power spectrum and the mel projection of one frame
+    n_bins = n_fft // 2 + 1
+    return 2.5 * n_fft * math.log2(n_fft) + n_fft + 2 * n_bins + 2 * n_mels * n_bins
+
+
+def estimate(num_samples, itemsize):
+    frames = 1 + num_samples // HOP_LENGTH
+    return {
+        'audio_bytes': num_samples * itemsize,
+        'spectrogram_bytes': N_MELS * frames * itemsize,
+        'flops': frames * frame_flops(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio-dir', default=os.path.join(os.path.dirname(__file__), '..', '..',
+                                                            'Audio', 'Examples', 'Audio'))
+    parser.add_argument('--measure', action='store_true', help='Also run both processors on every file.')
+    args = parser.parse_args()
+
+    audio_files = sorted(os.path.join(args.audio_dir, f) for f in os.listdir(args.audio_dir) if f.endswith('.wav'))
+    totals = {'padded': {}, 'compact': {}}
+    for audio_file in audio_files:
+        with wave.open(audio_file, 'rb') as wf:
+            num_samples, sr = wf.getnframes(), wf.getframerate()
+        for mode, values in (('padded', estimate(MAX_AUDIO_LENGTH, 8)),
+                             ('compact', estimate(min(num_samples, MAX_AUDIO_DURATION * sr), 4))):
+            for key, value in values.items():
+                totals[mode][key] = totals[mode].get(key, 0) + value
+
+    print(f"Estimate over {len(audio_files)} files (from wav headers):")
+    print(f"{'':<24}{'padded':>14}{'compact':>14}{'saving':>10}")
+    for key, unit, scale in (('audio_bytes', 'MB', 1024 ** 2), ('spectrogram_bytes', 'MB', 1024 ** 2),
+                             ('flops', 'GFLOP', 1e9)):
+        padded, compact = totals['padded'][key] / scale, totals['compact'][key] / scale
+        print(f"{key + ' (' + unit + ')':<24}{padded:>14.1f}{compact:>14.1f}{1 - compact / padded:>10.1%}")
+
+    if args.measure:
+        from PreProcess.Audioprocessing import AudioProcessor
+
+        print("\nMeasured:")
+        for mode, processor in (('padded', AudioProcessor()), ('compact', AudioProcessor.compact())):
+            start = time.perf_counter()
+            spectrogram_bytes = 0
+            for audio_file in audio_files:
+                features = processor.preprocess_audio(audio_file)
+                if features is not None:
+                    spectrogram_bytes += features.element_size() * features.nelement()
+            print(f"{mode:<10} spectrograms {spectrogram_bytes / 1024 ** 2:8.1f} MB, "
+                  f"wall-clock {time.perf_counter() - start:6.2f} s")
+
+
+if __name__ == '__main__':
+    main()
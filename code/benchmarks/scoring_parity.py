@@ -0,0 +1,129 @@
+"""
+Parity check of Scoring against jiwer and torchmetrics on the references of an audio folder's metadata.
+
+Hypotheses are derived from every reference deterministically: the reference itself, its Vosk-like form (lower
+case, no punctuation), and copies with words dropped, repeated and swapped. Random pairs over a small vocabulary
+are added, where many alignments have the minimum cost. For every pair the script checks:
+
+- WER against jiwer.wer, and hits/substitutions/deletions/insertions against jiwer.process_words;
+- CER with cer_denominator='hypothesis' against torchmetrics' CharErrorRate called as the evaluation did before
+  (ground truth as 'preds'), and with 'reference' against jiwer.cer;
+- the corpus WER/CER of score_corpus against jiwer and torchmetrics over all pairs at once.
+
+torchmetrics is optional (it needs torch); without it, the hypothesis-denominator CER is checked against jiwer.cer
+with the arguments swapped, which is the same number. Exits with status 1 on any mismatch.
+Needs pip install -r requirements-dev.txt.
+
+Usage (from the code/ directory):
+    python benchmarks/scoring_parity.py --metadata ../Audio/Examples/metadata.csv
+"""
+import os
+import sys
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+TOLERANCE = 1e-9
+
+
+def normalize(text):
+    # Vosk-like output: lower case words without punctuation
+    return ' '.join(''.join(c for c in word if c.isalnum()) for word in text.lower().split()).strip()
+
+
+def make_pairs(references, random_pairs, seed):
+    # (reference, hypothesis) pairs with non-empty hypotheses
+    pairs = []
+    for reference in references:
+        words = reference.split()
+        variants = [
+            reference,
+            normalize(reference),
+            ' '.join(word for i, word in enumerate(words) if i % 7),
+            ' '.join(word for i, word in enumerate(words) for _ in range(1 + (i % 11 == 0))),
+            ' '.join(words[i + 1] if i % 5 == 0 and i + 1 < len(words) else word for i, word in enumerate(words)),
+        ]
+        pairs.extend((reference, hypothesis) for hypothesis in variants if hypothesis)
+
+    rng = random.Random(seed)
+    while len(pairs) < len(references) * 5 + random_pairs:
+        vocabulary = 'abcd'[:rng.randint(1, 4)]
+        reference = ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(1, 12)))
+        hypothesis = ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(1, 12)))
+        pairs.append((reference, hypothesis))
+    return pairs
+
+
+def main():
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--metadata', default=os.path.join(base_dir, 'Audio', 'Examples', 'metadata.csv'))
+    parser.add_argument('--random-pairs', type=int, default=5000, help='Random pairs with tied alignments.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import jiwer
+    from dir.GroundTruth import read_metadata
+    from Scoring import score_pair, score_corpus
+    try:
+        from torchmetrics.text import CharErrorRate
+    except ImportError:
+        try:
+            from torchmetrics import CharErrorRate  # torchmetrics < 0.8
+        except ImportError:
+            CharErrorRate = None
+            print("torchmetrics not installed: checking the hypothesis-denominator CER against jiwer.cer")
+
+    def baseline_cer(references, hypotheses):
+        # The evaluation's former call: CharErrorRate().update(ground truth, transcription)
+        if CharErrorRate is None:
+            return jiwer.cer(hypotheses, references)
+        cer = CharErrorRate()
+        cer.update(references, hypotheses)
+        return cer.compute().item()
+
+    pairs = make_pairs([reference for _, reference in read_metadata(args.metadata) if reference.split()],
+                       args.random_pairs, args.seed)
+    mismatches = {'wer': 0, 'counts': 0, 'cer_hypothesis': 0, 'cer_reference': 0}
+    for reference, hypothesis in pairs:
+        score = score_pair(reference, hypothesis, cer_denominator='hypothesis')
+        output = jiwer.process_words(reference, hypothesis)
+        checks = {
+            'wer': abs(score.wer - jiwer.wer(reference, hypothesis)) <= TOLERANCE,
+            'counts': (score.hits, score.substitutions, score.deletions, score.insertions) ==
+                      (output.hits, output.substitutions, output.deletions, output.insertions),
+            'cer_hypothesis': abs(score.cer - baseline_cer([reference], [hypothesis])) <= 1e-6,
+            'cer_reference': abs(score_pair(reference, hypothesis, cer_denominator='reference').cer -
+                                 jiwer.cer(reference, hypothesis)) <= TOLERANCE,
+        }
+        for name, ok in checks.items():
+            if not ok:
+                mismatches[name] += 1
+                if mismatches[name] <= 3:
+                    print(f"{name} mismatch: {reference[:60]!r} / {hypothesis[:60]!r}")
+
+    references = [reference for reference, _ in pairs]
+    hypotheses = [hypothesis for _, hypothesis in pairs]
+    corpus = {denominator: score_corpus(pairs, cer_denominator=denominator)[1]
+              for denominator in ('hypothesis', 'reference')}
+    corpus_checks = {
+        'corpus wer': (corpus['reference']['wer'], jiwer.wer(references, hypotheses)),
+        'corpus cer (hypothesis)': (corpus['hypothesis']['cer'], baseline_cer(references, hypotheses)),
+        'corpus cer (reference)': (corpus['reference']['cer'], jiwer.cer(references, hypotheses)),
+    }
+
+    print(f"{len(pairs)} pairs")
+    for name, count in mismatches.items():
+        print(f"{name:<28}{'ok' if not count else f'{count} mismatches'}")
+    failed = any(mismatches.values())
+    for name, (ours, theirs) in corpus_checks.items():
+        ok = abs(ours - theirs) <= 1e-6
+        failed = failed or not ok
+        print(f"{name:<28}{ours:.6f} vs {theirs:.6f} {'ok' if ok else 'MISMATCH'}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
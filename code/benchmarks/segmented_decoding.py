@@ -0,0 +1,69 @@
+"""
+Long-file mode (silence segmentation + concurrent segment decoding) against whole-file decoding.
+
+For every file, both modes are timed and scored against metadata.csv; the report shows the per-file and total
+speed-up and the corpus WER of each mode.
+
+Usage (from the code/ directory):
+    python benchmarks/segmented_decoding.py --model ../Model/vosk-model-de-0.21 \
+        [--audio-dir ../Audio/Examples/Audio] [--metadata ../Audio/Examples/metadata.csv] [--max-segment 15]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import vosk  # noqa: E402
+from Decoding import read_pcm, decode_pcm, transcribe_long_file  # noqa: E402
+from Scoring import score_corpus  # noqa: E402
+from dir.GroundTruth import GroundTruthIndex  # noqa: E402
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'Audio', 'Examples')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', required=True, help='Vosk model directory.')
+    parser.add_argument('--audio-dir', default=os.path.join(EXAMPLES_DIR, 'Audio'))
+    parser.add_argument('--metadata', default=os.path.join(EXAMPLES_DIR, 'metadata.csv'))
+    parser.add_argument('--max-segment', type=float, default=15.0, help='Maximum segment length (s).')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    vosk_model = vosk.Model(args.model)
+    ground_truth = GroundTruthIndex(args.metadata)
+    names = sorted(os.path.splitext(f)[0] for f in os.listdir(args.audio_dir) if f.endswith('.wav'))
+
+    whole_pairs, segmented_pairs = [], []
+    whole_total = segmented_total = 0.0
+    for name in names:
+        audio_file = os.path.join(args.audio_dir, name + '.wav')
+        reference = ground_truth.get(name) or '<TRANSCRIPTION_NOT_FOUND>'
+
+        start = time.perf_counter()
+        samples, sample_rate = read_pcm(audio_file)
+        whole_text = decode_pcm(samples, sample_rate, vosk_model)
+        whole_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        segmented_text, segments = transcribe_long_file(audio_file, vosk_model, args.max_segment, args.workers)
+        segmented_seconds = time.perf_counter() - start
+
+        whole_total += whole_seconds
+        segmented_total += segmented_seconds
+        whole_pairs.append((reference, whole_text))
+        segmented_pairs.append((reference, segmented_text))
+        print(f"{name:<12}{len(segments):>4} segments  whole {whole_seconds:6.2f} s  "
+              f"segmented {segmented_seconds:6.2f} s  speed-up {whole_seconds / segmented_seconds:5.2f}x")
+
+    whole_wer = score_corpus(whole_pairs)[1]['wer']
+    segmented_wer = score_corpus(segmented_pairs)[1]['wer']
+    print(f"\nTotal: whole {whole_total:.2f} s, segmented {segmented_total:.2f} s, "
+          f"speed-up {whole_total / segmented_total:.2f}x")
+    print(f"Corpus WER: whole {whole_wer:.4f}, segmented {segmented_wer:.4f}, delta {segmented_wer - whole_wer:+.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Load test of a running TranscriptionServer at rising concurrency.
+
+For every concurrency level, that many clients send requests back to back until --requests requests are done.
+Per level the latency percentiles (p50, p99) of the successful requests, the mean queue wait reported by the
+server, the throughput and the requests refused with 429 (admission queue full) or 503 (queue timeout) are
+reported. Refused requests are not retried, so the refusals show where the server starts shedding load.
+
+Usage (from the code/ directory, with the server running):
+    python TranscriptionServer.py --recognizers 4
+    python benchmarks/server_load.py --url http://127.0.0.1:8765 --concurrency 1 2 4 8 16 32 [--stream]
+"""
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+STREAM_BLOCK_SECONDS = 0.1  # Audio per chunk in --stream mode
+
+
+def send(url, audio_file, stream):
+    """
+    Sends one request.
+
+    Returns:
+    - tuple: (HTTP status or 'error', client-side latency in seconds, response JSON or None).
+    """
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=600)
+    start = time.perf_counter()
+    try:
+        if stream:
+            # Chunked upload of the PCM data, as a recorder would send it
+            with wave.open(audio_file, 'rb') as wf:
+                rate = wf.getframerate()
+                data = wf.readframes(wf.getnframes())
+            block_bytes = int(rate * STREAM_BLOCK_SECONDS) * 2
+            chunks = (data[offset:offset + block_bytes] for offset in range(0, len(data), block_bytes))
+            connection.request('POST', f'/stream?rate={rate}', body=chunks, encode_chunked=True)
+        else:
+            with open(audio_file, 'rb') as file:
+                connection.request('POST', '/transcribe', body=file.read(),
+                                   headers={'Content-Type': 'application/octet-stream'})
+        response = connection.getresponse()
+        body = response.read()
+        latency = time.perf_counter() - start
+        return response.status, latency, json.loads(body) if response.status == 200 else None
+    except (OSError, http.client.HTTPException):
+        return 'error', time.perf_counter() - start, None
+    finally:
+        connection.close()
+
+
+def run_level(url, audio_files, concurrency, requests, stream):
+    """
+    Runs requests requests with concurrency clients.
+
+    Returns:
+    - dict: Latency percentiles, throughput and status counts of the level.
+    """
+    counter = iter(range(requests))
+    lock = threading.Lock()
+    results = []
+
+    def client():
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            results.append(send(url, audio_files[index % len(audio_files)], stream))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client)
+    seconds = time.perf_counter() - start
+
+    latencies = np.array([latency for status, latency, _ in results if status == 200])
+    statuses = {}
+    for status, _, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'concurrency': concurrency,
+        'requests': len(results),
+        'statuses': statuses,
+        'p50_seconds': float(np.percentile(latencies, 50)) if len(latencies) else None,
+        'p99_seconds': float(np.percentile(latencies, 99)) if len(latencies) else None,
+        'mean_queue_seconds': float(np.mean([body['queue_seconds'] for status, _, body in results
+                                             if status == 200])) if len(latencies) else None,
+        'requests_per_second': round(len(latencies) / seconds, 2),
+        'audio_seconds_per_second': round(sum(body['audio_seconds'] for status, _, body in results
+                                              if status == 200) / seconds, 2),
+    }
+
+
+def main():
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('audio_files', nargs='*', default=[os.path.join(base_dir, 'Audio', 'Examples', 'Audio',
+                                                                        'Fabi001.wav')])
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--requests', type=int, default=64, help='Requests per concurrency level.')
+    parser.add_argument('--stream', action='store_true', help='Stream 16-bit mono wav files to /stream.')
+    parser.add_argument('--output', default=None, help='Also write the results as JSON.')
+    args = parser.parse_args()
+
+    status, _, _ = send(args.url, args.audio_files[0], args.stream)  # Warm-up, and fail early without a server
+    if status != 200:
+        sys.exit(f"Warm-up request failed with status {status}")
+
+    levels = []
+    print(f"{'clients':>8}{'ok':>6}{'429':>6}{'503':>6}{'other':>7}{'p50 s':>9}{'p99 s':>9}{'queue s':>9}"
+          f"{'req/s':>8}{'audio s/s':>11}")
+    for concurrency in args.concurrency:
+        level = run_level(args.url, args.audio_files, concurrency, max(args.requests, concurrency), args.stream)
+        levels.append(level)
+        statuses = dict(level['statuses'])
+        ok, busy, unavailable = (statuses.pop(code, 0) for code in ('200', '429', '503'))
+        print(f"{concurrency:>8}{ok:>6}{busy:>6}{unavailable:>6}{sum(statuses.values()):>7}"
+              f"{level['p50_seconds'] or 0:>9.3f}{level['p99_seconds'] or 0:>9.3f}"
+              f"{level['mean_queue_seconds'] or 0:>9.3f}{level['requests_per_second']:>8.2f}"
+              f"{level['audio_seconds_per_second']:>11.1f}")
+
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as file:
+            json.dump({'url': args.url, 'stream': args.stream, 'levels': levels}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
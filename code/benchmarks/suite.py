@@ -0,0 +1,294 @@
+"""
+Benchmark suite of the transcription pipeline on an audio folder (default: Audio/Examples/Audio).
+
+Times each stage separately: wav read, AudioProcessor.preprocess_audio, Vosk decode, Silero post-processing,
+WER/CER scoring and spaCy NER. Every stage runs in a fresh process, so its peak RSS is its own; model loading is
+reported as setup time and kept out of the timings, and each stage is timed --repeat times (fastest run counts).
+Per stage the real-time factor (stage seconds per audio second), files/second and peak RSS are reported.
+
+Without --model and --silero, deterministic stand-ins replace Vosk and Silero (the stand-in decoder reads the
+audio block by block and returns the reference with some words dropped), so the suite runs without models.
+
+Results are saved as JSON; with --baseline the run is compared to a stored result, and the script exits with
+status 1 if a stage got slower (RTF) or larger (peak RSS) than the tolerances allow, or if a stage of the baseline
+is missing from the run. A stage that fails (or is skipped because the decode stage failed) is recorded under
+'failed' and always makes the script exit with status 1.
+
+Usage (from the code/ directory):
+    python benchmarks/suite.py --output bench.json --save-baseline benchmarks/baseline.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json [--model ../Model/vosk-model-de-0.21 --silero]
+"""
+import os
+import sys
+import json
+import time
+import wave
+import zlib
+import platform
+import resource
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+STAGES = ('wav_read', 'preprocess', 'decode', 'postprocess', 'scoring', 'ner')
+READ_BLOCK_BYTES = 1 << 16
+MIN_RTF_DELTA = 1e-4  # Differences below this are noise for the fast stages, never a regression
+
+
+def normalize(text):
+    # Vosk-like output: lower case words without punctuation
+    return ' '.join(''.join(c for c in word if c.isalnum()) for word in text.lower().split()).strip()
+
+
+class StandInDecoder:
+    """
+    Deterministic stand-in for the Vosk recognizer: reads the audio in recognizer-sized blocks and returns the
+    normalized reference with every word dropped whose position matches a checksum of the audio.
+    """
+
+    def __init__(self, references):
+        self.references = references
+
+    def decode(self, audio_file):
+        from Decoding import PcmFile, BLOCK_SECONDS
+        checksum = 0
+        with PcmFile(audio_file) as pcm:
+            block_bytes = int(pcm.sample_rate * BLOCK_SECONDS) * pcm.frame_size
+            for offset in range(0, len(pcm.data), block_bytes):
+                checksum = zlib.crc32(pcm.data[offset:offset + block_bytes], checksum)
+        words = normalize(self.references.get(os.path.basename(audio_file)[:-4], '')).split()
+        return ' '.join(word for i, word in enumerate(words) if (checksum + i) % 11)
+
+
+def stand_in_enhance(texts):
+    # Deterministic stand-in for Silero: capitalizes and terminates every chunk
+    from PostProcess.TextEnhancement import split_into_chunks
+    return [' '.join(chunk[:1].upper() + chunk[1:] + '.' for chunk in split_into_chunks(text)) for text in texts]
+
+
+def stage_wav_read(config, inputs):
+    def run():
+        for audio_file in inputs['audio_files']:
+            with open(audio_file, 'rb') as file:
+                while file.read(READ_BLOCK_BYTES):
+                    pass
+    return None, run
+
+
+def stage_preprocess(config, inputs):
+    from PreProcess.Audioprocessing import AudioProcessor
+    audio_processor = AudioProcessor.compact() if config['compact'] else AudioProcessor()
+
+    def run():
+        for audio_file in inputs['audio_files']:
+            audio_processor.preprocess_audio(audio_file)
+    return None, run
+
+
+def stage_decode(config, inputs):
+    if config['model']:
+        import vosk
+        from Decoding import decode_audio
+        vosk.SetLogLevel(-1)
+        vosk_model = vosk.Model(config['model'])
+
+        def decode(audio_file):
+            return decode_audio(audio_file, vosk_model)
+    else:
+        decode = StandInDecoder(inputs['references']).decode
+    outputs = []
+
+    def run():
+        outputs[:] = [decode(audio_file) for audio_file in inputs['audio_files']]
+    return outputs, run
+
+
+def stage_postprocess(config, inputs):
+    if config['silero']:
+        from PostProcess.TextEnhancement import get_text_enhancer
+        text_enhancer = get_text_enhancer('de')
+        text_enhancer.warm_up()
+        enhance = text_enhancer.enhance_batch
+    else:
+        enhance = stand_in_enhance
+    outputs = []
+
+    def run():
+        outputs[:] = enhance(inputs['texts'])
+    return outputs, run
+
+
+def stage_scoring(config, inputs):
+    from Scoring import score_pair, corpus_scores
+    pairs = [(inputs['references'][os.path.basename(audio_file)[:-4]], text)
+             for audio_file, text in zip(inputs['audio_files'], inputs['texts'])
+             if inputs['references'].get(os.path.basename(audio_file)[:-4])]
+    outputs = {}
+
+    def run():
+        outputs.update(corpus_scores([score_pair(reference, hypothesis) for reference, hypothesis in pairs]))
+    return outputs, run
+
+
+def stage_ner(config, inputs):
+    import spacy
+    from PostProcess.EntityHighlighting import EntityHighlighter
+    highlighter = EntityHighlighter(spacy.load(config['spacy_model']))
+    outputs = []
+
+    def run():
+        outputs[:] = highlighter.entity_spans(inputs['texts'])
+    return outputs, run
+
+
+STAGE_FUNCTIONS = {
+    'wav_read': stage_wav_read,
+    'preprocess': stage_preprocess,
+    'decode': stage_decode,
+    'postprocess': stage_postprocess,
+    'scoring': stage_scoring,
+    'ner': stage_ner,
+}
+
+
+def run_stage(name, config, inputs):
+    """
+    Runs one stage in the current (fresh) process.
+
+    Returns:
+    - tuple: (stage outputs, setup seconds, fastest run seconds, peak RSS in MB).
+    """
+    start = time.perf_counter()
+    outputs, run = STAGE_FUNCTIONS[name](config, inputs)
+    setup_seconds = time.perf_counter() - start
+    timings = []
+    for _ in range(config['repeat']):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Kilobytes on Linux
+    return outputs, setup_seconds, min(timings), peak_rss_mb
+
+
+def compare(results, baseline, tolerance, rss_tolerance):
+    """
+    Compares a run with a baseline run.
+
+    Every stage of the baseline must have run: a failed or missing stage is a regression.
+
+    Returns:
+    - list: Descriptions of the regressions, empty if there are none.
+    """
+    regressions = []
+    if results['stand_ins'] != baseline.get('stand_ins'):
+        print(f"Warning: baseline was measured with stand-ins {baseline.get('stand_ins')}, "
+              f"this run with {results['stand_ins']}")
+    for name, reference in baseline.get('stages', {}).items():
+        stage = results['stages'].get(name)
+        if stage is None:
+            error = results.get('failed', {}).get(name)
+            regressions.append(f"{name}: failed ({error})" if error else f"{name}: missing from this run")
+            continue
+        if stage['rtf'] > reference['rtf'] * (1 + tolerance) and stage['rtf'] - reference['rtf'] > MIN_RTF_DELTA:
+            regressions.append(f"{name}: RTF {stage['rtf']:.5f} vs baseline {reference['rtf']:.5f}")
+        if stage['peak_rss_mb'] > reference['peak_rss_mb'] * (1 + rss_tolerance):
+            regressions.append(f"{name}: peak RSS {stage['peak_rss_mb']:.1f} MB "
+                               f"vs baseline {reference['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def main():
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio-dir', default=os.path.join(base_dir, 'Audio', 'Examples', 'Audio'))
+    parser.add_argument('--metadata', default=os.path.join(base_dir, 'Audio', 'Examples', 'metadata.csv'))
+    parser.add_argument('--model', default=None, help='Vosk model directory (default: deterministic stand-in).')
+    parser.add_argument('--silero', action='store_true', help='Use Silero instead of the stand-in enhancer.')
+    parser.add_argument('--spacy-model', default='de_core_news_sm')
+    parser.add_argument('--compact', action='store_true', help='Preprocess with AudioProcessor.compact().')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage; the fastest counts.')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=None, help='Stored result to compare against.')
+    parser.add_argument('--save-baseline', default=None, help='Also store this run as a baseline here.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative RTF increase.')
+    parser.add_argument('--rss-tolerance', type=float, default=0.25, help='Allowed relative peak RSS increase.')
+    args = parser.parse_args()
+
+    from dir.GroundTruth import read_metadata
+    audio_files = sorted(os.path.join(args.audio_dir, f) for f in os.listdir(args.audio_dir) if f.endswith('.wav'))
+    audio_seconds = 0.0
+    for audio_file in audio_files:
+        with wave.open(audio_file, 'rb') as wf:
+            audio_seconds += wf.getnframes() / wf.getframerate()
+    inputs = {'audio_files': audio_files, 'references': dict(read_metadata(args.metadata)), 'texts': []}
+    config = {'model': args.model, 'silero': args.silero, 'spacy_model': args.spacy_model,
+              'compact': args.compact, 'repeat': args.repeat}
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpu_count': os.cpu_count()},
+        'files': len(audio_files),
+        'audio_seconds': round(audio_seconds, 3),
+        'stand_ins': {'decode': not args.model, 'postprocess': not args.silero},
+        'stages': {},
+        'failed': {},  # Stage name -> error of the stages that did not complete
+    }
+    print(f"{len(audio_files)} files, {audio_seconds:.1f} s of audio")
+    print(f"{'stage':<14}{'setup s':>10}{'run s':>10}{'RTF':>10}{'files/s':>10}{'peak RSS MB':>14}")
+
+    spawn = multiprocessing.get_context('spawn')
+    for name in args.stages:
+        if name in ('postprocess', 'scoring', 'ner') and 'decode' not in results['stages']:
+            print(f"{name:<14}skipped (needs the decode stage)")
+            results['failed'][name] = 'skipped, needs the decode stage'
+            continue
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                outputs, setup_seconds, seconds, peak_rss_mb = executor.submit(
+                    run_stage, name, config, inputs).result()
+        except Exception as e:
+            print(f"{name:<14}failed: {e}")
+            results['failed'][name] = str(e) or type(e).__name__
+            continue
+        if name in ('decode', 'postprocess'):
+            inputs['texts'] = outputs
+        results['stages'][name] = {
+            'setup_seconds': round(setup_seconds, 4),
+            'seconds': round(seconds, 4),
+            'rtf': seconds / audio_seconds,
+            'files_per_second': round(len(audio_files) / seconds, 2) if seconds else None,
+            'peak_rss_mb': round(peak_rss_mb, 1),
+        }
+        if name == 'scoring':
+            results['corpus_scores'] = outputs
+        stage = results['stages'][name]
+        print(f"{name:<14}{setup_seconds:>10.3f}{seconds:>10.3f}{stage['rtf']:>10.5f}"
+              f"{stage['files_per_second'] or 0:>10.1f}{peak_rss_mb:>14.1f}")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, mode='w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    print(f"Results saved to {args.output}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, mode='r', encoding='utf-8') as file:
+            regressions = compare(results, json.load(file), args.tolerance, args.rss_tolerance)
+        if regressions:
+            print("PERFORMANCE REGRESSIONS:")
+            for regression in regressions:
+                print(f"  {regression}")
+        else:
+            print(f"No regressions against {args.baseline}")
+    if results['failed']:
+        print(f"FAILED STAGES: {', '.join(results['failed'])}")
+    if regressions or results['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Transcript list of the GUI with many files: the former QListWidget (one QListWidgetItem holding the whole
+marked-up letter per file, saved by parsing the item texts) against the TranscriptListModel over a TranscriptStore.
+
+Synthetic results (letters of --chars characters with entity spans, file names sharing --letters base names) are
+appended in NER-sized batches, then the list is shown, scrolled through and saved to PROCESSED_TRANSCRIPTION.
+Each run happens in a fresh process, so its peak RSS is its own.
+
+The QListWidget lays out every item again whenever it scrolls to the new results, so filling it grows
+quadratically (minutes at 10k items). Both variants are therefore compared at --legacy-items, where they must
+produce identical output files, and the model is then measured alone at --items.
+
+Usage (from the code/ directory):
+    QT_QPA_PLATFORM=offscreen python benchmarks/transcript_list.py --items 10000 --legacy-items 1000
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BATCH_SIZE = 16  # GUI_Controller.NER_BATCH_SIZE
+WORDS = ('sehr', 'geehrte', 'damen', 'und', 'herren', 'der', 'patient', 'wurde', 'am', 'montag', 'in', 'berlin',
+         'untersucht', 'befund', 'ohne', 'auffälligkeiten', 'mit', 'freundlichen', 'grüßen')
+
+
+def make_results(items, chars, letters):
+    # (file number, file name, transcription, entity spans) of deterministic synthetic letters
+    results = []
+    for i in range(items):
+        words = []
+        length = 0
+        j = i
+        while length < chars:
+            word = WORDS[j % len(WORDS)]
+            words.append(word)
+            length += len(word) + 1
+            j += 7
+        text = ' '.join(words)[:chars]
+        position = text.find('berlin')
+        spans = [(position, position + 6, 'LOC')] if position >= 0 else []
+        name = ''.join(chr(ord('A') + int(digit)) for digit in str(i % letters))
+        results.append((i + 1, f"Praxis_{name}_Brief_{i:05d}.wav", text, spans))
+    return results
+
+
+def legacy_save(list_widget, processed_dir):
+    # GUI_Controller.save_file_transcription before the list model: parses the item texts
+    for i in range(list_widget.count()):
+        text = list_widget.item(i).text()
+        colon_split = text.split(':')
+        if len(colon_split) < 2:
+            continue
+        transcription_part = colon_split[-1].strip()
+        parts = transcription_part.split('.mp3')
+        if len(parts) < 2:
+            parts = transcription_part.split('.wav')
+        if len(parts) < 2:
+            continue
+        base_name = None
+        for part in parts[0].split('_'):
+            if any(char.isdigit() for char in part):
+                break
+            base_name = part if base_name is None else base_name + '_' + part
+        if base_name is None:
+            with open('no_root_name.txt', mode='a', encoding='utf-8') as no_root_file:
+                no_root_file.write(parts[0] + '\n')
+            continue
+        with open(os.path.join(processed_dir, f"{base_name}.txt"), mode='a', encoding='utf-8') as file:
+            file.write(f"{transcription_part}\n")
+
+
+def run_variant(variant, items, chars, letters, work_dir):
+    """
+    Fills, shows, scrolls and saves the list in the current (fresh) process.
+
+    Returns:
+    - dict: Seconds per phase, peak RSS in MB and a digest of the output files.
+    """
+    from PyQt5.QtWidgets import QApplication, QListWidget, QListWidgetItem, QListView
+    from PyQt5.QtGui import QFont
+    from PyQt5.QtCore import Qt
+    from PostProcess.EntityHighlighting import apply_markup
+    from GUI.Transcript_list import TranscriptListModel
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = make_results(items, chars, letters)
+    os.chdir(work_dir)
+    processed_dir = 'PROCESSED_TRANSCRIPTION'
+    os.makedirs(processed_dir, exist_ok=True)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    if variant == 'list_widget':
+        view = QListWidget()
+    else:
+        view = QListView()
+        view.setUniformItemSizes(True)
+        view.setLayoutMode(QListView.Batched)
+        view.setTextElideMode(Qt.ElideRight)
+        model = TranscriptListModel()
+        view.setModel(model)
+    view.resize(1000, 400)
+    view.show()
+    app.processEvents()
+
+    start = time.perf_counter()
+    for offset in range(0, len(results), BATCH_SIZE):
+        batch = results[offset:offset + BATCH_SIZE]
+        if variant == 'list_widget':
+            for number, filename, transcription, spans in batch:
+                item = QListWidgetItem(f"File {number}: {filename}\n{apply_markup(transcription, spans).strip()}")
+                item.setFont(QFont("Arial", 10))
+                item.setData(Qt.UserRole, {'filename': filename, 'transcription': transcription, 'entities': spans})
+                view.addItem(item)
+        else:
+            model.append_results(batch)
+        view.scrollToBottom()
+        app.processEvents()  # The UI repaints between NER batches
+    insert_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scrollbar = view.verticalScrollBar()
+    for value in range(scrollbar.minimum(), scrollbar.maximum() + 1, max(1, scrollbar.maximum() // 50)):
+        scrollbar.setValue(value)
+        app.processEvents()
+    scroll_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if variant == 'list_widget':
+        legacy_save(view, processed_dir)
+    else:
+        model.store.save(processed_dir)
+    save_seconds = time.perf_counter() - start
+
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(processed_dir)):
+        with open(os.path.join(processed_dir, name), 'rb') as file:
+            digest.update(name.encode() + b'\0' + file.read())
+    return {'insert_seconds': insert_seconds, 'scroll_seconds': scroll_seconds, 'save_seconds': save_seconds,
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'rss_growth_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 - rss_before,
+            'output_files': len(os.listdir(processed_dir)), 'digest': digest.hexdigest()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--legacy-items', type=int, default=1000, help='Items of the comparison with QListWidget.')
+    parser.add_argument('--chars', type=int, default=3000, help='Characters per transcript.')
+    parser.add_argument('--letters', type=int, default=500, help='Distinct base names, i.e. output files.')
+    args = parser.parse_args()
+
+    spawn = multiprocessing.get_context('spawn')
+    print(f"Transcripts of {args.chars} characters, {args.letters} base names")
+    print(f"{'variant':<14}{'items':>8}{'insert s':>10}{'scroll s':>10}{'save s':>10}{'files':>7}"
+          f"{'peak RSS MB':>13}{'RSS growth MB':>15}")
+    digests = {}
+    for variant, items in (('list_widget', args.legacy_items), ('model', args.legacy_items), ('model', args.items)):
+        with tempfile.TemporaryDirectory() as work_dir:
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                result = executor.submit(run_variant, variant, items, args.chars, args.letters, work_dir).result()
+        digests.setdefault(items, set()).add(result['digest'])
+        print(f"{variant:<14}{items:>8}{result['insert_seconds']:>10.3f}{result['scroll_seconds']:>10.3f}"
+              f"{result['save_seconds']:>10.3f}{result['output_files']:>7}{result['peak_rss_mb']:>13.1f}"
+              f"{result['rss_growth_mb']:>15.1f}")
+    print("Saved files identical." if len(digests[args.legacy_items]) == 1 else "SAVED FILES DIFFER.")
+
+
+if __name__ == '__main__':
+    main()
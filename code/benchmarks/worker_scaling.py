@@ -0,0 +1,71 @@
+"""
+Files per second of the parallel batch evaluation (TranscriptionEvaluator.iter_transcriptions_parallel) for
+several worker counts.
+
+Every worker process loads its own copy of the Vosk model, so the report also shows the model size times the
+worker count next to the available memory. The default worker count (Transcriber.default_num_workers: physical
+cores, bounded by the copies of the model that fit into memory) is marked with '*'. Two rates are printed per
+worker count: over the whole run, including the pool start-up and model loading, and from the first finished
+file on (the steady state). The audio folder is passed --repeat times, so short example folders give every worker
+enough files. Nothing is cached between runs.
+
+Usage (from the code/ directory):
+    python benchmarks/worker_scaling.py --model ../Model/vosk-model-de-0.21 [--workers 1 2 4 8] [--repeat 4]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'Audio', 'Examples')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', required=True, help='Vosk model directory.')
+    parser.add_argument('--audio-dir', default=os.path.join(EXAMPLES_DIR, 'Audio'))
+    parser.add_argument('--metadata-dir', default=EXAMPLES_DIR)
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help='Worker counts to measure (default: 1, 2, 4, the default count and os.cpu_count()).')
+    parser.add_argument('--repeat', type=int, default=4, help='Times every file of the folder is transcribed.')
+    args = parser.parse_args()
+
+    from Transcriber import TranscriptionEvaluator, physical_cores, available_memory, default_num_workers
+
+    default = default_num_workers(args.model)
+    worker_counts = sorted(set(args.workers or (1, 2, 4, default, os.cpu_count() or 1)))
+    names = sorted(os.path.splitext(f)[0] for f in os.listdir(args.audio_dir) if f.endswith('.wav'))
+    filenames = names * args.repeat
+    model_mb = sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, files in os.walk(args.model) for name in files) / 2 ** 20
+    memory = available_memory()
+    print(f"{len(filenames)} files, {os.cpu_count()} logical CPUs, {physical_cores()} physical cores, "
+          f"model {model_mb:.0f} MB, available memory "
+          f"{f'{memory / 2 ** 20:.0f} MB' if memory else 'unknown'}, default workers {default}")
+    print(f"{'workers':>8}{'model copies MB':>17}{'seconds':>10}{'files/s':>10}{'steady files/s':>16}{'speed-up':>10}")
+
+    base_rate = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_workers in worker_counts:
+            evaluator = TranscriptionEvaluator(args.audio_dir, args.metadata_dir, os.path.join(tmp, 'out.txt'))
+            start = time.perf_counter()
+            first = None
+            done = 0
+            for _ in evaluator.iter_transcriptions_parallel(args.model, filenames, num_workers):
+                done += 1
+                if first is None:
+                    first = time.perf_counter()
+            seconds = time.perf_counter() - start
+            rate = done / seconds
+            steady = (done - 1) / (time.perf_counter() - first) if done > 1 else float('nan')
+            base_rate = base_rate or rate
+            marker = '*' if num_workers == default else ' '
+            print(f"{num_workers:>7}{marker}{model_mb * num_workers:>17.0f}{seconds:>10.2f}{rate:>10.2f}"
+                  f"{steady:>16.2f}{rate / base_rate:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import os
+import json
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+
+# Default settings; config.json next to this file and STT_* environment variables override them
+DEFAULTS = {
+    'vosk_model_path': os.path.join(BASE_DIR, 'Model', 'vosk-model-de-0.21'),
+    'spacy_model': 'de_core_news_sm',
+    'language': 'de',
+    'transcription_cache_dir': os.path.join(BASE_DIR, 'cache', 'transcriptions'),  # Empty string disables it
+    'metrics_port': 0,  # Port of the Prometheus metrics endpoint, 0 disables it
+    'trace_file': '',  # JSON trace written after each file transcription, empty disables it
+    'transcription_server': '',  # URL of a TranscriptionServer (e.g. http://host:8765) replacing the local Vosk model
+    'max_segment_seconds': 0,  # GUI long-file mode: cut recordings at silences into segments this long, 0 disables it
+    'segment_workers': 4,  # Segments of a recording decoded at the same time in long-file mode
+}
+
+
+def load_config(config_file=CONFIG_FILE):
+    """
+    Loads the application settings.
+
+    Args:
+    - config_file (str): Path to an optional JSON file with settings overriding the defaults.
+
+    Returns:
+    - dict: Settings; an environment variable STT_<KEY> (e.g. STT_VOSK_MODEL_PATH) overrides any source.
+    """
+    config = dict(DEFAULTS)
+    if os.path.exists(config_file):
+        with open(config_file, mode='r', encoding='utf-8') as file:
+            config.update(json.load(file))
+
+    for key in config:
+        env_value = os.environ.get(f'STT_{key.upper()}')
+        if env_value is not None:
+            config[key] = env_value
+    return config
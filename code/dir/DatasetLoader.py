@@ -1,4 +1,12 @@
-from torch.utils.data import Dataset
+import os
+import wave
+import random
+from collections import OrderedDict
+import torch
+from torch.utils.data import Dataset, IterableDataset, DataLoader, Sampler, get_worker_info
+from PreProcess.Audioprocessing import AudioProcessor
+from PreProcess.FeatureCache import FeatureCache
+
 
 class SpeechDataset(Dataset):
     def __init__(self, preprocessed_data, filenames):
@@ -34,3 +42,236 @@ class SpeechDataset(Dataset):
         - tuple: A tuple containing the preprocessed data and its corresponding filename.
         """
         return self.preprocessed_data[idx], self.filenames[idx]
+
+
+class LazySpeechDataset(Dataset):
+    def __init__(self, audio_files, cache_size=0, cache_dir=None, compact=False):
+        """
+        Constructor for the LazySpeechDataset class, a SpeechDataset whose features are computed on demand.
+
+        Args:
+        - audio_files (list): List of audio file paths.
+        - cache_size (int): Number of recently used feature tensors kept in memory (default: 0, no caching).
+        - cache_dir (str or None): Directory of a persistent feature cache shared by all workers (default: None).
+        - compact (bool): Use AudioProcessor.compact() (float32, unpadded variable-length spectrograms).
+
+        Only the file paths are held upfront; __getitem__ runs AudioProcessor.preprocess_audio for one file when
+        it is requested. With a multi-worker DataLoader every worker process computes its own samples.
+        """
+        self.audio_files = list(audio_files)
+        self.filenames = [os.path.splitext(os.path.basename(f))[0] for f in self.audio_files]
+        self.cache_size = cache_size
+        self.cache_dir = cache_dir
+        self.compact = compact
+        self._cache = OrderedDict()
+        self._audio_processor = None  # Created on first use, i.e. inside each DataLoader worker
+
+    def __len__(self):
+        """
+        Returns the number of samples in the dataset.
+
+        Returns:
+        - int: Number of samples in the dataset.
+        """
+        return len(self.audio_files)
+
+    def __getitem__(self, idx):
+        """
+        Computes (or fetches from the in-memory cache) the features of one file.
+
+        Args:
+        - idx (int): Index of the sample to retrieve.
+
+        Returns:
+        - tuple: The preprocessed data (None if preprocessing failed) and its corresponding filename.
+        """
+        if idx in self._cache:
+            self._cache.move_to_end(idx)
+            return self._cache[idx], self.filenames[idx]
+
+        if self._audio_processor is None:
+            self._audio_processor = create_audio_processor(self.cache_dir, self.compact)
+        features = self._audio_processor.preprocess_audio(self.audio_files[idx])
+
+        if self.cache_size > 0:
+            self._cache[idx] = features
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return features, self.filenames[idx]
+
+    def durations(self):
+        """
+        Reads the duration of every file from its wav header, without loading any audio.
+
+        Returns:
+        - list: Durations in seconds (0.0 for unreadable files), in dataset order.
+        """
+        durations = []
+        for audio_file in self.audio_files:
+            try:
+                with wave.open(audio_file, 'rb') as wf:
+                    durations.append(wf.getnframes() / wf.getframerate())
+            except (OSError, wave.Error, EOFError):
+                durations.append(0.0)
+        return durations
+
+    def __getstate__(self):
+        # Workers start with an empty cache and their own AudioProcessor
+        state = self.__dict__.copy()
+        state['_cache'] = OrderedDict()
+        state['_audio_processor'] = None
+        return state
+
+
+class StreamingSpeechDataset(IterableDataset):
+    def __init__(self, audio_dir, cache_dir=None, compact=False):
+        """
+        Constructor for the StreamingSpeechDataset class, which streams the features of a directory file by file.
+
+        Args:
+        - audio_dir (str): Directory containing audio files.
+        - cache_dir (str or None): Directory of a persistent feature cache shared by all workers (default: None).
+        - compact (bool): Use AudioProcessor.compact() (float32, unpadded variable-length spectrograms).
+
+        The directory is scanned lazily and no file list is kept, so directories larger than memory can be
+        streamed. With a multi-worker DataLoader the files are split between the workers.
+        """
+        self.audio_dir = audio_dir
+        self.cache_dir = cache_dir
+        self.compact = compact
+
+    def __iter__(self):
+        """
+        Yields the preprocessed data and filename of every wav file handled by the current worker.
+
+        Yields:
+        - tuple: The preprocessed data (None if preprocessing failed) and its corresponding filename.
+        """
+        worker_info = get_worker_info()
+        worker_id, num_workers = (worker_info.id, worker_info.num_workers) if worker_info else (0, 1)
+        audio_processor = create_audio_processor(self.cache_dir, self.compact)
+
+        index = 0
+        with os.scandir(self.audio_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.wav'):
+                    continue
+                if index % num_workers == worker_id:
+                    features = audio_processor.preprocess_audio(entry.path)
+                    yield features, os.path.splitext(entry.name)[0]
+                index += 1
+
+
+def create_audio_processor(cache_dir=None, compact=False):
+    """
+    Creates the AudioProcessor used by the lazy datasets.
+
+    Args:
+    - cache_dir (str or None): Directory of a persistent feature cache (default: None, no caching).
+    - compact (bool): Use the float32, unpadded configuration of AudioProcessor.compact().
+
+    Returns:
+    - AudioProcessor: Processor for one dataset or worker.
+    """
+    cache = FeatureCache(cache_dir) if cache_dir else None
+    return AudioProcessor.compact(cache=cache) if compact else AudioProcessor(cache=cache)
+
+
+def collate_speech_batch(batch):
+    """
+    Collates (features, filename) samples into a batch, dropping samples whose preprocessing failed.
+
+    Args:
+    - batch (list): Samples from one of the speech datasets.
+
+    Returns:
+    - tuple: Stacked feature tensor (None if every sample failed) and the list of filenames.
+    """
+    batch = [(features, filename) for features, filename in batch if features is not None]
+    if not batch:
+        return None, []
+    features, filenames = zip(*batch)
+    return torch.stack(features), list(filenames)
+
+
+def collate_variable_length(batch):
+    """
+    Collates unpadded (features, filename) samples into a batch padded to its longest sample only.
+
+    Args:
+    - batch (list): Samples with features of shape (1, n_mels, frames), e.g. from AudioProcessor.compact().
+
+    Returns:
+    - tuple: Padded feature tensor (batch, 1, n_mels, max frames) or None if every sample failed, a length
+      tensor holding the real number of frames of each sample, and the list of filenames.
+    """
+    batch = [(features, filename) for features, filename in batch if features is not None]
+    if not batch:
+        return None, torch.zeros(0, dtype=torch.long), []
+    features, filenames = zip(*batch)
+
+    lengths = torch.tensor([f.shape[-1] for f in features], dtype=torch.long)
+    padded = features[0].new_zeros((len(features),) + tuple(features[0].shape[:-1]) + (int(lengths.max()),))
+    for i, f in enumerate(features):
+        padded[i, ..., :f.shape[-1]] = f
+    return padded, lengths, list(filenames)
+
+
+class BucketBatchSampler(Sampler):
+    def __init__(self, lengths, batch_size, shuffle=True, seed=0):
+        """
+        Batch sampler that groups samples of similar length, so that batches need little padding.
+
+        Args:
+        - lengths (list): Length (e.g. duration from LazySpeechDataset.durations()) of every sample.
+        - batch_size (int): Number of samples per batch.
+        - shuffle (bool): Shuffle the order of the batches every epoch.
+        - seed (int): Seed of the batch shuffling.
+        """
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+        self.batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+    def __iter__(self):
+        batches = list(self.batches)
+        if self.shuffle:
+            random.Random(self.seed + self.epoch).shuffle(batches)
+            self.epoch += 1
+        return iter(batches)
+
+    def __len__(self):
+        return len(self.batches)
+
+
+def create_dataloader(dataset, batch_size=8, num_workers=2, prefetch_factor=2, shuffle=False, bucketed=False):
+    """
+    Creates a DataLoader that computes features in worker processes and prefetches batches ahead of use.
+
+    Args:
+    - dataset: LazySpeechDataset, StreamingSpeechDataset or SpeechDataset.
+    - batch_size (int): Number of samples per batch.
+    - num_workers (int): Number of worker processes (0 = load in the main process).
+    - prefetch_factor (int): Number of batches each worker loads in advance.
+    - shuffle (bool): Shuffle the samples (map-style datasets only).
+    - bucketed (bool): For a compact LazySpeechDataset: batch files of similar duration together and pad each
+      batch only to its longest sample (see BucketBatchSampler and collate_variable_length).
+
+    Returns:
+    - DataLoader: Loader yielding (features, filenames) batches, or (features, lengths, filenames) if bucketed or
+      if the dataset is compact (its unpadded features are padded per batch, see collate_variable_length).
+    """
+    worker_options = {}
+    if num_workers > 0:
+        worker_options = {'prefetch_factor': prefetch_factor, 'persistent_workers': True}
+
+    if bucketed:
+        batch_sampler = BucketBatchSampler(dataset.durations(), batch_size, shuffle=shuffle)
+        return DataLoader(dataset, batch_sampler=batch_sampler, num_workers=num_workers,
+                          collate_fn=collate_variable_length, **worker_options)
+    # Compact features differ in length and cannot be stacked as they are
+    collate_fn = collate_variable_length if getattr(dataset, 'compact', False) else collate_speech_batch
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle and not isinstance(dataset, IterableDataset),
+                      num_workers=num_workers, collate_fn=collate_fn, **worker_options)
@@ -1,104 +1,266 @@
 import os
-import csv
-import glob
-import soundfile as sf
+import re
+import json
+import time
+import struct
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dir.GroundTruth import read_metadata
 
-# Define input and output directories
-input_dataset_dirs = glob.glob(os.path.expanduser(r'.\Audio2\*'))
-output_dir = 'kaldi_dataset'
+MANIFEST_FILE = 'manifest.json'
+KALDI_FILES = ('wav.scp', 'text', 'utt2spk', 'spk2utt', 'spk2gender', 'corpus.txt', 'segments')
+UNSAFE_ID_CHARS = re.compile(r'[^A-Za-z0-9_.-]+')
 
-# Create the output directory if it doesn't exist
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
 
-# Initialize dictionaries for speaker-utterance and speaker-gender mappings
-spk2utt_dict = {}
-spk2gender_dict = {}
+def wav_duration(wav_file_path):
+    """
+    Reads the duration of a wav file from its RIFF header, without reading the audio data.
 
-# Open necessary output files in write mode
-with open(os.path.join(output_dir, 'wav.scp'), 'w') as wav_scp_file, \
-        open(os.path.join(output_dir, 'text'), 'w') as text_file, \
-        open(os.path.join(output_dir, 'utt2spk'), 'w') as utt2spk_file, \
-        open(os.path.join(output_dir, 'spk2gender'), 'w') as spk2gender_file, \
-        open(os.path.join(output_dir, 'corpus.txt'), 'w') as corpus_file, \
-        open(os.path.join(output_dir, 'segments'), 'w') as segments_file:
+    Args:
+    - wav_file_path (str): Path to the wav file.
 
-    utterance_id = 1
+    Returns:
+    - float: Duration in seconds.
+    """
+    with open(wav_file_path, 'rb') as file:
+        riff, _, wave_id = struct.unpack('<4sI4s', file.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError("not a RIFF/WAVE file")
+        byte_rate = None
+        while True:
+            header = file.read(8)
+            if len(header) < 8:
+                raise ValueError("no data chunk")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                byte_rate = struct.unpack('<HHII', file.read(12))[3]
+                file.seek(chunk_size - 12 + (chunk_size & 1), os.SEEK_CUR)
+            elif chunk_id == b'data':
+                if not byte_rate:
+                    raise ValueError("data chunk before fmt chunk")
+                # Recorders that never finalized the header leave the size at 0 or 0xFFFFFFFF; use the file size
+                data_size = chunk_size
+                if chunk_size in (0, 0xFFFFFFFF):
+                    data_size = os.fstat(file.fileno()).st_size - file.tell()
+                return data_size / byte_rate
+            else:
+                file.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
 
-    # Iterate over each gender folder (M or F)
-    for gender_folder in input_dataset_dirs:
-        gender = gender_folder[-1]  # Extract gender from folder path
-        speaker_folders = glob.glob(os.path.join(gender_folder, '*'))
 
-        # Iterate over each speaker folder within the gender folder
-        for speaker_folder in speaker_folders:
-            speaker_id = os.path.basename(speaker_folder)
+def speaker_id(speaker_name):
+    """
+    Builds the Kaldi speaker id of a speaker folder. Characters that are not safe in Kaldi ids (e.g. umlauts or
+    spaces) are replaced by '-', as in the utterance ids, so the speaker id is the prefix of its utterance ids.
 
-            # Write to spk2gender file
-            spk2gender_file.write(f'{speaker_id} {gender}\n')
-            spk2gender_dict[speaker_id] = gender
+    Args:
+    - speaker_name (str): Speaker folder name.
 
-            # Iterate through subfolders of each speaker folder
-            subfolders = glob.glob(os.path.join(speaker_folder, '*'))
+    Returns:
+    - str: Speaker id.
+    """
+    return UNSAFE_ID_CHARS.sub('-', speaker_name)
 
-            # Iterate over each subfolder (assuming they contain audio and metadata)
-            for subfolder in subfolders:
-                if os.path.isdir(subfolder):
-                    csv_path = os.path.join(subfolder, 'metadata.csv')
 
-                    if os.path.exists(csv_path):
-                        with open(csv_path, 'r') as csvfile:
-                            reader = csv.reader(csvfile, delimiter='|')
+def utterance_id(speaker_id, subfolder, file_name):
+    """
+    Builds the stable utterance id of a recording: it only depends on where the recording lives, so the ids stay
+    the same across runs and when other recordings are added or removed. It starts with the speaker id, as Kaldi
+    expects.
 
-                            # Iterate over the rows in the CSV file
-                            for row in reader:
-                                file_name = row[0]
-                                transcription = row[1]
+    Args:
+    - speaker_id (str): Speaker id, see speaker_id.
+    - subfolder (str): Name of the recording folder within the speaker folder.
+    - file_name (str): Wav file name without extension.
 
-                                # New file name format: speaker_id_utterance_id
-                                new_file_name = f'{speaker_id}_{utterance_id}'
+    Returns:
+    - str: Utterance id.
+    """
+    return '_'.join(UNSAFE_ID_CHARS.sub('-', part) for part in (speaker_id, subfolder, file_name))
 
-                                # Full path to the wav file
-                                wav_file_path = os.path.join(subfolder, 'wavs', f'{file_name}.wav')
 
-                                # Calculate duration using soundfile
-                                try:
-                                    with sf.SoundFile(wav_file_path, 'r') as f:
-                                        duration_seconds = len(f) / f.samplerate
-                                except Exception as e:
-                                    print(f"Error processing {wav_file_path}: {e}")
-                                    continue
+class KaldiDatasetBuilder:
+    """
+    Builds a Kaldi data directory (wav.scp, text, utt2spk, spk2utt, spk2gender, corpus.txt, segments) from a tree
+    input_dir/<gender folder>/<speaker>/<recording folder>/metadata.csv with the audio in wavs/<file>.wav.
 
-                                # Write to the wav.scp file
-                                wav_scp_file.write(f'{new_file_name} {wav_file_path}\n')
+    Durations are read from the wav headers in parallel. A manifest in the output directory remembers the
+    modification time, size and duration of every recording, so later runs only read the headers of new or changed
+    files, and leave the Kaldi files untouched if nothing changed at all.
 
-                                # Write to the text file
-                                text_file.write(f'{new_file_name} {transcription}\n')
+    Attributes:
+        input_dir (str): Root of the dataset tree.
+        output_dir (str): Kaldi data directory.
+        num_workers (int): Threads reading wav headers.
+    """
 
-                                # Write to the utt2spk file
-                                utt2spk_file.write(f'{new_file_name} {speaker_id}\n')
+    def __init__(self, input_dir, output_dir='kaldi_dataset', num_workers=16):
+        """
+        Initializes the KaldiDatasetBuilder.
 
-                                # Update the spk2utt dictionary
-                                if speaker_id not in spk2utt_dict:
-                                    spk2utt_dict[speaker_id] = []
-                                spk2utt_dict[speaker_id].append(new_file_name)
+        Args:
+        - input_dir (str): Root of the dataset tree (the folder holding the gender folders).
+        - output_dir (str): Kaldi data directory to write.
+        - num_workers (int): Threads reading wav headers.
+        """
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.num_workers = num_workers
 
-                                # Write to corpus.txt (transcription file)
-                                corpus_file.write(f'{new_file_name} {transcription}\n')
+    def scan(self):
+        """
+        Collects the utterances listed in the metadata files of the tree.
 
-                                # Calculate start and end time in seconds (you can adjust this logic)
-                                start_time = 0.0
-                                end_time = duration_seconds
+        Returns:
+        - dict: Utterance id -> {'wav', 'text', 'speaker', 'gender'}.
+        """
+        utterances = {}
+        for gender_entry in _sorted_dirs(self.input_dir):
+            gender = gender_entry.name[-1]  # Gender folders end in M or F
+            for speaker_entry in _sorted_dirs(gender_entry.path):
+                speaker = speaker_id(speaker_entry.name)
+                for subfolder_entry in _sorted_dirs(speaker_entry.path):
+                    csv_path = os.path.join(subfolder_entry.path, 'metadata.csv')
+                    if not os.path.exists(csv_path):
+                        continue
+                    for file_name, transcription in read_metadata(csv_path):
+                        utt_id = utterance_id(speaker, subfolder_entry.name, file_name)
+                        utterances[utt_id] = {
+                            'wav': os.path.join(subfolder_entry.path, 'wavs', f'{file_name}.wav'),
+                            'text': transcription.split('|', 1)[0],  # Drop a normalized-text column
+                            'speaker': speaker,
+                            'gender': gender,
+                        }
+        return utterances
 
-                                # Write to segments file
-                                segments_file.write(f'{new_file_name} {new_file_name} {start_time:.2f} {end_time:.2f}\n')
+    def load_manifest(self):
+        """
+        Reads the manifest of the previous run.
 
-                                # Increment the utterance ID
-                                utterance_id += 1
+        Returns:
+        - dict: Utterance id -> entry, empty if there is no (readable) manifest.
+        """
+        try:
+            with open(os.path.join(self.output_dir, MANIFEST_FILE), mode='r', encoding='utf-8') as file:
+                return json.load(file)['utterances']
+        except (OSError, ValueError, KeyError):
+            return {}
 
-# Write the spk2utt file
-with open(os.path.join(output_dir, 'spk2utt'), 'w') as spk2utt_file:
-    for speaker_id, utt_ids in spk2utt_dict.items():
-        spk2utt_file.write(f'{speaker_id} {" ".join(utt_ids)}\n')
+    def build(self, full=False):
+        """
+        Builds or updates the Kaldi data directory.
 
-print("Dataset preparation complete.")
+        Args:
+        - full (bool): Ignore the manifest and read every wav header again.
+
+        Returns:
+        - dict: Counts of utterances (total, new or changed, unchanged, removed, failed) and the elapsed time.
+        """
+        start = time.perf_counter()
+        os.makedirs(self.output_dir, exist_ok=True)
+        previous = {} if full else self.load_manifest()
+        utterances = self.scan()
+
+        # Reuse the duration of recordings whose file is unchanged since the previous run
+        to_read = []
+        for utt_id, utterance in utterances.items():
+            old = previous.get(utt_id)
+            try:
+                stat = os.stat(utterance['wav'])
+            except OSError as e:
+                print(f"Error processing {utterance['wav']}: {e}")
+                continue
+            utterance['mtime_ns'], utterance['size'] = stat.st_mtime_ns, stat.st_size
+            if old and (old.get('wav'), old.get('mtime_ns'), old.get('size')) == (utterance['wav'],
+                                                                                stat.st_mtime_ns, stat.st_size):
+                utterance['duration'] = old['duration']
+            else:
+                to_read.append(utterance)
+
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            for utterance, duration in zip(to_read, executor.map(_safe_wav_duration, (u['wav'] for u in to_read))):
+                if duration is not None:
+                    utterance['duration'] = duration
+
+        manifest = {utt_id: utterance for utt_id, utterance in sorted(utterances.items()) if 'duration' in utterance}
+        stats = {
+            'utterances': len(manifest),
+            'read': len(to_read),
+            'unchanged': sum(1 for utterance in utterances.values() if 'size' in utterance) - len(to_read),
+            'removed': len(set(previous) - set(utterances)),
+            'failed': len(utterances) - len(manifest),
+        }
+
+        if manifest != previous or not all(os.path.exists(os.path.join(self.output_dir, name))
+                                           for name in KALDI_FILES):
+            self.write_kaldi_files(manifest)
+            _write_atomic(os.path.join(self.output_dir, MANIFEST_FILE),
+                          json.dumps({'input_dir': os.path.abspath(self.input_dir), 'utterances': manifest}))
+            stats['written'] = True
+        else:
+            stats['written'] = False
+        stats['seconds'] = round(time.perf_counter() - start, 3)
+        return stats
+
+    def write_kaldi_files(self, manifest):
+        """
+        Writes the Kaldi files, sorted by utterance/speaker id as Kaldi requires. Each file is replaced atomically.
+
+        Args:
+        - manifest (dict): Utterance id -> entry, sorted by utterance id.
+        """
+        spk2utt = {}
+        spk2gender = {}
+        lines = {name: [] for name in KALDI_FILES}
+        for utt_id, utterance in manifest.items():
+            lines['wav.scp'].append(f"{utt_id} {utterance['wav']}\n")
+            lines['text'].append(f"{utt_id} {utterance['text']}\n")
+            lines['utt2spk'].append(f"{utt_id} {utterance['speaker']}\n")
+            lines['corpus.txt'].append(f"{utt_id} {utterance['text']}\n")
+            lines['segments'].append(f"{utt_id} {utt_id} {0.0:.2f} {utterance['duration']:.2f}\n")
+            spk2utt.setdefault(utterance['speaker'], []).append(utt_id)
+            spk2gender[utterance['speaker']] = utterance['gender']
+        for speaker_id in sorted(spk2utt):
+            lines['spk2utt'].append(f"{speaker_id} {' '.join(spk2utt[speaker_id])}\n")
+            lines['spk2gender'].append(f"{speaker_id} {spk2gender[speaker_id]}\n")
+
+        for name, file_lines in lines.items():
+            _write_atomic(os.path.join(self.output_dir, name), ''.join(file_lines))
+
+
+def _sorted_dirs(path):
+    with os.scandir(path) as entries:
+        return sorted((entry for entry in entries if entry.is_dir()), key=lambda entry: entry.name)
+
+
+def _safe_wav_duration(wav_file_path):
+    try:
+        return wav_duration(wav_file_path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Error processing {wav_file_path}: {e}")
+        return None
+
+
+def _write_atomic(path, text):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, mode='w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(temp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or update a Kaldi data directory from a speaker tree '
+                                                 '(<gender>/<speaker>/<recording>/metadata.csv + wavs/).')
+    parser.add_argument('input_dir', nargs='?', default='Audio2', help='Root of the dataset tree.')
+    parser.add_argument('--output-dir', default='kaldi_dataset', help='Kaldi data directory to write.')
+    parser.add_argument('--workers', type=int, default=16, help='Threads reading wav headers.')
+    parser.add_argument('--full', action='store_true', help='Ignore the manifest and read every wav header again.')
+    args = parser.parse_args()
+
+    stats = KaldiDatasetBuilder(args.input_dir, args.output_dir, args.workers).build(full=args.full)
+    print(f"{stats['utterances']} utterances ({stats['read']} read, {stats['unchanged']} unchanged, "
+          f"{stats['removed']} removed, {stats['failed']} failed) in {stats['seconds']} s")
+    print("Dataset preparation complete." if stats['written'] else "Dataset is up to date.")
+
+
+if __name__ == '__main__':
+    main()
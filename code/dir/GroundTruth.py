@@ -0,0 +1,175 @@
+import os
+import csv
+import sqlite3
+import threading
+
+HEADER_NAMES = {'wav_filename', 'filename', 'file_name', 'utterance_id', 'id'}
+
+
+class GroundTruthIndex:
+    """
+    Index of ground truth transcriptions keyed by utterance id, built from metadata.csv in a single pass.
+
+    Two metadata formats are understood: headerless 'utterance_id|transcription' lines, and a quoted CSV
+    with a 'wav_filename,transcript' header (as shipped in Audio/Examples). The index is held in memory or,
+    when index_file is given, persisted to an sqlite database so later runs do not parse the metadata again.
+    Either way it is rebuilt whenever the modification time or size of the metadata file changes.
+
+    Attributes:
+        metadata_file (str): Path to the metadata file.
+        index_file (str or None): Path to the sqlite index, or None for an in-memory index.
+    """
+
+    def __init__(self, metadata_file, index_file=None):
+        """
+        Initializes the GroundTruthIndex. The index itself is built or opened on first use.
+
+        Args:
+        - metadata_file (str): Path to the metadata file.
+        - index_file (str or None): Path to a persistent sqlite index (default: None, in memory only).
+        """
+        self.metadata_file = metadata_file
+        self.index_file = index_file
+        self._signature = None
+        self._transcriptions = None
+        self._unique_chars = None
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def get(self, utterance_id, default=None):
+        """
+        Looks up the transcription of an utterance.
+
+        Args:
+        - utterance_id (str): Utterance id (audio file name without extension).
+        - default: Value returned if the utterance is not in the metadata.
+
+        Returns:
+        - str: Transcription of the utterance, or default.
+        """
+        self._ensure_current()
+        if self._connection is None:
+            return self._transcriptions.get(utterance_id, default)
+
+        with self._lock:
+            row = self._connection.execute('SELECT transcription FROM ground_truth WHERE utterance_id = ?',
+                                           (utterance_id,)).fetchone()
+        return row[0] if row else default
+
+    def __contains__(self, utterance_id):
+        return self.get(utterance_id) is not None
+
+    def __len__(self):
+        self._ensure_current()
+        if self._connection is None:
+            return len(self._transcriptions)
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM ground_truth').fetchone()[0]
+
+    def unique_chars(self):
+        """
+        Returns the set of characters occurring in the transcriptions.
+
+        Returns:
+        - set: Unique characters.
+        """
+        self._ensure_current()
+        return set(self._unique_chars)
+
+    def _ensure_current(self):
+        # (mtime, size) of the metadata file identifies the version the index was built from
+        stat = os.stat(self.metadata_file)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+
+        with self._lock:
+            if signature == self._signature:
+                return
+            if self.index_file is None:
+                self._transcriptions = dict(read_metadata(self.metadata_file))
+                self._unique_chars = set(''.join(self._transcriptions.values()))
+            else:
+                self._open_index(signature)
+            self._signature = signature
+
+    def _open_index(self, signature):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.index_file, check_same_thread=False)
+            self._connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS ground_truth '
+                                     '(utterance_id TEXT PRIMARY KEY, transcription TEXT)')
+
+        stored = dict(self._connection.execute('SELECT key, value FROM meta'))
+        expected = {'source': os.path.abspath(self.metadata_file), 'mtime_ns': str(signature[0]),
+                    'size': str(signature[1])}
+        if all(stored.get(key) == value for key, value in expected.items()):
+            self._unique_chars = set(stored.get('unique_chars', ''))
+            return
+
+        # Stale or new index: rebuild it in one pass over the metadata file
+        unique_chars = set()
+
+        def rows():
+            for utterance_id, transcription in read_metadata(self.metadata_file):
+                unique_chars.update(transcription)
+                yield utterance_id, transcription
+
+        with self._connection:
+            self._connection.execute('DELETE FROM ground_truth')
+            self._connection.executemany('INSERT OR REPLACE INTO ground_truth VALUES (?, ?)', rows())
+            self._connection.execute('DELETE FROM meta')
+            expected['unique_chars'] = ''.join(sorted(unique_chars))
+            self._connection.executemany('INSERT INTO meta VALUES (?, ?)', expected.items())
+        self._unique_chars = unique_chars
+
+    def close(self):
+        """
+        Closes the sqlite index, if one is open.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+            self._signature = None
+
+
+def read_metadata(metadata_file):
+    """
+    Reads (utterance id, transcription) pairs from a metadata file in either supported format.
+
+    Args:
+    - metadata_file (str): Path to the metadata file.
+
+    Yields:
+    - tuple: (utterance_id, transcription).
+    """
+    with open(metadata_file, mode='r', encoding='utf-8-sig', newline='') as file:
+        first_line = file.readline()
+        file.seek(0)
+        if not first_line:
+            return
+
+        if '|' in first_line:
+            for row in file:
+                row = row.strip()
+                if row:
+                    utterance_id, transcription = row.split('|', 1)
+                    yield utterance_id, transcription
+            return
+
+        reader = csv.reader(file)
+        for i, row in enumerate(reader):
+            if not row:
+                continue
+            if i == 0 and row[0].strip().lower() in HEADER_NAMES:
+                continue
+            utterance_id = os.path.splitext(row[0].strip())[0]
+            transcription = row[1] if len(row) > 1 else ''
+            yield utterance_id, _strip_quotes(transcription.strip())
+
+
+def _strip_quotes(text):
+    # The shipped CSV double-quotes its fields inside the CSV quoting, e.g. """Sehr geehrter ..."""
+    while len(text) >= 2 and text[0] == text[-1] == '"':
+        text = text[1:-1].strip()
+    return text
@@ -1,7 +1,7 @@
 import sys
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QTextEdit,
-                             QVBoxLayout, QHBoxLayout, QWidget, QListWidget, QAction)
+                             QVBoxLayout, QHBoxLayout, QWidget, QListView, QAction, QProgressBar)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QIcon, QPixmap
 from PyQt5.QtMultimedia import QMediaPlayer
@@ -107,9 +107,19 @@ class MainWindow(QMainWindow):
         local_transcription_title.setObjectName('standardLabel')
         local_transcription_layout.addWidget(local_transcription_title)
 
-        self.transcription_list = QListWidget(self)
+        # Rows have the same height (file name + one-line preview), so the view lays out only what it shows, and
+        # the batched layout keeps appending results to a long list from relaying out all rows each time
+        self.transcription_list = QListView(self)
+        self.transcription_list.setUniformItemSizes(True)
+        self.transcription_list.setLayoutMode(QListView.Batched)
+        self.transcription_list.setTextElideMode(Qt.ElideRight)
+        self.transcription_list.setEditTriggers(QListView.NoEditTriggers)  # Editing starts with the edit button
         local_transcription_layout.addWidget(self.transcription_list)
 
+        self.transcription_progress = QProgressBar(self)
+        self.transcription_progress.setVisible(False)
+        local_transcription_layout.addWidget(self.transcription_progress)
+
         main_layout.addLayout(local_transcription_layout)
 
         # Buttons for local transcription
@@ -129,6 +139,10 @@ class MainWindow(QMainWindow):
         self.edit_transcription_button.setEnabled(False)
         local_buttons_layout.addWidget(self.edit_transcription_button)
 
+        self.cancel_transcription_button = QPushButton('Cancel Transcription', self)
+        self.cancel_transcription_button.setEnabled(False)
+        local_buttons_layout.addWidget(self.cancel_transcription_button)
+
         main_layout.addLayout(local_buttons_layout)
 
         # Error message label
@@ -179,6 +193,7 @@ class MainWindow(QMainWindow):
         self.play_files_button.clicked.connect(self.controller.play_selected_files)
         self.save_file_transcription_button.clicked.connect(self.controller.save_file_transcription)
         self.edit_transcription_button.clicked.connect(self.controller.correct_transcription)
+        self.cancel_transcription_button.clicked.connect(self.controller.cancel_transcription)
 # ---------------------------------------------------------------------------------------------------------------------
 
 if __name__ == '__main__':
@@ -1,43 +1,123 @@
 import os
+import time
+import resource
+import argparse
 import numpy as np
 import vosk
-from Transcriber import TranscriptionEvaluator
+from Transcriber import TranscriptionEvaluator, default_num_workers
+from TranscriptWriter import TranscriptWriter, TABLE_FORMATS
+from Scoring import CER_DENOMINATORS, CER_DENOMINATOR
+from PostProcess.TextEnhancement import get_text_enhancer
 from PreProcess.Preprocessing import Preprocessor
 from dir.DatasetLoader import SpeechDataset
+from Instrumentation import get_metrics
+
+
+def parse_args(base_dir):
+    parser = argparse.ArgumentParser(description='Average WER of the Vosk model on an audio folder.')
+    parser.add_argument('--audio-dir', default=os.path.join(base_dir, 'Audio/Examples/Audio'),
+                        help='Directory with the wav files to transcribe.')
+    parser.add_argument('--metadata-dir', default=os.path.join(base_dir, 'Audio/Examples'),
+                        help='Directory with the metadata.csv ground truth.')
+    parser.add_argument('--model', default=os.path.join(base_dir, 'Model/vosk-model-de-0.21'),
+                        help='Vosk model directory.')
+    parser.add_argument('--output', default='transcriptions.txt', help='Output text file of the evaluation.')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of parallel worker processes (1 = decode in this process; default: one per '
+                             'physical core, as many as copies of the model fit into the available memory).')
+    parser.add_argument('--features', action='store_true',
+                        help='Also run the mel-spectrogram feature extraction stage (not needed by Vosk).')
+    parser.add_argument('--feature-cache', default=None,
+                        help='Directory of a persistent feature cache used by --features.')
+    parser.add_argument('--transcription-cache', default=None,
+                        help='Directory of a persistent transcription cache; unchanged files are not decoded again.')
+    parser.add_argument('--word-timings', action='store_true',
+                        help='Decode with word-level start, end and confidence (implied by --jsonl/--table-dir).')
+    parser.add_argument('--jsonl', default=None,
+                        help='Write one JSON line per file with scores, utterances and word timings.')
+    parser.add_argument('--table-dir', default=None,
+                        help='Write files/utterances/words tables to this directory (needs pyarrow).')
+    parser.add_argument('--table-format', choices=TABLE_FORMATS, default='parquet', help='Format of --table-dir.')
+    parser.add_argument('--cer-denominator', choices=CER_DENOMINATORS, default=CER_DENOMINATOR,
+                        help="Divide the character edit distance by the length of the transcription ('hypothesis', "
+                             "the CER reported so far) or of the ground truth ('reference', the usual CER).")
+    parser.add_argument('--trace', default=None, help='Write per-file and per-stage timing spans to this JSON trace.')
+    parser.add_argument('--metrics-file', default=None,
+                        help='Write counters and histograms to this file in the Prometheus text format.')
+    parser.add_argument('--profile', action='store_true', help='Print wall-clock time and peak memory.')
+    return parser.parse_args()
 
 
 def main():
     # Define the base directory
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-
-    # Define the directories relative to the base directory
-    audio_dir = os.path.join(base_dir, 'Audio/shit/Audio')
-    metadata_dir = os.path.join(base_dir, 'Audio/shit')
-
-    # Initialize Vosk model
-    vosk_model = vosk.Model(os.path.join(base_dir, "Model/vosk-model-de-0.21"))
+    args = parse_args(base_dir)
+    if args.workers is None:
+        args.workers = default_num_workers(args.model)
+    start_time = time.perf_counter()
+    transcript_writer = None
 
     try:
+        if args.jsonl or args.table_dir:
+            # Structured results are written in batches while the files are evaluated
+            transcript_writer = TranscriptWriter(args.jsonl, args.table_dir, args.table_format)
+
         # Initialize preprocessor
-        preprocessor = Preprocessor(audio_dir)
-        preprocessed_data = preprocessor.preprocess_directory()
+        preprocessor = Preprocessor(args.audio_dir, cache_dir=args.feature_cache)
 
         # Initialize transcription evaluator
-        evaluator = TranscriptionEvaluator(audio_dir, metadata_dir, 'transcriptions.txt')
+        evaluator = TranscriptionEvaluator(args.audio_dir, args.metadata_dir, args.output,
+                                           transcription_cache_dir=args.transcription_cache, model_path=args.model,
+                                           word_timings=args.word_timings or transcript_writer is not None,
+                                           transcript_writer=transcript_writer, cer_denominator=args.cer_denominator)
 
-        # Create dataset from preprocessed data
-        dataset = SpeechDataset(preprocessed_data, preprocessor.filenames)
+        if args.features:
+            # Optional feature extraction stage: materializes the spectrograms of every file
+            preprocessed_data = preprocessor.preprocess_directory()
+            dataset = SpeechDataset(preprocessed_data, preprocessor.filenames)
+            if preprocessor.audio_processor.cache is not None:
+                print("Feature cache: ", preprocessor.audio_processor.cache.stats())
+        else:
+            # Vosk reads the wav files itself, so only the file names are streamed to the recognizer
+            dataset = preprocessor.iter_filenames()
 
         # Evaluate transcriptions
-        results = evaluator.transcribe_and_evaluate(vosk_model, dataset)
+        if args.workers > 1:
+            filenames = dataset.filenames if args.features else dataset
+            results = evaluator.transcribe_and_evaluate_parallel(args.model, filenames, args.workers)
+        else:
+            results = evaluator.transcribe_and_evaluate(vosk.Model(args.model), dataset)
         wer_results = [result[1] for result in results]
 
         # Calculate average WER
         avg_wer = np.mean(wer_results)
         print("Average WER: ", avg_wer)
+        print("Corpus WER: ", evaluator.corpus_scores()['wer'])
+
+        if args.workers <= 1:
+            te_stats = get_text_enhancer('de').stats()
+            print(f"Text enhancement: model loaded {te_stats['load_count']}x in {te_stats['load_time']} s, "
+                  f"{te_stats['call_count']} calls, mean latency {te_stats['mean_latency']} s")
+            if evaluator.transcription_cache is not None:
+                print("Transcription cache: ", evaluator.transcription_cache.stats())
 
     except Exception as e:
         print(f"Error in main process: {e}")
+    finally:
+        if transcript_writer is not None:
+            transcript_writer.close()
+
+    if args.trace:
+        get_metrics().export_trace(args.trace)
+    if args.metrics_file:
+        get_metrics().write_prometheus(args.metrics_file)
+
+    if args.profile:
+        # ru_maxrss is reported in kilobytes on Linux; worker processes are reported separately
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        worker_rss_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        print(f"Wall-clock: {time.perf_counter() - start_time:.2f} s, peak RSS: {peak_rss_mb:.1f} MB "
+              f"(largest worker: {worker_rss_mb:.1f} MB, features {'on' if args.features else 'off'})")
 
 
 if __name__ == "__main__":